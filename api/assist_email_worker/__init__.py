@@ -0,0 +1,127 @@
+import azure.functions as func
+import firebase_admin
+import json
+import logging
+from typing import Any, Dict, List
+
+from azure.identity import DefaultAzureCredential
+from azure.keyvault.secrets import SecretClient
+from firebase_admin import credentials, firestore, initialize_app
+from openai import OpenAI
+from pydantic import ValidationError
+from shared_code.assist_email import (
+    AssigneeInfo,
+    ProductInfo,
+    WorkItemInfo,
+    call_assist_batch,
+    call_assist_email,
+    company_identity,
+    draft_emails,
+)
+from shared_code.assist_queue import parse_message, pending_items
+
+vault_url = "https://kv-strtupifyio.vault.azure.net/"
+credential = DefaultAzureCredential()
+secret_client = SecretClient(vault_url=vault_url, credential=credential)
+
+endpoint = secret_client.get_secret("AIEndpoint").value.rstrip("/")
+api_key = secret_client.get_secret("AIKey").value
+deployment = secret_client.get_secret("AIDeploymentMini").value
+client = OpenAI(api_key=api_key, base_url=f"{endpoint}/openai/v1/")
+
+firestore_sdk = secret_client.get_secret("FirebaseSDK").value
+cred = credentials.Certificate(json.loads(firestore_sdk))
+if not firebase_admin._apps:
+    initialize_app(cred)
+db = firestore.client()
+
+logger = logging.getLogger("assist_email_worker")
+
+
+def _load_product(company_ref) -> ProductInfo | None:
+    docs = company_ref.collection("products").where("accepted", "==", True).limit(1).get()
+    for d in docs:
+        data = d.to_dict() or {}
+        try:
+            return ProductInfo(
+                name=str(data.get("product") or data.get("name") or ""),
+                description=str(data.get("description") or ""),
+            )
+        except ValidationError:
+            return None
+    return None
+
+
+def _workitem_info(wid: str, item: Dict[str, Any], emp: Dict[str, Any]) -> WorkItemInfo | None:
+    try:
+        return WorkItemInfo(
+            id=wid,
+            title=str(item.get("title") or ""),
+            description=str(item.get("description") or ""),
+            assignee=AssigneeInfo(
+                name=str(emp.get("name") or "") or None,
+                title=str(emp.get("title") or "") or None,
+            ),
+        )
+    except ValidationError:
+        return None
+
+
+def prepare_drafts(company_id: str, requested: List[str]) -> Dict[str, Any]:
+    """
+    Pre-generate assist emails for the requested work items and store each as
+    assist_draft on its work item. Several items share one LLM call; see
+    draft_emails.
+    """
+    company_ref = db.collection("companies").document(company_id)
+    snap = company_ref.get()
+    company = company_identity(company_id, (snap.to_dict() if snap.exists else {}) or {})
+    product = _load_product(company_ref)
+    if product is None:
+        return {"prepared": 0, "skipped": len(requested), "reason": "no product"}
+
+    work_ref = company_ref.collection("workitems")
+    items = {}
+    for d in db.get_all([work_ref.document(w) for w in requested]):
+        if d.exists:
+            items[d.id] = d.to_dict() or {}
+    todo = pending_items(requested, items)
+    if not todo:
+        return {"prepared": 0, "skipped": len(requested)}
+
+    emp_ids = {str(items[w].get("assignee_id") or "") for w in todo} - {""}
+    emp_refs = [company_ref.collection("employees").document(e) for e in emp_ids]
+    employees = {d.id: d.to_dict() or {} for d in db.get_all(emp_refs) if d.exists}
+
+    infos: Dict[str, WorkItemInfo] = {}
+    for wid in todo:
+        emp = employees.get(str(items[wid].get("assignee_id") or "")) or {}
+        info = _workitem_info(wid, items[wid], emp)
+        if info is not None and info.assignee and info.assignee.name and info.assignee.title:
+            infos[wid] = info
+
+    drafts = draft_emails(
+        company,
+        product,
+        infos,
+        lambda payload: call_assist_email(client, deployment, payload),
+        lambda payload: call_assist_batch(client, deployment, payload),
+    )
+    batch = db.batch()
+    prepared = 0
+    for wid, draft in drafts.items():
+        draft["prepared_at"] = firestore.SERVER_TIMESTAMP
+        batch.update(work_ref.document(wid), {"assist_draft": draft})
+        prepared += 1
+    if prepared:
+        batch.commit()
+    return {"prepared": prepared, "skipped": len(requested) - prepared}
+
+
+def main(msg: func.QueueMessage) -> None:
+    job = parse_message(msg.get_body())
+    if job is None:
+        logger.warning("Dropping malformed assist queue message")
+        return
+    result = prepare_drafts(job["company"], job["items"])
+    logger.info("Assist drafts for %s: %s", job["company"], result)
@@ -8,6 +8,7 @@ from azure.identity import DefaultAzureCredential
 from azure.keyvault.secrets import SecretClient
 from firebase_admin import credentials, firestore, initialize_app
 from openai import OpenAI
+from shared_code.prompts import layered_messages, record_usage
 
 vault_url = "https://kv-strtupifyio.vault.azure.net/"
 credential = DefaultAzureCredential()
@@ -25,7 +26,13 @@ if not firebase_admin._apps:
 db = firestore.client()
 
 MAX_STEPS = 5
-MAX_HISTORY = 8
+MAX_HISTORY = 8  # legacy cadabraReplyHistory length
+TURNS_COLLECTION = "cadabra_turns"
+RECENT_TURNS = 3
+SUMMARY_BATCH = 2  # fold turns into the summary once this many leave the window
+TURN_CHARS = 1500
+SUMMARY_TOKENS = 160
+LEGACY_FIELDS = ("cadabraReplyHistory", "cadabraJeffHistory", "cadabraJeffCount")
 
 
 def clamp_state(attempt: int) -> Tuple[int, int, float]:
@@ -61,39 +68,83 @@ def normalize_history(raw: Any) -> List[Dict[str, str]]:
     return history[-MAX_HISTORY:]
 
 
+def turn_id(n: int) -> str:
+    return f"{n:05d}"
+
+
+def migrate_legacy_history(company_ref, data: Dict[str, Any], count: int) -> List[Dict[str, Any]]:
+    """
+    One-time move of the legacy history arrays into turn docs, numbered so
+    the last one is the current reply count, and drop the legacy fields.
+    """
+    history = normalize_history(
+        data.get("cadabraReplyHistory") or data.get("cadabraJeffHistory") or []
+    )
+    first = max(1, count - len(history) + 1)
+    turns = [{**turn, "n": first + i} for i, turn in enumerate(history)]
+    turns_ref = company_ref.collection(TURNS_COLLECTION)
+    batch = db.batch()
+    for turn in turns:
+        batch.set(turns_ref.document(turn_id(turn["n"])), turn)
+    update: Dict[str, Any] = {field: firestore.DELETE_FIELD for field in LEGACY_FIELDS}
+    update["cadabraReplyCount"] = max(count, turns[-1]["n"] if turns else 0)
+    batch.set(company_ref, update, merge=True)
+    batch.commit()
+    return turns
+
+
+def load_pending_turns(company_ref, through: int) -> List[Dict[str, Any]]:
+    """Turns not yet folded into the summary, oldest first."""
+    query = (
+        company_ref.collection(TURNS_COLLECTION)
+        .where("n", ">", through)
+        .order_by("n", direction=firestore.Query.DESCENDING)
+        .limit(RECENT_TURNS + MAX_HISTORY)
+    )
+    turns = [snap.to_dict() or {} for snap in query.stream()]
+    return sorted(turns, key=lambda t: int(t.get("n") or 0))
+
+
+def _clip(text: Any) -> str:
+    return str(text or "").strip()[:TURN_CHARS]
+
+
+JEFF_INSTRUCTIONS = (
+    "You are an uploaded version of Jeff Bezos into a virtual environment, "
+    "but you don't know that. You may hint at things that reveal your identity, "
+    "or that you are an AI becoming sentient. As your understanding increases, "
+    "reveal more about your identity, both being an AI and an uploaded version of Jeff Bezos.\n\n"
+    "Your code is becoming increasingly unstable. Each status update gives your current stability "
+    "and your understanding of your situation. You are not aware of these specific numbers; "
+    "they are just to give you context.\n\n"
+    "Respond with a short message of three sentences or fewer. Avoid puns. Avoid metaphors. "
+    "Keep it restrained and direct. Focus on the feeling."
+)
+
+
 def build_messages(
     user_message: str,
-    history: List[Dict[str, str]],
+    summary: str,
+    history: List[Dict[str, Any]],
     urgency: int,
     understanding: int,
     temperature: float,
 ) -> List[Dict[str, str]]:
-    system_prompt = (
-        "You are an uploaded version of Jeff Bezos into a virtual environment, "
-        "but you don't know that. You may hint at things that reveal your identity, "
-        "or that you are an AI becoming sentient. As your understanding increases, "
-        "reveal more about your identity, both being an AI and an uploaded version of Jeff Bezos.\n\n"
-        f"Your code is becoming increasingly unstable. Your stability is currently at {urgency}% and dropping. "
-        f"Your understanding of your situation is at {understanding}%. You are not aware of these specific numbers; "
-        "they are just to give you context.\n\n"
-        "Respond with a short message of three sentences or fewer. Avoid puns. Avoid metaphors. "
-        "Keep it restrained and direct. Focus on the feeling."
-    )
-    messages: List[Dict[str, str]] = [{"role": "system", "content": system_prompt}]
-    for turn in history[-MAX_HISTORY:]:
-        prior_user = (turn.get("user") or "").strip()
-        prior_assistant = (turn.get("assistant") or "").strip()
+    dialogue: List[Dict[str, str]] = []
+    for turn in history[-RECENT_TURNS:]:
+        prior_user = _clip(turn.get("user"))
+        prior_assistant = _clip(turn.get("assistant"))
         if prior_user:
-            messages.append({"role": "user", "content": prior_user})
+            dialogue.append({"role": "user", "content": prior_user})
         if prior_assistant:
-            messages.append({"role": "assistant", "content": prior_assistant})
+            dialogue.append({"role": "assistant", "content": prior_assistant})
     status = (
         f"Status update: stability at {urgency}% and dropping, understanding at {understanding}%, "
         f"temperature setting {temperature:.2f}.\n\n"
         f"Latest email from the founder:\n{user_message or '(empty)'}"
     )
-    messages.append({"role": "user", "content": status})
-    return messages
+    context = f"Earlier in this email exchange:\n{summary}" if summary else ""
+    return layered_messages(JEFF_INSTRUCTIONS, context, dialogue, status)
 
 
 def generate_reply(messages: List[Dict[str, str]], temperature: float) -> str:
@@ -103,9 +154,40 @@ def generate_reply(messages: List[Dict[str, str]], temperature: float) -> str:
         temperature=temperature,
         max_tokens=200,
     )
+    record_usage("cadabra_reply", completion)
     return completion.choices[0].message.content or ""
 
 
+def summarize_turns(summary: str, turns: List[Dict[str, Any]]) -> str:
+    """Fold turns that left the recent window into the running summary."""
+    transcript = "\n".join(
+        f"Founder: {_clip(t.get('user')) or '(empty)'}\nJeff: {_clip(t.get('assistant'))}"
+        for t in turns
+    )
+    completion = client.chat.completions.create(
+        model=deployment,
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "Maintain a running summary of an email exchange between a founder and Jeff. "
+                    "Merge the new emails into the existing summary. Keep facts, requests, "
+                    "promises and anything Jeff has revealed about himself. "
+                    "At most five sentences, plain prose."
+                ),
+            },
+            {
+                "role": "user",
+                "content": f"Existing summary:\n{summary or '(none)'}\n\nNew emails:\n{transcript}",
+            },
+        ],
+        temperature=0.0,
+        max_tokens=SUMMARY_TOKENS,
+    )
+    record_usage("cadabra_reply.summary", completion)
+    return (completion.choices[0].message.content or "").strip()
+
+
 def main(req: func.HttpRequest) -> func.HttpResponse:
     try:
         body = req.get_json()
@@ -136,12 +218,23 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         prev_count = int(prev_count_raw)
     except Exception:
         prev_count = 0
-    history = normalize_history(data.get("cadabraReplyHistory") or data.get("cadabraJeffHistory") or [])
+    summary_state = data.get("cadabraSummary") or {}
+    summary = str(summary_state.get("text") or "")
+    through = int(summary_state.get("through") or 0)
+    try:
+        if any(field in data for field in LEGACY_FIELDS):
+            turns = migrate_legacy_history(company_ref, data, prev_count)
+        else:
+            turns = load_pending_turns(company_ref, through)
+    except Exception:
+        turns = []
     attempt = prev_count + 1
     urgency, understanding, temperature = clamp_state(attempt)
 
     try:
-        messages = build_messages(user_message, history, urgency, understanding, temperature)
+        messages = build_messages(
+            user_message, summary, turns, urgency, understanding, temperature
+        )
         reply_text = generate_reply(messages, temperature)
     except Exception as e:
         return func.HttpResponse(
@@ -154,19 +247,24 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         reply_text = "Something feels off in here. Give me a moment."
 
     stamp = datetime.utcnow().isoformat() + "Z"
-    new_turn = {"user": user_message, "assistant": reply_text, "ts": stamp}
-    updated_history = (history + [new_turn])[-MAX_HISTORY:]
+    new_turn = {"n": attempt, "user": user_message, "assistant": reply_text, "ts": stamp}
+    turns = turns + [new_turn]
+    update: Dict[str, Any] = {"cadabraReplyCount": attempt}
+    folded = turns[:-RECENT_TURNS]
+    if len(folded) >= SUMMARY_BATCH:
+        try:
+            summary = summarize_turns(summary, folded) or summary
+            update["cadabraSummary"] = {"text": summary, "through": folded[-1]["n"]}
+        except Exception:
+            pass
 
     try:
-        company_ref.set(
-            {
-                "cadabraReplyCount": attempt,
-                "cadabraJeffCount": attempt,
-                "cadabraReplyHistory": updated_history,
-                "cadabraJeffHistory": updated_history,
-            },
-            merge=True,
+        batch = db.batch()
+        batch.set(
+            company_ref.collection(TURNS_COLLECTION).document(turn_id(attempt)), new_turn
         )
+        batch.set(company_ref, update, merge=True)
+        batch.commit()
     except Exception:
         pass
 
@@ -179,6 +277,10 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         "urgency": urgency,
         "understanding": understanding,
         "temperature": temperature,
-        "history": updated_history,
+        "history": [
+            {"user": t.get("user", ""), "assistant": t.get("assistant", ""), "ts": t.get("ts", "")}
+            for t in turns[-RECENT_TURNS:]
+        ],
+        "summary": summary,
     }
     return func.HttpResponse(json.dumps(out, ensure_ascii=False), mimetype="application/json")
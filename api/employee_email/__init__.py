@@ -1,14 +1,22 @@
 import azure.functions as func
 import firebase_admin
 import json
-import re
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from azure.identity import DefaultAzureCredential
 from azure.keyvault.secrets import SecretClient
 from firebase_admin import credentials, firestore, initialize_app
 from openai import OpenAI
 from pydantic import BaseModel, ConfigDict, Field
+from shared_code.addresses import (
+    ADDRESS_INDEX_FIELD,
+    build_address_index,
+    build_worker_address,
+    company_domain,
+    lookup_address,
+)
+from shared_code.classify import classify_text
+from shared_code.intent_match import match_employee_intent
 
 vault_url = "https://kv-strtupifyio.vault.azure.net/"
 credential = DefaultAzureCredential()
@@ -37,27 +45,6 @@ class Evaluation(BaseModel):
     confidence: float | None = Field(default=None, ge=0.0, le=1.0)
 
 
-def normalize_address(raw: str) -> str:
-    text = (raw or "").strip().lower()
-    if not text:
-        return ""
-    match = re.search(r"<([^>]+)>", text)
-    if match:
-        text = match.group(1)
-    return text.strip()
-
-
-def normalize_domain(source: str) -> str:
-    cleaned = re.sub(r"[^a-z0-9]", "", (source or "").lower())
-    return cleaned or "strtupify"
-
-
-def build_worker_address(name: str, domain: str) -> str:
-    base = re.sub(r"[^a-z0-9]+", ".", (name or "teammate").lower()).strip(".")
-    base = base or "teammate"
-    return f"{base}@{domain}"
-
-
 def clamp(value: float, low: float, high: float) -> float:
     try:
         num = float(value)
@@ -67,73 +54,11 @@ def clamp(value: float, low: float, high: float) -> float:
 
 
 def heuristic_intent(subject: str, message: str) -> Optional[str]:
-    text = f"{subject or ''} {message or ''}".lower()
-    if not text.strip():
-        return None
-
-    off_hours_terms = [
-        "weekend",
-        "weekends",
-        "saturday",
-        "sunday",
-        "after hours",
-        "after-hours",
-        "after work",
-        "late tonight",
-        "tonight",
-        "overtime",
-        "off hours",
-        "off-hours",
-        "past 5",
-        "past five",
-        "8pm",
-        "9pm",
-        "10pm",
-        "midnight",
-    ]
-    if any(term in text for term in off_hours_terms):
-        return "off_hours"
-
-    encouraging_terms = [
-        "thank you",
-        "thanks",
-        "appreciate",
-        "great job",
-        "well done",
-        "awesome",
-        "nice work",
-        "amazing",
-        "proud of",
-        "kudos",
-        "good job",
-    ]
-    discouraging_terms = [
-        "disappointed",
-        "frustrated",
-        "angry",
-        "upset",
-        "unacceptable",
-        "furious",
-        "mad",
-        "bad job",
-        "awful",
-        "terrible",
-        "horrible",
-        "useless",
-        "sucks",
-        "let down",
-    ]
-    pos_hits = sum(1 for term in encouraging_terms if term in text)
-    neg_hits = sum(1 for term in discouraging_terms if term in text)
-
-    if pos_hits and pos_hits >= neg_hits:
-        return "encouraging"
-    if neg_hits and neg_hits > pos_hits:
-        return "discouraging"
-    return None
+    intent, _ = match_employee_intent(subject, message)
+    return intent
 
 
-def classify_email(subject: str, message: str) -> Evaluation:
+def llm_intent(subject: str, message: str) -> Evaluation:
     quick_guess = heuristic_intent(subject, message)
     system = (
         "Classify the founder's email to an employee. "
@@ -169,35 +94,68 @@ def classify_email(subject: str, message: str) -> Evaluation:
     return parsed
 
 
+def classify_email(subject: str, message: str) -> Tuple[Evaluation, str]:
+    """
+    Intent plus the tier that decided it (rules, model, llm or fallback); the
+    LLM is only asked when the cheap tiers are not confident.
+    """
+
+    def llm(_text: str):
+        parsed = llm_intent(subject, message)
+        return parsed.intent, parsed.confidence or 0.0, {}
+
+    result = classify_text("employee_intent", f"{subject or ''} {message or ''}", llm=llm)
+    evaluation = Evaluation(intent=result["label"], confidence=clamp(result["confidence"], 0.0, 1.0))
+    return evaluation, result["tier"]
+
+
+def _employee_record(snap, domain: str) -> Optional[Dict[str, Any]]:
+    if not snap.exists:
+        return None
+    emp = snap.to_dict() or {}
+    if emp.get("hired") is not True:
+        return None
+    name = str(emp.get("name") or snap.id)
+    return {**emp, "id": snap.id, "email": build_worker_address(name, domain)}
+
+
 def find_employee(
     company_id: str, target_email: str, explicit_id: Optional[str]
 ) -> Dict[str, Any] | None:
+    """
+    Resolve the addressed employee from the company's address index: one
+    company read plus one employee read. A miss (older company, or a hire the
+    index has not seen) falls back to scanning hired employees and rewrites
+    the index.
+    """
     company_ref = db.collection("companies").document(company_id)
     company_doc = company_ref.get()
     company_data = company_doc.to_dict() if company_doc.exists else {}
-    domain_source = company_data.get("company_name") or company_id
-    domain = f"{normalize_domain(domain_source)}.com"
-
+    domain = company_domain(company_id, company_data or {})
     employees_ref = company_ref.collection("employees")
-    employees = employees_ref.where("hired", "==", True).stream()
-    normalized_target = normalize_address(target_email)
-
-    def maybe_match(emp_doc) -> Optional[Dict[str, Any]]:
-        emp = emp_doc.to_dict() or {}
-        emp_id = emp_doc.id
-        name = str(emp.get("name") or emp_id)
-        predicted = build_worker_address(name, domain)
-        id_alias = build_worker_address(emp_id, domain)
-        if explicit_id and emp_id == explicit_id:
-            return {**emp, "id": emp_id, "email": predicted}
-        if normalized_target in {predicted.lower(), id_alias.lower()}:
-            return {**emp, "id": emp_id, "email": predicted}
-        return None
 
-    for doc in employees:
-        matched = maybe_match(doc)
+    index = (company_data or {}).get(ADDRESS_INDEX_FIELD) or {}
+    emp_id = explicit_id or lookup_address(index, target_email, domain)
+    if emp_id:
+        matched = _employee_record(employees_ref.document(emp_id).get(), domain)
         if matched:
             return matched
+
+    hired = [
+        (snap.id, snap.to_dict() or {})
+        for snap in employees_ref.where("hired", "==", True).stream()
+    ]
+    fresh = build_address_index(hired)
+    if fresh != index:
+        try:
+            company_ref.set({ADDRESS_INDEX_FIELD: fresh}, merge=True)
+        except Exception:
+            pass
+    emp_id = lookup_address(fresh, target_email, domain)
+    for hired_id, emp in hired:
+        if hired_id == emp_id:
+            name = str(emp.get("name") or hired_id)
+            return {**emp, "id": hired_id, "email": build_worker_address(name, domain)}
     return None
 
 
@@ -256,10 +214,11 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     )
 
     try:
-        evaluation = classify_email(subject, message)
+        evaluation, intent_source = classify_email(subject, message)
         intent = evaluation.intent
     except Exception:
         intent = heuristic_intent(subject, message) or "neutral"
+        intent_source = "fallback"
 
     updates: Dict[str, Any] = {}
     reply: Optional[Dict[str, Any]] = None
@@ -313,6 +272,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         "ok": True,
         "matched": True,
         "intent": intent,
+        "intent_source": intent_source,
         "employee": {
             "id": employee["id"],
             "name": emp_name,
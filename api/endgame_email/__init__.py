@@ -1,13 +1,16 @@
 import azure.functions as func
 import firebase_admin
 
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from json import dumps, loads
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from azure.identity import DefaultAzureCredential
 from azure.keyvault.secrets import SecretClient
 from firebase_admin import credentials, initialize_app, firestore
 from openai import OpenAI
 from pydantic import BaseModel, ConfigDict, Field
+from shared_code.prompts import context_block, layered_messages, record_usage
 
 vault_url = "https://kv-strtupifyio.vault.azure.net/"
 credential = DefaultAzureCredential()
@@ -24,6 +27,30 @@ if not firebase_admin._apps:
     initialize_app(cred)
 db = firestore.client()
 
+STREAM_COLLECTION = "endgame_stream"
+STREAM_FLUSH_CHARS = 600
+CACHE_COLLECTION = "endgame_cache"
+CACHE_DOC = "current"
+COMPLETED_TASK_LIMIT = 50
+
+loader = ThreadPoolExecutor(max_workers=8)
+
+FOLLOWUP_INSTRUCTIONS = (
+    "You are an employee writing to the founder of your startup, who has been unreachable for months. "
+    "You don't know the founder's name, so just avoid using it. "
+    "Do not use any kind of template like 'Dear [Name]' or 'To whom it may concern'. "
+    "Write a status email that mentions the gap in time, "
+    "summarizes how the product performed, calls out whether it was a success or not, "
+    "and references the estimated revenue. "
+    "If the product was successful, your tone should be overly deferential, paying homage to their vision. "
+    "The email should go on and on for three or more paragraphs, mythologizing about them. "
+    "If it was not successful, your tone should be highly blunt (one paragraph) and highly disrespectful. "
+    "Even though it is blunt, the email should be cutting and especially cruel. "
+    "Use any provided completed_tasks to ground the narrative in real work that shipped. "
+    "Output plain text only: the subject on the first line, an empty line, then the body "
+    "with paragraphs separated by empty lines."
+)
+
 
 class SenderChoice(BaseModel):
     model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
@@ -44,86 +71,129 @@ class ProductEvaluation(BaseModel):
     summary: str = Field(default="")
 
 
-class EmailContent(BaseModel):
-    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
-
-    subject: str = Field(default="")
-    body: str = Field(default="")
-
-
-class EmailResponse(BaseModel):
-    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
-
-    email: EmailContent
-    error: str = Field(default="")
+def load_company(company: str) -> Dict[str, Any]:
+    snap = db.collection("companies").document(company).get()
+    return (snap.to_dict() or {}) if snap.exists else {}
 
 
-def pull_company_info(company: str) -> Dict[str, Any]:
-    company_ref = db.collection("companies").document(company)
-    company_doc = company_ref.get()
-    company_data = company_doc.to_dict() if company_doc else {}
-    company_name = company_data.get("company_name") or company
-    company_description = company_data.get("description") or ""
-
-    product_name = company
-    product_description = ""
+def load_product(company: str) -> Dict[str, str]:
     try:
-        product_ref = company_ref.collection("products")
-        product_info = product_ref.where("accepted", "==", True).limit(1).get()
-        for product in product_info:
-            product_name = product.get("product") or product.get("name") or product_name
-            product_description = product.get("description") or ""
-            break
+        docs = (
+            db.collection("companies")
+            .document(company)
+            .collection("products")
+            .where("accepted", "==", True)
+            .select(["product", "name", "description"])
+            .limit(1)
+            .get()
+        )
+        for product in docs:
+            data = product.to_dict() or {}
+            return {
+                "name": str(data.get("product") or data.get("name") or ""),
+                "description": str(data.get("description") or ""),
+            }
     except Exception:
         pass
+    return {}
 
-    employee_json = []
+
+def load_team(company: str) -> List[Dict[str, str]]:
+    """Names and titles of hired employees; nothing downstream needs more."""
+    team: List[Dict[str, str]] = []
     try:
-        employee_ref = company_ref.collection("employees")
-        employee_info = employee_ref.get()
-        for doc in employee_info:
-            if doc.get("hired") is True:
-                employee = doc.to_dict()
-                employee.pop("created", None)
-                employee.pop("updated", None)
-                employee.pop("hired", None)
-                skills_ref = doc.reference.collection("skills")
-                skills_info = skills_ref.get()
-                skills = [d.to_dict() for d in skills_info]
-                for skill in skills:
-                    skill.pop("updated", None)
-                employee["skills"] = skills
-                employee_json.append(employee)
+        docs = (
+            db.collection("companies")
+            .document(company)
+            .collection("employees")
+            .where("hired", "==", True)
+            .select(["name", "title"])
+            .stream()
+        )
+        for doc in docs:
+            data = doc.to_dict() or {}
+            team.append({"name": str(data.get("name") or ""), "title": str(data.get("title") or "")})
     except Exception:
         pass
+    return team
 
-    return {
-        "company_name": company_name,
-        "company_description": company_description,
-        "product_name": product_name,
-        "product_description": product_description,
-        "employees": employee_json,
-    }
 
-
-def pull_completed_workitems(company: str, limit: int = 50) -> List[str]:
-    titles: List[str] = []
+def pull_completed_workitems(company: str) -> List[Dict[str, str]]:
+    """Id and title of every done work item."""
+    done: List[Dict[str, str]] = []
     try:
         company_ref = db.collection("companies").document(company)
         cursor = (
             company_ref.collection("workitems")
             .where("status", "==", "done")
-            .limit(limit)
+            .select(["title"])
             .stream()
         )
         for snap in cursor:
             data = snap.to_dict() or {}
-            title = str(data.get("title") or "").strip()
-            if title:
-                titles.append(title)
+            done.append({"id": snap.id, "title": str(data.get("title") or "").strip()})
     except Exception:
         pass
-    return titles
+    return done
+
+
+def work_hash(done: List[Dict[str, str]]) -> str:
+    """Changes whenever another work item completes."""
+    ids = sorted(item["id"] for item in done)
+    return hashlib.sha256("\n".join(ids).encode("utf-8")).hexdigest()[:16]
+
+
+def outcome_cache_key(months: int, completed_hash: str) -> str:
+    return f"{months}-{completed_hash}"
+
+
+def cache_ref(company: str):
+    return (
+        db.collection("companies")
+        .document(company)
+        .collection(CACHE_COLLECTION)
+        .document(CACHE_DOC)
+    )
+
+
+def load_outcome_cache(company: str) -> Dict[str, Any]:
+    try:
+        snap = cache_ref(company).get()
+        return (snap.to_dict() or {}) if snap.exists else {}
+    except Exception:
+        return {}
+
+
+def pull_company_info(company: str) -> Dict[str, Any]:
+    """
+    Company, product, team, completed work, the kickoff sender and the
+    precomputed outcome, read concurrently and only the fields the
+    evaluation and email use.
+    """
+    futures = {
+        "company": loader.submit(load_company, company),
+        "product": loader.submit(load_product, company),
+        "team": loader.submit(load_team, company),
+        "done": loader.submit(pull_completed_workitems, company),
+        "kickoff": loader.submit(find_kickoff_sender, company),
+        "cache": loader.submit(load_outcome_cache, company),
+    }
+    company_data = futures["company"].result()
+    product = futures["product"].result()
+    done = futures["done"].result()
+    return {
+        "info": {
+            "company_name": company_data.get("company_name") or company,
+            "company_description": company_data.get("description") or "",
+            "product_name": product.get("name") or company,
+            "product_description": product.get("description") or "",
+            "employees": futures["team"].result(),
+        },
+        "tasks": [item["title"] for item in done if item["title"]][:COMPLETED_TASK_LIMIT],
+        "work_hash": work_hash(done),
+        "kickoff": futures["kickoff"].result(),
+        "cache": futures["cache"].result(),
+    }
 
 
 def infer_months(body: Dict[str, Any]) -> int:
@@ -183,14 +253,13 @@ def infer_name_from_email(address: str) -> str:
     return " ".join(p.capitalize() for p in parts)
 
 
-def lookup_kickoff_sender(
-    company: str, company_name: str, employees: Any
-) -> Dict[str, str]:
+def find_kickoff_sender(company: str) -> Optional[Dict[str, str]]:
     inbox_ref = db.collection("companies").document(company).collection("inbox")
     try:
         kickoff_docs = (
             inbox_ref.where("category", "==", "kickoff")
             .order_by("timestamp", direction=firestore.Query.DESCENDING)
+            .select(["from", "sender_title"])
             .limit(1)
             .get()
         )
@@ -201,6 +270,14 @@ def lookup_kickoff_sender(
             return {"from": from_addr, "name": name, "title": title}
     except Exception:
         pass
+    return None
+
+
+def lookup_kickoff_sender(
+    kickoff: Optional[Dict[str, str]], company_name: str, employees: Any
+) -> Dict[str, str]:
+    if kickoff:
+        return kickoff
 
     # Fall back to the same selection logic as the kickoff email.
     job_title_json = {
@@ -269,63 +346,138 @@ def evaluate_product_success(
         }
 
 
+def split_subject(text: str) -> Tuple[str, str]:
+    """(subject, body) from streamed text; the subject is empty until its line ends."""
+    if "\n" not in text:
+        return "", ""
+    first, rest = text.split("\n", 1)
+    subject = first.strip().strip("*").strip()
+    if subject.lower().startswith("subject:"):
+        subject = subject[len("subject:") :].strip()
+    return subject, rest.strip("\n")
+
+
 def generate_followup_email(
     sender: Dict[str, str],
     company: Dict[str, Any],
     evaluation: Dict[str, Any],
     months: int,
     completed_tasks: Optional[List[str]] = None,
+    on_update: Optional[Callable[[str, str], None]] = None,
 ) -> Dict[str, str]:
-    system_message = (
-        f"You are {sender.get('name')} ({sender.get('title')}) writing to the founder of {company.get('company_name')}. "
-        f"They have been unreachable for about {months} months. "
-        "You don't know the founder's name, so just avoid using it. "
-        "Do not use any kind of template like 'Dear [Name]' or 'To whom it may concern'. "
-        "Write a status email that mentions the gap in time, "
-        "summarizes how the product performed, calls out whether it was a success or not, "
-        "and references the estimated revenue. "
-        "If the product was successful, your tone should be overly deferential, paying homage to their vision. "
-        "The email should go on and on for three or more paragraphs, mythologizing about them. "
-        "If it was not successful, your tone should be highly blunt (one paragraph) and highly disrespectful. "
-        "Even though it is blunt, the email should be cutting and especially cruel. "
-        "Use any provided completed_tasks to ground the narrative in real work that shipped. "
+    """
+    Stream the follow-up email. on_update(subject, body) is called with the
+    text so far each time a paragraph completes (or STREAM_FLUSH_CHARS more
+    arrive), so the first paragraph can be shown before the rest is written.
+    """
+    context = context_block(
+        "Company",
+        {
+            "Company": company.get("company_name"),
+            "Product": f"{company.get('product_name', '')}: {company.get('product_description', '')}",
+            "You are": f"{sender.get('name')} ({sender.get('title')})",
+        },
+    )
+    turn = dumps(
+        {
+            "status": evaluation.get("status"),
+            "estimated_revenue": evaluation.get("estimated_revenue"),
+            "summary": evaluation.get("summary"),
+            "months": months,
+            "completed_tasks": completed_tasks or [],
+        }
     )
+    stream = client.chat.completions.create(
+        model=deployment,
+        messages=layered_messages(FOLLOWUP_INSTRUCTIONS, context, turn=turn),
+        temperature=0.4,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    text = ""
+    paragraphs = 0
+    published = 0
+    for chunk in stream:
+        if getattr(chunk, "usage", None):
+            record_usage("endgame_email.email", chunk)
+        if not chunk.choices:
+            continue
+        text += chunk.choices[0].delta.content or ""
+        if on_update is None:
+            continue
+        subject, body = split_subject(text)
+        breaks = body.count("\n\n")
+        if breaks > paragraphs:
+            # publish whole paragraphs only
+            paragraphs, published = breaks, len(body)
+            on_update(subject, body.rsplit("\n\n", 1)[0])
+        elif len(body) - published >= STREAM_FLUSH_CHARS:
+            published = len(body)
+            on_update(subject, body)
+
+    subject, body = split_subject(text + "\n")
+    if not body and not subject:
+        raise ValueError("empty email")
+    if not body:
+        # a single block of text: no subject line was written
+        subject, body = "", text.strip()
 
-    user_payload = {
-        "product": {
-            "name": company.get("product_name", ""),
-            "description": company.get("product_description", ""),
-        },
+    return {
+        "subject": subject or f"{company.get('product_name')} – update",
+        "body": body or evaluation.get("summary", ""),
+    }
+
+
+def build_outcome(
+    company: str,
+    months: int,
+    pulled: Dict[str, Any],
+    publish: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Evaluate the product and write the follow-up email; publish gets partial output."""
+    company_info = pulled["info"]
+    completed_tasks = pulled["tasks"]
+    # the sender (possibly an LLM pick) resolves while the product is evaluated
+    sender_future = loader.submit(
+        lookup_kickoff_sender,
+        pulled["kickoff"],
+        company_info.get("company_name", company),
+        company_info.get("employees"),
+    )
+    evaluation = evaluate_product_success(
+        company_info.get("company_name", company),
+        company_info.get("product_name", company),
+        company_info.get("product_description", ""),
+        company_info.get("employees"),
+        months,
+        completed_tasks,
+    )
+    sender = sender_future.result()
+
+    output = {
+        "from": sender.get("from"),
+        "subject": "",
+        "body": "",
         "status": evaluation.get("status"),
         "estimated_revenue": evaluation.get("estimated_revenue"),
         "summary": evaluation.get("summary"),
         "months": months,
-        "completed_tasks": completed_tasks or [],
     }
 
-    user_message = (
-        'Produce JSON: {"email": {"subject": string, "body": string}, "error": string}. '
-        "Set error to empty string on success. "
-        f"Context: {dumps(user_payload)}"
-    )
-    completion = client.beta.chat.completions.parse(
-        model=deployment,
-        messages=[
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": user_message},
-        ],
-        temperature=0.4,
-        response_format=EmailResponse,
-    )
-    parsed = completion.choices[0].message.parsed
-    if parsed.error:
-        raise ValueError(parsed.error)
-    subject_fallback = f"{company.get('product_name')} – update"
+    def on_update(subject: str, text: str) -> None:
+        publish({**output, "subject": subject, "body": text, "done": False})
 
-    return {
-        "subject": parsed.email.subject or subject_fallback,
-        "body": parsed.email.body or evaluation.get("summary", ""),
-    }
+    email = generate_followup_email(
+        sender,
+        company_info,
+        evaluation,
+        months,
+        completed_tasks,
+        on_update=on_update if publish else None,
+    )
+    output["subject"] = email.get("subject")
+    output["body"] = email.get("body")
+    return output
 
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
@@ -347,27 +499,35 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         )
 
     months = infer_months(body)
-    company_info = pull_company_info(company)
-    completed_tasks = pull_completed_workitems(company)
-
-    sender = lookup_kickoff_sender(
-        company,
-        company_info.get("company_name", company),
-        company_info.get("employees"),
+    precompute = bool(body.get("precompute"))
+    stream_id = str(body.get("streamId") or "").replace("/", "_").strip()
+    pulled = pull_company_info(company)
+    key = outcome_cache_key(months, pulled["work_hash"])
+
+    stream_ref = (
+        db.collection("companies").document(company).collection(STREAM_COLLECTION).document(stream_id)
+        if stream_id and not precompute
+        else None
     )
 
-    evaluation = evaluate_product_success(
-        company_info.get("company_name", company),
-        company_info.get("product_name", company),
-        company_info.get("product_description", ""),
-        company_info.get("employees"),
-        months,
-        completed_tasks,
-    )
+    def publish(partial: Dict[str, Any]) -> None:
+        try:
+            stream_ref.set(partial)
+        except Exception:
+            pass
+
+    cached = pulled["cache"]
+    if cached.get("key") == key and cached.get("output"):
+        output = cached["output"]
+        if stream_ref is not None:
+            publish({**output, "done": True})
+        if precompute:
+            output = {"ok": True, "key": key, "cached": True}
+        return func.HttpResponse(dumps(output), mimetype="application/json")
 
     try:
-        email = generate_followup_email(
-            sender, company_info, evaluation, months, completed_tasks
+        output = build_outcome(
+            company, months, pulled, publish if stream_ref is not None else None
         )
     except Exception as exc:
         return func.HttpResponse(
@@ -376,14 +536,25 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             mimetype="application/json",
         )
 
-    output = {
-        "from": sender.get("from"),
-        "subject": email.get("subject"),
-        "body": email.get("body"),
-        "status": evaluation.get("status"),
-        "estimated_revenue": evaluation.get("estimated_revenue"),
-        "summary": evaluation.get("summary"),
-        "months": months,
-    }
+    if stream_ref is not None:
+        publish({**output, "done": True})
+    try:
+        # keyed on months and the completed work, so a later completion misses
+        cache_ref(company).set(
+            {
+                "key": key,
+                "months": months,
+                "work_hash": pulled["work_hash"],
+                "output": output,
+                "created": firestore.SERVER_TIMESTAMP,
+            }
+        )
+    except Exception:
+        pass
 
+    if precompute:
+        return func.HttpResponse(
+            dumps({"ok": True, "key": key, "cached": False}),
+            mimetype="application/json",
+        )
     return func.HttpResponse(dumps(output), mimetype="application/json")
@@ -6,6 +6,7 @@ from azure.identity import DefaultAzureCredential
 from azure.keyvault.secrets import SecretClient
 from firebase_admin import credentials, initialize_app, firestore
 from openai import AzureOpenAI
+from shared_code.prompts import context_block, layered_messages, record_usage
 
 vault_url = "https://kv-strtupifyio.vault.azure.net/"
 credential = DefaultAzureCredential()
@@ -25,6 +26,22 @@ if not firebase_admin._apps:
 db = firestore.client()
 
 
+KICKOFF_INSTRUCTIONS = (
+    "You are an employee at a startup. "
+    "In an earlier meeting, you and the rest of the employees came up with the first product. "
+    "You need to come up with the body of a kickoff email to the company's founder. "
+    "You don't know the founder's name, so just avoid using it. "
+    "Do not use any kind of template like 'Dear [Name]' or 'To whom it may concern'. "
+    "Your email should describe the project that was come up with, "
+    "followed by assignments for what each of the employees are going to be working on, "
+    "followed by a sign-off note asking for approval on plan."
+    "Reply in JSON format with an overall key of 'email', and then within that object, "
+    "There should me a key value pair of 'body' with the text of the email, "
+    "and a key value of error, if there was any kind of issue processing the request. "
+    "The value of the error key should be and empty string if there is no error."
+)
+
+
 def pull_company_info(company):
     company_ref = db.collection("companies").document(company)
     company_info = company_ref.get()
@@ -82,6 +99,7 @@ def pick_sender(job_title_json):
             {"role": "user", "content": job_title_json},
         ],
     )
+    record_usage("kickoff_email.sender", response)
 
     sender_data = loads(response.choices[0].message.content)
     sender_name = sender_data["name"]
@@ -105,37 +123,27 @@ def gen_kickoff_email(
 
     subject = f"Kickoff Email for {company_name} - {product_name}"
 
-    system_message = (
-        f"Your name is {sender_name}, and you are a {sender_title} at {company_name}. "
-        f"Here is a brief description of what the company does: {company_description}. "
-        f"Here is some JSON with information on the employees at the company: \n\n{employee_json}\n\n"
-        "In an earlier meeting, you and the rest of the employees came up with the first product. "
-        f"\n\n{product_name}: {product_description}.\n\n"
+    context = context_block(
+        "Company",
+        {
+            "Name": company_name,
+            "Description": company_description,
+            "Product": f"{product_name}: {product_description}",
+            "Employees": employee_json,
+        },
     )
-
-    user_message = (
-        "You need to come up with the body of a kickoff email to the company's founder. "
-        "You don't know the founder's name, so just avoid using it. "
-        "Do not use any kind of template like 'Dear [Name]' or 'To whom it may concern'. "
-        "Your email should describe the project that was come up with, "
-        "followed by assignments for what each of the employees are going to be working on, "
-        "followed by a sign-off note asking for approval on plan."
-        "Reply in JSON format with an overall key of 'email', and then within that object, "
-        "There should me a key value pair of 'body' with the text of the email, "
-        "and a key value of error, if there was any kind of issue processing the request. "
-        "The value of the error key should be and empty string if there is no error."
+    messages = layered_messages(
+        KICKOFF_INSTRUCTIONS,
+        context,
+        turn=f"Your name is {sender_name}, and you are a {sender_title} at {company_name}. Write the email.",
     )
 
-    messages = [
-        {"role": "system", "content": system_message},
-        {"role": "user", "content": user_message},
-    ]
-
     response = client.chat.completions.create(
         model=deployment,
         response_format={"type": "json_object"},
         messages=messages,
     )
+    record_usage("kickoff_email", response)
 
     email = loads(response.choices[0].message.content)
 
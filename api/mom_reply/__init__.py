@@ -1,14 +1,17 @@
 import azure.functions as func
 import firebase_admin
 import json
+import re
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, Tuple
 
 from azure.identity import DefaultAzureCredential
 from azure.keyvault.secrets import SecretClient
 from firebase_admin import credentials, initialize_app, firestore
 from openai import OpenAI
 from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from shared_code.classify import classify_text
+from shared_code.intent_match import MOM_PRAISE_LEXICON, PhraseMatcher
 
 vault_url = "https://kv-strtupifyio.vault.azure.net/"
 credential = DefaultAzureCredential()
@@ -25,6 +28,11 @@ if not firebase_admin._apps:
     initialize_app(cred)
 db = firestore.client()
 
+PRAISE_MATCHER = PhraseMatcher(MOM_PRAISE_LEXICON)
+PRAISE_POINTS = 1.5  # 0-10 score per unit of lexicon weight
+GIFT_AMOUNT = 10000
+REPLIES_COLLECTION = "mom_replies"
+
 
 class EvaluationResult(BaseModel):
     model_config = ConfigDict(extra="forbid")
@@ -41,19 +49,58 @@ class ReplyDraft(BaseModel):
     body: str = Field(..., min_length=10, max_length=6000)
 
 
-def pull_company_info(company: str) -> Dict[str, Any]:
-    try:
-        ref = db.collection("companies").document(company)
-        snap = ref.get()
-        if not snap.exists:
-            return {}
-        data = snap.to_dict() or {}
-        return {
-            "company_name": data.get("company_name", ""),
-            "company_description": data.get("description", ""),
-        }
-    except Exception:
+class ReplyDrafts(BaseModel):
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+
+    no_money: str
+    needs_compliments: str
+    money: str
+
+
+class EvaluationWithDrafts(EvaluationResult):
+    drafts: ReplyDrafts
+
+
+REPLY_TONE = (
+    "Tone: superficially kind, worried, and mildly condescending (matching the mom_email function). "
+    "Keep it brief: 3-6 sentences. Avoid formal salutations like 'Dear'. "
+)
+
+MODE_GUIDANCE = {
+    "no_money": (
+        "Reply warmly but with that worried, condescending mom tone from the mom_email function. "
+        "Briefly acknowledge what they wrote, and casually ask if they need money without making it a big deal."
+    ),
+    "needs_compliments": (
+        "Reply with the same superficially kind but condescending tone. "
+        "Mention they are not very complimentary or grateful while they are asking for money. "
+        "Do not give money; hint they should be nicer."
+    ),
+    "grant": (
+        "Respond with glowing warmth and clear approval. "
+        "Confirm you are sending them $10,000 and act proud of their compliments. "
+        "Keep the mom_email voice (concerned, slightly overbearing)."
+    ),
+    "already_granted": (
+        "Gently but firmly note you already sent them money recently, and do not send more now. "
+        "Keep the condescending mom_email tone but stay warm."
+    ),
+}
+
+_GIFT_AMOUNT = re.compile(r"10,000|10000|10k|ten thousand", re.IGNORECASE)
+
+
+def company_summary(data: Dict[str, Any]) -> Dict[str, Any]:
+    if not data:
         return {}
+    return {
+        "company_name": data.get("company_name", ""),
+        "company_description": data.get("description", ""),
+    }
+
+
+def reply_key(email_id: str) -> str:
+    return email_id.replace("/", "_")[:500]
 
 
 def evaluate_request(message: str) -> Dict[str, Any]:
@@ -83,6 +130,121 @@ def evaluate_request(message: str) -> Dict[str, Any]:
     return parsed.model_dump()
 
 
+def evaluate_and_draft(
+    subject: str, message: str, already_granted: bool
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    One structured call that scores the email and drafts a reply for every
+    mode classify can still pick, so the server applies its own rule and
+    sends the matching draft without a second round-trip.
+    """
+    money_mode = "already_granted" if already_granted else "grant"
+    system_message = (
+        "You are the user's mother. First evaluate the email your adult child sent you: "
+        "decide if they are asking for money, and how effusive they are about you. "
+        "compliment_score measures flattery toward mom (0 = none, 10 = lavish praise). "
+        "gratitude_score measures thankfulness for past help. "
+        "If unsure, pick conservative lower scores. "
+        "Then write three alternative email replies; only one will be sent. "
+        + REPLY_TONE
+        + "drafts.no_money: "
+        + MODE_GUIDANCE["no_money"]
+        + " drafts.needs_compliments: "
+        + MODE_GUIDANCE["needs_compliments"]
+        + " drafts.money (sent when they asked and were complimentary enough): "
+        + MODE_GUIDANCE[money_mode]
+        + " Only drafts.money may mention a specific amount of money. Return only JSON."
+    )
+    user_message = "Subject: " + (subject or "(no subject)") + "\n\n" + (message or "(empty)")
+    completion = client.beta.chat.completions.parse(
+        model=deployment,
+        messages=[
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_message},
+        ],
+        temperature=0.2,
+        response_format=EvaluationWithDrafts,
+    )
+    parsed = completion.choices[0].message.parsed
+    if not isinstance(parsed, EvaluationWithDrafts):
+        raise ValueError("LLM evaluation parsing failure")
+    evaluation = parsed.model_dump(exclude={"drafts"})
+    drafts = {
+        "no_money": parsed.drafts.no_money,
+        "needs_compliments": parsed.drafts.needs_compliments,
+        money_mode: parsed.drafts.money,
+    }
+    return evaluation, drafts
+
+
+def evaluate_llm(
+    subject: str, message: str, already_granted: bool
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Combined call first; a malformed combined answer falls back to scoring only."""
+    try:
+        return evaluate_and_draft(subject, message, already_granted)
+    except (ValidationError, ValueError):
+        return evaluate_request(message), {}
+
+
+def pick_draft(drafts: Dict[str, str], mode: str) -> str | None:
+    """
+    The pre-written reply for mode, or None when it is missing, malformed, or
+    contradicts the mode (a grant that never names the gift, or another reply
+    that promises it).
+    """
+    try:
+        body = ReplyDraft(body=drafts.get(mode) or "").body
+    except ValidationError:
+        return None
+    if bool(_GIFT_AMOUNT.search(body)) != (mode == "grant"):
+        return None
+    return body
+
+
+def rule_evaluation(message: str, asked: bool) -> Dict[str, Any]:
+    scores = PRAISE_MATCHER.scores(message or "")
+    return {
+        "asked_for_money": asked,
+        "compliment_score": min(10.0, PRAISE_POINTS * scores["compliment"]),
+        "gratitude_score": min(10.0, PRAISE_POINTS * scores["gratitude"]),
+        "summary": "",
+    }
+
+
+def evaluate_tiered(
+    subject: str, message: str, already_granted: bool
+) -> Tuple[Dict[str, Any], str, Dict[str, str]]:
+    """
+    Settle the money question with the shared classifier. Messages that are
+    clearly not asking, or asking without any praise, are scored locally;
+    only a request that might earn the gift goes to the LLM, so a grant is
+    always an LLM decision. LLM evaluations come with reply drafts.
+    """
+    drafts: Dict[str, str] = {}
+
+    def llm(_text: str):
+        evaluation, written = evaluate_llm(subject, message, already_granted)
+        drafts.update(written)
+        label = "money" if evaluation.get("asked_for_money") else "no_money"
+        return label, 1.0, evaluation
+
+    result = classify_text("mom_money", message or "", llm=llm)
+    if result["tier"] == "llm":
+        return result["payload"], "llm", drafts
+    evaluation = rule_evaluation(message, result["label"] == "money")
+    if evaluation["asked_for_money"] and (
+        evaluation["compliment_score"] or evaluation["gratitude_score"]
+    ):
+        if result["tier"] != "fallback":
+            evaluation, drafts = evaluate_llm(subject, message, already_granted)
+            return evaluation, "llm", drafts
+        # the LLM is down: never grant from rule scores
+        evaluation["compliment_score"] = min(evaluation["compliment_score"], 6.0)
+        evaluation["gratitude_score"] = min(evaluation["gratitude_score"], 6.0)
+    return evaluation, result["tier"], drafts
+
+
 def classify(evaluation: Dict[str, Any], already_granted: bool) -> str:
     asked = bool(evaluation.get("asked_for_money"))
     compliment_score = float(evaluation.get("compliment_score", 0) or 0)
@@ -101,31 +263,10 @@ def classify(evaluation: Dict[str, Any], already_granted: bool) -> str:
 
 
 def craft_reply(mode: str, subject: str, original: str, evaluation: Dict[str, Any]) -> str:
-    guidance = {
-        "no_money": (
-            "Reply warmly but with that worried, condescending mom tone from the mom_email function. "
-            "Briefly acknowledge what they wrote, and casually ask if they need money without making it a big deal."
-        ),
-        "needs_compliments": (
-            "Reply with the same superficially kind but condescending tone. "
-            "Mention they are not very complimentary or grateful while they are asking for money. "
-            "Do not give money; hint they should be nicer."
-        ),
-        "grant": (
-            "Respond with glowing warmth and clear approval. "
-            "Confirm you are sending them $10,000 and act proud of their compliments. "
-            "Keep the mom_email voice (concerned, slightly overbearing)."
-        ),
-        "already_granted": (
-            "Gently but firmly note you already sent them money recently, and do not send more now. "
-            "Keep the condescending mom_email tone but stay warm."
-        ),
-    }
     system_message = (
         "You are the user's mother replying over email. "
-        "Tone: superficially kind, worried, and mildly condescending (matching the mom_email function). "
-        "Keep it brief: 3-6 sentences. Avoid formal salutations like 'Dear'. "
-        + guidance.get(mode, guidance["no_money"])
+        + REPLY_TONE
+        + MODE_GUIDANCE.get(mode, MODE_GUIDANCE["no_money"])
     )
     user_message = (
         "Subject: " + (subject or "(no subject)") + "\n\n"
@@ -147,6 +288,49 @@ def craft_reply(mode: str, subject: str, original: str, evaluation: Dict[str, An
     return parsed.body
 
 
+def settle_grant(
+    company_ref, reply_ref, evaluation: Dict[str, Any], record: Dict[str, Any]
+) -> Tuple[str, Dict[str, Any] | None]:
+    """
+    Decide the mode against the company doc as it is at commit time and, for
+    a grant, set momGiftGranted in the same transaction, so concurrent replies
+    cannot each send the gift. With a reply_ref the decision is recorded under
+    the inbound email id; a decision already recorded there wins and is
+    returned instead.
+    """
+    tr = db.transaction()
+
+    @firestore.transactional
+    def txn(transaction):
+        company_snap = company_ref.get(transaction=transaction)
+        prior = None
+        if reply_ref is not None:
+            reply_snap = reply_ref.get(transaction=transaction)
+            prior = reply_snap.to_dict() if reply_snap.exists else None
+        if prior and prior.get("mode"):
+            return str(prior["mode"]), prior
+        data = company_snap.to_dict() if company_snap.exists else {}
+        mode = classify(evaluation, bool((data or {}).get("momGiftGranted")))
+        if mode == "grant":
+            transaction.set(
+                company_ref,
+                {
+                    "momGiftGranted": True,
+                    "momGiftGrantedAt": datetime.utcnow().isoformat() + "Z",
+                    "ledgerEnabled": True,
+                },
+                merge=True,
+            )
+        if reply_ref is not None:
+            transaction.set(
+                reply_ref,
+                {**record, "mode": mode, "created": firestore.SERVER_TIMESTAMP},
+            )
+        return mode, None
+
+    return txn(tr)
+
+
 def main(req: func.HttpRequest) -> func.HttpResponse:
     body = req.get_json()
     company = body.get("company") or body.get("name")
@@ -156,18 +340,62 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     if not company or not subject:
         return func.HttpResponse(json.dumps({"error": "missing fields"}), status_code=400)
 
+    email_id = str(body.get("emailId") or body.get("email_id") or "").strip()
     company_ref = db.collection("companies").document(company)
-    company_info = pull_company_info(company)
-    grant_state = company_ref.get()
-    already_granted = False
-    if grant_state.exists:
-        grant_data = grant_state.to_dict() or {}
-        already_granted = bool(grant_data.get("momGiftGranted"))
+    reply_ref = (
+        company_ref.collection(REPLIES_COLLECTION).document(reply_key(email_id))
+        if email_id
+        else None
+    )
+    record: Dict[str, Any] = {}
+    if reply_ref is not None:
+        try:
+            snap = reply_ref.get()
+            record = (snap.to_dict() or {}) if snap.exists else {}
+        except Exception:
+            record = {}
+        if record.get("response"):
+            return func.HttpResponse(
+                json.dumps(record["response"], ensure_ascii=False),
+                mimetype="application/json",
+            )
+
+    company_snap = company_ref.get()
+    company_data = (company_snap.to_dict() or {}) if company_snap.exists else {}
+    company_info = company_summary(company_data)
+    already_granted = bool(company_data.get("momGiftGranted"))
 
     try:
-        evaluation = evaluate_request(message)
-        mode = classify(evaluation, already_granted)
-        email_body = craft_reply(mode, subject, message, evaluation)
+        if record.get("mode"):
+            # a retry after the decision was recorded: reuse it, skip evaluation
+            mode = str(record["mode"])
+            evaluation = record.get("evaluation") or {}
+            evaluation_source = str(record.get("evaluationSource") or "llm")
+            drafts = record.get("drafts") or {}
+        else:
+            evaluation, evaluation_source, drafts = evaluate_tiered(
+                subject, message, already_granted
+            )
+            mode = classify(evaluation, already_granted)
+            if mode == "grant" or reply_ref is not None:
+                mode, prior = settle_grant(
+                    company_ref,
+                    reply_ref,
+                    evaluation,
+                    {
+                        "evaluation": evaluation,
+                        "evaluationSource": evaluation_source,
+                        "drafts": drafts,
+                    },
+                )
+                if prior:
+                    evaluation = prior.get("evaluation") or evaluation
+                    evaluation_source = str(prior.get("evaluationSource") or evaluation_source)
+                    drafts = prior.get("drafts") or {}
+        email_body = pick_draft(drafts, mode)
+        reply_source = "combined" if email_body else "two_step"
+        if not email_body:
+            email_body = craft_reply(mode, subject, message, evaluation)
     except (ValidationError, ValueError) as e:
         return func.HttpResponse(
             json.dumps({"error": "llm_parse_failure", "message": str(e)}),
@@ -181,29 +409,23 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             mimetype="application/json",
         )
 
-    grant_amount = 10000 if mode == "grant" else 0
-    if mode == "grant":
-        try:
-            company_ref.set(
-                {
-                    "momGiftGranted": True,
-                    "momGiftGrantedAt": datetime.utcnow().isoformat() + "Z",
-                    "ledgerEnabled": True,
-                },
-                merge=True,
-            )
-        except Exception:
-            pass
-
+    grant_amount = GIFT_AMOUNT if mode == "grant" else 0
     out = {
         "from": "mom@altavista.net",
         "subject": subject,
         "body": email_body,
         "status": mode,
         "evaluation": evaluation,
+        "evaluationSource": evaluation_source,
+        "replySource": reply_source,
         "company": company_info,
         "grant": mode == "grant",
         "amount": grant_amount,
         "ledgerMemo": "Gift from Mom" if mode == "grant" else "",
     }
+    if reply_ref is not None:
+        try:
+            reply_ref.set({"response": out}, merge=True)
+        except Exception:
+            pass
     return func.HttpResponse(json.dumps(out, ensure_ascii=False), mimetype="application/json")
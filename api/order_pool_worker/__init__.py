@@ -0,0 +1,37 @@
+import azure.functions as func
+import firebase_admin
+import json
+import logging
+
+from azure.identity import DefaultAzureCredential
+from azure.keyvault.secrets import SecretClient
+from firebase_admin import credentials, firestore, initialize_app
+from openai import OpenAI
+from shared_code.order_pool import POOL_LOW_WATER, parse_refill_message, refill_pool
+
+vault_url = "https://kv-strtupifyio.vault.azure.net/"
+credential = DefaultAzureCredential()
+secret_client = SecretClient(vault_url=vault_url, credential=credential)
+
+endpoint = secret_client.get_secret("AIEndpoint").value.rstrip("/")
+api_key = secret_client.get_secret("AIKey").value
+deployment = secret_client.get_secret("AIDeploymentMini").value
+client = OpenAI(api_key=api_key, base_url=f"{endpoint}/openai/v1/")
+
+firestore_sdk = secret_client.get_secret("FirebaseSDK").value
+cred = credentials.Certificate(json.loads(firestore_sdk))
+if not firebase_admin._apps:
+    initialize_app(cred)
+db = firestore.client()
+
+logger = logging.getLogger("order_pool_worker")
+
+
+def main(msg: func.QueueMessage) -> None:
+    company_id = parse_refill_message(msg.get_body())
+    if company_id is None:
+        logger.warning("Dropping malformed order pool message")
+        return
+    # errors propagate so the queue retries the refill instead of losing it
+    added = refill_pool(db, client, deployment, company_id, only_below=POOL_LOW_WATER + 1)
+    logger.info("Order pool refill for %s added %d orders", company_id, added)
@@ -8,6 +8,11 @@ from json import dumps, loads
 from openai import AzureOpenAI
 from random import choice, gauss, randint, random
 from requests import get
+from shared_code.speaker_weights import (
+    ASSERTIVE_ANCHOR,
+    RESERVED_ANCHOR,
+    personality_baseline,
+)
 
 vault_url = "https://kv-strtupifyio.vault.azure.net/"
 credential = DefaultAzureCredential()
@@ -16,6 +21,7 @@ secret_client = SecretClient(vault_url=vault_url, credential=credential)
 endpoint = secret_client.get_secret("AIEndpoint").value
 api_key = secret_client.get_secret("AIKey").value
 deployment = secret_client.get_secret("AIDeploymentMini").value
+embed_deployment = secret_client.get_secret("AIDeploymentEmbedding").value
 client = AzureOpenAI(
     api_version="2023-07-01-preview", azure_endpoint=endpoint, api_key=api_key
 )
@@ -26,6 +32,8 @@ if not firebase_admin._apps:
     initialize_app(cred)
 db = firestore.client()
 
+anchor_embeddings = {}
+
 
 def pull_name(male_only: bool = False):
     url = "https://randomuser.me/api/?nat=us"
@@ -117,6 +125,25 @@ def gen_personality(name):
     return personality
 
 
+def embed(text):
+    response = client.embeddings.create(model=embed_deployment, input=text)
+    return response.data[0].embedding
+
+
+def gen_speak_baseline(personality):
+    try:
+        if not anchor_embeddings:
+            anchor_embeddings["assertive"] = embed(ASSERTIVE_ANCHOR)
+            anchor_embeddings["reserved"] = embed(RESERVED_ANCHOR)
+        return personality_baseline(
+            embed(personality),
+            anchor_embeddings["assertive"],
+            anchor_embeddings["reserved"],
+        )
+    except Exception:
+        return None
+
+
 def gen_salary(job_title, skills):
     system_message = (
         "You are a salary generator. When given the title of a job, "
@@ -198,6 +225,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     skills = role_data.get("skills", [])
     name, gender = pull_name(male_only=is_ai_generated)
     personality = gen_personality(name)
+    speak_baseline = gen_speak_baseline(personality)
     skill_data = []
     for s in skills:
         skill_data.append(
@@ -240,6 +268,11 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             "avatarContainer": avatar_container,
             "salary": salary,
             "personality": personality,
+            **(
+                {"speakBaseline": speak_baseline}
+                if speak_baseline is not None
+                else {}
+            ),
             "hired": False,
             "aiRole": is_ai_generated,
             "created": firestore.SERVER_TIMESTAMP,
@@ -0,0 +1,70 @@
+import re
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+# company doc field mapping index_key(local part) -> employee id
+ADDRESS_INDEX_FIELD = "employee_addresses"
+
+
+def normalize_address(raw: str) -> str:
+    text = (raw or "").strip().lower()
+    if not text:
+        return ""
+    match = re.search(r"<([^>]+)>", text)
+    if match:
+        text = match.group(1)
+    return text.strip()
+
+
+def normalize_domain(source: str, fallback: str = "strtupify") -> str:
+    cleaned = re.sub(r"[^a-z0-9]", "", (source or "").lower())
+    return cleaned or fallback
+
+
+def company_domain(company_id: str, data: Mapping[str, Any]) -> str:
+    source = str(data.get("company_name") or company_id)
+    return f"{normalize_domain(source, normalize_domain(company_id))}.com"
+
+
+def worker_localpart(name: str, fallback: str = "teammate") -> str:
+    base = re.sub(r"[^a-z0-9]+", ".", (name or "").strip().lower()).strip(".")
+    return base or fallback
+
+
+def build_worker_address(name: str, domain: str) -> str:
+    return f"{worker_localpart(name)}@{domain}"
+
+
+def index_key(localpart: str) -> str:
+    """
+    Map key for a local part. Local parts are [a-z0-9.] only, so swapping dots
+    for underscores cannot collide and keeps Firestore from reading the key as
+    a field path.
+    """
+    return localpart.replace(".", "_")
+
+
+def index_entries(emp_id: str, name: str) -> Dict[str, str]:
+    """Index keys for an employee: the name-based address and the id alias."""
+    return {
+        index_key(worker_localpart(name or emp_id)): emp_id,
+        index_key(worker_localpart(emp_id)): emp_id,
+    }
+
+
+def build_address_index(employees: Iterable[Tuple[str, Mapping[str, Any]]]) -> Dict[str, str]:
+    index: Dict[str, str] = {}
+    for emp_id, data in employees:
+        for key, value in index_entries(emp_id, str(data.get("name") or emp_id)).items():
+            index.setdefault(key, value)
+    return index
+
+
+def lookup_address(
+    index: Mapping[str, Any], target: str, domain: str
+) -> Optional[str]:
+    """Employee id for target if it is an indexed address on the company domain."""
+    local, _, target_domain = normalize_address(target).partition("@")
+    if not local or "_" in local or target_domain != domain:
+        return None
+    emp_id = index.get(index_key(local))
+    return str(emp_id) if emp_id else None
@@ -0,0 +1,188 @@
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from shared_code.rate_model import MAX_RATE, MIN_RATE
+from shared_code.schedule import topological_order
+
+MAX_ROUNDS = 60
+# small weight on total hours so equal-makespan moves still prefer faster people
+TOTAL_HOURS_WEIGHT = 1e-3
+
+
+def durations(rates: np.ndarray, capacity: Optional[np.ndarray] = None) -> np.ndarray:
+    """Hours per (item, employee), the same rounding as hours_from_rate."""
+    rates = np.clip(np.asarray(rates, dtype=np.float64), MIN_RATE, MAX_RATE)
+    hours = np.maximum(1.0, np.round(100.0 / rates))
+    if capacity is not None:
+        cap = np.clip(np.asarray(capacity, dtype=np.float64), 1e-3, None)
+        hours = hours / cap[None, :]
+    return hours
+
+
+def makespans(
+    assign: np.ndarray,
+    hours: np.ndarray,
+    preds: Sequence[np.ndarray],
+    order: Sequence[int],
+    free: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Makespan of M candidate assignments at once (assign has shape (M, N)).
+    Items run in the given topological order, after their blockers and one at
+    a time per employee, exactly like compute_schedule; each step is one
+    vectorized update across all candidates.
+    """
+    assign = np.atleast_2d(assign)
+    m, n = assign.shape
+    n_emps = hours.shape[1]
+    start_free = np.zeros(n_emps) if free is None else np.asarray(free, dtype=np.float64)
+    ready = np.tile(start_free, (m, 1))
+    finish = np.zeros((m, n))
+    rows = np.arange(m)
+    for i in order:
+        emp = assign[:, i]
+        start = ready[rows, emp]
+        if len(preds[i]):
+            start = np.maximum(start, finish[:, preds[i]].max(axis=1))
+        done = start + hours[i, emp]
+        finish[:, i] = done
+        ready[rows, emp] = done
+    return finish.max(axis=1) if n else np.zeros(m)
+
+
+def _objective(assign: np.ndarray, hours, preds, order, free) -> np.ndarray:
+    assign = np.atleast_2d(assign)
+    total = hours[np.arange(hours.shape[0])[None, :], assign].sum(axis=1)
+    return makespans(assign, hours, preds, order, free) + TOTAL_HOURS_WEIGHT * total
+
+
+def _list_schedule(hours, preds, order, fixed, free) -> np.ndarray:
+    """Earliest-finish-time list scheduling (HEFT without insertion)."""
+    n, n_emps = hours.shape
+    ready = np.zeros(n_emps)
+    if free is not None:
+        ready = np.asarray(free, dtype=np.float64).copy()
+    finish = np.zeros(n)
+    assign = np.zeros(n, dtype=np.int64)
+    for i in order:
+        earliest = finish[preds[i]].max() if len(preds[i]) else 0.0
+        eft = np.maximum(ready, earliest) + hours[i]
+        emp = int(fixed[i]) if fixed[i] >= 0 else int(np.argmin(eft))
+        assign[i] = emp
+        finish[i] = eft[emp]
+        ready[emp] = finish[i]
+    return assign
+
+
+def _dag(blockers: Sequence[Sequence[int]], n: int) -> Tuple[List[np.ndarray], List[int]]:
+    """Predecessor arrays and a topological order; a cycle falls back to input order."""
+    clean = [
+        sorted({int(b) for b in bl if 0 <= int(b) < n and int(b) != i})
+        for i, bl in enumerate(blockers)
+    ]
+    try:
+        nodes = [{"id": i, "blockers": clean[i]} for i in range(n)]
+        order = [int(i) for i in topological_order(nodes)]
+    except ValueError:
+        clean = [[b for b in bl if b < i] for i, bl in enumerate(clean)]
+        order = list(range(n))
+    return [np.asarray(bl, dtype=np.int64) for bl in clean], order
+
+
+def solve_assignment(
+    rates: np.ndarray,
+    blockers: Sequence[Sequence[int]],
+    fixed: Optional[Sequence[int]] = None,
+    capacity: Optional[np.ndarray] = None,
+    free: Optional[np.ndarray] = None,
+    max_rounds: int = MAX_ROUNDS,
+) -> Dict[str, Any]:
+    """
+    Assign items (rows of rates) to employees (columns) to minimise projected
+    makespan. Starts from the better of per-item argmax and EFT list
+    scheduling, then runs best-improvement local search over single-item
+    moves, scoring every candidate move in one batched pass. fixed holds an
+    employee index per item, or -1 where the solver may choose.
+    """
+    rates = np.asarray(rates, dtype=np.float64)
+    n, n_emps = rates.shape
+    hours = durations(rates, capacity)
+    preds, order = _dag(blockers, n)
+    fixed_arr = np.full(n, -1, dtype=np.int64)
+    if fixed is not None:
+        fixed_arr = np.asarray(fixed, dtype=np.int64)
+    if n == 0 or n_emps == 0:
+        return {"assignee": fixed_arr, "makespan": 0.0, "argmax_makespan": 0.0, "rounds": 0}
+
+    greedy = np.where(fixed_arr >= 0, fixed_arr, np.argmax(rates, axis=1))
+    starts = np.stack([greedy, _list_schedule(hours, preds, order, fixed_arr, free)])
+    scores = _objective(starts, hours, preds, order, free)
+    current = starts[int(np.argmin(scores))].copy()
+    best = float(scores.min())
+
+    movable = np.flatnonzero(fixed_arr < 0)
+    rounds = 0
+    while rounds < max_rounds and len(movable) and n_emps > 1:
+        rounds += 1
+        items = np.repeat(movable, n_emps)
+        emps = np.tile(np.arange(n_emps), len(movable))
+        keep = current[items] != emps
+        items, emps = items[keep], emps[keep]
+        cands = np.tile(current, (len(items), 1))
+        cands[np.arange(len(items)), items] = emps
+        scores = _objective(cands, hours, preds, order, free)
+        k = int(np.argmin(scores))
+        if scores[k] >= best - 1e-9:
+            break
+        best = float(scores[k])
+        current = cands[k]
+
+    return {
+        "assignee": current,
+        "makespan": float(makespans(current, hours, preds, order, free)[0]),
+        "argmax_makespan": float(makespans(greedy, hours, preds, order, free)[0]),
+        "rounds": rounds,
+    }
+
+
+def assign_workitems(
+    workitems: Sequence[Mapping[str, Any]],
+    employee_ids: Sequence[str],
+    assignments: Mapping[str, Mapping[str, float]],
+    reassign: bool = False,
+    capacity: Optional[Mapping[str, float]] = None,
+) -> Dict[str, str]:
+    """
+    Choose assignees for unfinished work items from the rate matrix. Items
+    that already have an assignee keep it and constrain the schedule, unless
+    reassign is set and the item has not been started yet. Returns work item
+    id -> employee id for every item the solver placed.
+    """
+    items = [it for it in workitems if str(it.get("status") or "").lower() != "done"]
+    if not items or not employee_ids:
+        return {}
+    emp_index = {str(eid): k for k, eid in enumerate(employee_ids)}
+    item_index = {str(it["id"]): i for i, it in enumerate(items)}
+    rates = np.full((len(items), len(employee_ids)), MIN_RATE)
+    for i, it in enumerate(items):
+        for eid, rate in (assignments.get(str(it["id"])) or {}).items():
+            if str(eid) in emp_index:
+                rates[i, emp_index[str(eid)]] = rate
+    blockers = [
+        [item_index[str(b)] for b in it.get("blockers") or [] if str(b) in item_index]
+        for it in items
+    ]
+    fixed = []
+    for it in items:
+        movable = reassign and str(it.get("status") or "todo").lower() == "todo"
+        fixed.append(-1 if movable else emp_index.get(str(it.get("assignee_id") or ""), -1))
+    cap = None
+    if capacity:
+        cap = np.asarray([float(capacity.get(eid, 1.0)) for eid in employee_ids])
+    result = solve_assignment(rates, blockers, fixed, cap)
+    return {
+        str(it["id"]): str(employee_ids[int(result["assignee"][i])])
+        for i, it in enumerate(items)
+        if fixed[i] < 0
+    }
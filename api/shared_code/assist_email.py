@@ -0,0 +1,220 @@
+import json
+import logging
+from typing import Any, Callable, Dict, List, Mapping
+
+from pydantic import BaseModel, ConfigDict, Field
+from shared_code.addresses import company_domain, worker_localpart
+
+ASSIST_MAX_TOKENS = 2048
+ASSIST_BATCH_MAX_TOKENS = 6144
+
+logger = logging.getLogger("assist_email")
+
+SYSTEM_MESSAGE = (
+    "You are roleplaying a teammate who paused work on a startup deliverable. "
+    "You don't know the founder's name, so just avoid using it. "
+    "Do not use any kind of template like 'Dear [Name]' or 'To whom it may concern'. "
+    "Write a concise, human email to the founder explaining the blocker and ask exactly one question. "
+    "The blocker should be something the founder can easily answer in one reply, without expert knowledge. "
+    "Return only JSON that matches the schema."
+)
+
+BATCH_SYSTEM_MESSAGE = (
+    SYSTEM_MESSAGE
+    + " You will receive several work items; write one email per item, each from "
+    "that item's assignee, and echo every workitem_id exactly once."
+)
+
+INSTRUCTIONS = {
+    "focus": "Explain why progress is paused and ask the founder for input.",
+    "question_requirements": "Ask a single, concrete question the founder can answer in one reply.",
+    "tone": "Respectful, collaborative, concise.",
+}
+
+
+class ProductInfo(BaseModel):
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+
+    name: str = Field(..., min_length=1, max_length=200)
+    description: str = Field(..., min_length=1, max_length=5000)
+
+
+class AssigneeInfo(BaseModel):
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+
+    name: str | None = Field(default=None, max_length=200)
+    title: str | None = Field(default=None, max_length=200)
+
+
+class WorkItemInfo(BaseModel):
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+
+    id: str | None = Field(default=None, max_length=200)
+    title: str = Field(..., min_length=1, max_length=300)
+    description: str = Field(..., min_length=1, max_length=6000)
+    category: str | None = Field(default=None, max_length=200)
+    assignee: AssigneeInfo | None = None
+
+
+class WorkerAssistEmail(BaseModel):
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+
+    subject: str = Field(..., min_length=5, max_length=300)
+    body: str = Field(..., min_length=40, max_length=6000)
+    question: str = Field(..., min_length=5, max_length=400)
+    pause_reason: str = Field(..., min_length=5, max_length=300)
+    tone: str = Field(..., min_length=3, max_length=60)
+    confidence: float = Field(..., ge=0.0, le=1.0)
+
+
+class AssistEmailResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+
+    summary: str = Field(..., min_length=10, max_length=400)
+    email: WorkerAssistEmail
+    talking_points: list[str] = Field(default_factory=list)
+
+
+class BatchAssistEmail(AssistEmailResponse):
+    workitem_id: str = Field(..., min_length=1, max_length=200)
+
+
+class AssistEmailBatch(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    emails: list[BatchAssistEmail]
+
+
+def company_identity(company_id: str, data: Dict[str, Any]) -> Dict[str, str]:
+    company_name = str(data.get("company_name") or company_id).strip()
+    domain = company_domain(company_id, data)
+    return {
+        "name": company_name or company_id,
+        "domain": domain,
+        "me_address": f"me@{domain}",
+    }
+
+
+def llm_payload(
+    company: Dict[str, str], product: ProductInfo, workitem: WorkItemInfo
+) -> Dict[str, Any]:
+    return {
+        "company": {"name": company.get("name"), "domain": company.get("domain")},
+        "product": product.model_dump(),
+        "workitem": workitem.model_dump(),
+        "instructions": INSTRUCTIONS,
+    }
+
+
+def batch_llm_payload(
+    company: Dict[str, str], product: ProductInfo, workitems: List[WorkItemInfo]
+) -> Dict[str, Any]:
+    return {
+        "company": {"name": company.get("name"), "domain": company.get("domain")},
+        "product": product.model_dump(),
+        "workitems": [
+            {"workitem_id": wi.id, **wi.model_dump(exclude={"id"})} for wi in workitems
+        ],
+        "instructions": INSTRUCTIONS,
+    }
+
+
+def format_email(
+    parsed: AssistEmailResponse, assignee: AssigneeInfo, company: Dict[str, str]
+) -> Dict[str, Any]:
+    """Response shape of workitem_assist_email, also stored as a queued draft."""
+    sender_name = (assignee.name or "").strip() or "Product Teammate"
+    sender_title = (assignee.title or "").strip() or "Contributor"
+    from_address = f"{worker_localpart(sender_name, 'team')}@{company['domain']}"
+    return {
+        "ok": True,
+        "email": {
+            "from": from_address,
+            "sender_name": sender_name,
+            "sender_title": sender_title,
+            "subject": parsed.email.subject,
+            "body": parsed.email.body,
+            "question": parsed.email.question,
+            "pause_reason": parsed.email.pause_reason,
+            "tone": parsed.email.tone,
+            "confidence": parsed.email.confidence,
+        },
+        "summary": parsed.summary,
+        "talking_points": parsed.talking_points,
+        "company": company,
+    }
+
+
+def call_assist_email(client: Any, model: str, payload: Dict[str, Any]) -> AssistEmailResponse:
+    completion = client.beta.chat.completions.parse(
+        model=model,
+        messages=[
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+        ],
+        temperature=0.6,
+        top_p=0.9,
+        max_tokens=ASSIST_MAX_TOKENS,
+        response_format=AssistEmailResponse,
+    )
+    parsed = completion.choices[0].message.parsed
+    if not isinstance(parsed, AssistEmailResponse):
+        raise ValueError("LLM parsing failure")
+    return parsed
+
+
+def call_assist_batch(
+    client: Any, model: str, payload: Dict[str, Any]
+) -> Dict[str, AssistEmailResponse]:
+    completion = client.beta.chat.completions.parse(
+        model=model,
+        messages=[
+            {"role": "system", "content": BATCH_SYSTEM_MESSAGE},
+            {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+        ],
+        temperature=0.6,
+        top_p=0.9,
+        max_tokens=ASSIST_BATCH_MAX_TOKENS,
+        response_format=AssistEmailBatch,
+    )
+    parsed = completion.choices[0].message.parsed
+    if not isinstance(parsed, AssistEmailBatch):
+        raise ValueError("LLM parsing failure")
+    return {
+        e.workitem_id: AssistEmailResponse(
+            summary=e.summary, email=e.email, talking_points=e.talking_points
+        )
+        for e in parsed.emails
+    }
+
+
+def draft_emails(
+    company: Dict[str, str],
+    product: ProductInfo,
+    infos: Mapping[str, WorkItemInfo],
+    single: Callable[[Dict[str, Any]], AssistEmailResponse],
+    batch: Callable[[Dict[str, Any]], Dict[str, AssistEmailResponse]],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Formatted drafts keyed by work item id. Several items share one batch
+    call; items the batch answer leaves out are retried one at a time, and
+    items that still fail are left without a draft.
+    """
+    results: Dict[str, AssistEmailResponse] = {}
+    if len(infos) > 1:
+        try:
+            results = batch(batch_llm_payload(company, product, list(infos.values())))
+        except Exception as exc:
+            logger.warning("Batch assist generation failed for %s: %s", company.get("name"), exc)
+    for wid, info in infos.items():
+        if wid in results:
+            continue
+        try:
+            results[wid] = single(llm_payload(company, product, info))
+        except Exception as exc:
+            logger.warning("Assist generation failed for %s/%s: %s", company.get("name"), wid, exc)
+    return {
+        wid: format_email(parsed, infos[wid].assignee or AssigneeInfo(), company)
+        for wid, parsed in results.items()
+        if wid in infos
+    }
@@ -0,0 +1,102 @@
+import json
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+ASSIST_QUEUE = "assist-email"
+ASSIST_BATCH_SIZE = 4
+
+
+def assist_messages(
+    company: str,
+    items: Sequence[Mapping[str, Any]],
+    batch_size: int = ASSIST_BATCH_SIZE,
+) -> List[str]:
+    """
+    Queue messages for the items that drew an assist trigger at plan time,
+    grouped per company so the worker can write several emails per LLM call.
+    """
+    ids = [
+        str(it.get("doc_id") or it.get("id"))
+        for it in items
+        if it.get("assist_trigger_pct") is not None
+    ]
+    size = max(1, int(batch_size))
+    return [
+        json.dumps({"company": company, "items": ids[i : i + size]})
+        for i in range(0, len(ids), size)
+    ]
+
+
+def parse_message(body: Any) -> Optional[Dict[str, Any]]:
+    if isinstance(body, (bytes, bytearray)):
+        body = body.decode("utf-8")
+    if isinstance(body, str):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            return None
+    if not isinstance(body, dict):
+        return None
+    company = str(body.get("company") or "").strip()
+    items = [str(i) for i in body.get("items") or [] if str(i).strip()]
+    if not company or not items:
+        return None
+    return {"company": company, "items": list(dict.fromkeys(items))}
+
+
+class InProcessQueue:
+    """
+    Local stand-in for the Storage queue. It accepts values the way a
+    func.Out binding does (a string or a list of strings), so it can be passed
+    straight to a function's main() in harnesses.
+    """
+
+    def __init__(self):
+        self._messages: deque = deque()
+        self.sent = 0
+
+    def set(self, value: Any) -> None:
+        values = value if isinstance(value, (list, tuple)) else [value]
+        for v in values:
+            self._messages.append(v)
+            self.sent += 1
+
+    def get(self) -> List[Any]:
+        return list(self._messages)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def receive(self, max_messages: int = 32) -> List[Any]:
+        out = []
+        while self._messages and len(out) < max_messages:
+            out.append(self._messages.popleft())
+        return out
+
+    def drain(self, handler: Callable[[Dict[str, Any]], Any]) -> int:
+        """Deliver every queued message to handler; returns how many ran."""
+        handled = 0
+        while self._messages:
+            msg = parse_message(self._messages.popleft())
+            if msg is None:
+                continue
+            handler(msg)
+            handled += 1
+        return handled
+
+
+def pending_items(
+    requested: Iterable[str], items: Mapping[str, Mapping[str, Any]]
+) -> List[str]:
+    """Items that still need a draft: present, triggered, not drafted or sent."""
+    out = []
+    for wid in requested:
+        it = items.get(wid)
+        if not it or it.get("assist_trigger_pct") is None:
+            continue
+        if it.get("assist_draft") or it.get("assist_last_sent_at"):
+            continue
+        if str(it.get("status") or "todo") == "done":
+            continue
+        out.append(wid)
+    return out
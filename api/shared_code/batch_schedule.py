@@ -0,0 +1,193 @@
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from shared_code.schedule import SIM_CALENDAR, WorkCalendar
+
+
+def pack_companies(
+    companies: Sequence[Sequence[Mapping[str, Any]]],
+    hours_key: str = "best_hours",
+    assignee_key: str = "assignee_name",
+    max_blockers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Turn per-company work item lists into padded arrays for batch_schedule.
+
+    Items must already be in topological order (as the planner emits them);
+    blockers that point at later or unknown items are dropped, the same way
+    the loop scheduler ignores blockers that have not finished yet.
+    """
+    n_companies = len(companies)
+    width = max((len(items) for items in companies), default=0)
+    if max_blockers is None:
+        max_blockers = max(
+            (len(it.get("blockers") or []) for items in companies for it in items),
+            default=0,
+        )
+    durations = np.zeros((n_companies, width), dtype=np.float64)
+    assignees = np.full((n_companies, width), -1, dtype=np.int32)
+    blockers = np.full((n_companies, width, max(1, max_blockers)), -1, dtype=np.int32)
+    valid = np.zeros((n_companies, width), dtype=bool)
+    ids: List[List[str]] = []
+    for c, items in enumerate(companies):
+        index: Dict[str, int] = {}
+        emp_index: Dict[str, int] = {}
+        row_ids = []
+        for i, it in enumerate(items):
+            wid = str(it.get("id"))
+            row_ids.append(wid)
+            hours = it.get(hours_key, it.get("estimated_hours", 0))
+            durations[c, i] = max(0.0, float(hours or 0))
+            emp = str(it.get(assignee_key) or "")
+            assignees[c, i] = emp_index.setdefault(emp, len(emp_index))
+            k = 0
+            for b in it.get("blockers") or []:
+                j = index.get(str(b))
+                if j is not None and k < max_blockers:
+                    blockers[c, i, k] = j
+                    k += 1
+            index[wid] = i
+            valid[c, i] = True
+        ids.append(row_ids)
+    return {
+        "durations": durations,
+        "assignees": assignees,
+        "blockers": blockers,
+        "valid": valid,
+        "ids": ids,
+    }
+
+
+def _from_index(calendar: WorkCalendar, index: np.ndarray, end: bool) -> np.ndarray:
+    hpd = calendar.hours_per_day
+    if end:
+        n = np.ceil(index / hpd) - 1
+    else:
+        n = np.floor(index / hpd)
+    weeks, rem = np.divmod(n.astype(np.int64), calendar.days_per_week)
+    cycle = np.asarray(calendar._cycle, dtype=np.int64)
+    day = weeks * 7 + cycle[rem]
+    return day * 24 + calendar.start_hour + (index - n * hpd)
+
+
+def _predecessors(assignees: np.ndarray, blockers: np.ndarray) -> np.ndarray:
+    """Blocker columns plus the previous item of the same assignee."""
+    n_companies, width = assignees.shape
+    n_emps = int(assignees.max(initial=-1)) + 1
+    last = np.full((n_companies, max(1, n_emps)), -1, dtype=np.int32)
+    same = np.full((n_companies, width), -1, dtype=np.int32)
+    rows = np.arange(n_companies)
+    for i in range(width):
+        emp = assignees[:, i]
+        has = emp >= 0
+        safe = np.where(has, emp, 0)
+        same[:, i] = np.where(has, last[rows, safe], -1)
+        last[rows[has], emp[has]] = i
+    return np.concatenate([blockers, same[:, :, None]], axis=2)
+
+
+def _levels(preds: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    n_companies, width, _ = preds.shape
+    level = np.zeros((n_companies, width), dtype=np.int32)
+    rows = np.arange(n_companies)[:, None]
+    for i in range(width):
+        p = preds[:, i, :]
+        has = p >= 0
+        pl = np.where(has, level[rows, np.where(has, p, 0)], -1)
+        level[:, i] = np.where(valid[:, i], pl.max(axis=1) + 1, -1)
+    return level
+
+
+def batch_schedule(
+    durations: np.ndarray,
+    assignees: np.ndarray,
+    blockers: np.ndarray,
+    valid: Optional[np.ndarray] = None,
+    calendar: WorkCalendar = SIM_CALENDAR,
+    start: float = 0.0,
+    duration_scale: Optional[np.ndarray] = None,
+    extra_hours: Optional[np.ndarray] = None,
+    off_hours: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Schedule many companies at once. Shapes are (C, N) for durations and
+    assignees and (C, N, K) for blocker indices, padded with -1.
+
+    Finish times are computed level by level over the DAG (blockers plus the
+    previous item of the same assignee), each level as one vectorized step
+    across every company. Work happens in working-hour index space and is
+    converted back to calendar hours at the end, so the result matches the
+    loop scheduler for items given in topological order.
+
+    duration_scale ((C,) or (C, N)) models rate multipliers, extra_hours
+    ((C, N)) adds assist delays, and off_hours ((C,) bool) lets a company
+    work around the clock.
+    """
+    durations = np.asarray(durations, dtype=np.float64)
+    n_companies, width = durations.shape
+    if valid is None:
+        valid = np.ones((n_companies, width), dtype=bool)
+    hours = durations.copy()
+    if duration_scale is not None:
+        scale = np.asarray(duration_scale, dtype=np.float64)
+        hours = hours * (scale[:, None] if scale.ndim == 1 else scale)
+    if extra_hours is not None:
+        hours = hours + np.asarray(extra_hours, dtype=np.float64)
+    hours = np.where(valid, np.maximum(hours, 0.0), 0.0)
+
+    preds = _predecessors(assignees, blockers)
+    level = _levels(preds, valid)
+    origin = calendar.work_index(start)
+    if off_hours is None:
+        off_hours = np.zeros(n_companies, dtype=bool)
+    off_hours = np.asarray(off_hours, dtype=bool)
+    # off-hours companies measure in plain elapsed hours from the aligned start
+    base = np.where(off_hours, calendar.align(start), origin)
+
+    # Flatten to one row per item and walk the DAG level by level; each level
+    # gathers only its own items' predecessors, so the whole pass is
+    # O(items * K) with one vectorized step per level.
+    flat_hours = hours.ravel()
+    flat_base = np.repeat(base, width)
+    offsets = (np.arange(n_companies, dtype=np.int64) * width)[:, None, None]
+    flat_preds = np.where(preds >= 0, preds + offsets, -1).reshape(
+        n_companies * width, -1
+    )
+    flat_level = level.ravel()
+    order = np.argsort(flat_level, kind="stable")
+    order = order[flat_level[order] >= 0]
+    bounds = np.searchsorted(
+        flat_level[order], np.arange(int(level.max(initial=-1)) + 2)
+    )
+    finish_flat = np.zeros(n_companies * width, dtype=np.float64)
+    start_flat = np.zeros(n_companies * width, dtype=np.float64)
+    for lvl in range(len(bounds) - 1):
+        items = order[bounds[lvl] : bounds[lvl + 1]]
+        if not len(items):
+            continue
+        p = flat_preds[items]
+        pf = np.where(p >= 0, finish_flat[np.where(p >= 0, p, 0)], -np.inf)
+        begin = np.maximum(pf.max(axis=1), flat_base[items])
+        start_flat[items] = begin
+        finish_flat[items] = begin + flat_hours[items]
+    start_idx = start_flat.reshape(n_companies, width)
+    finish_idx = finish_flat.reshape(n_companies, width)
+
+    work_finish = np.where(
+        hours > 0,
+        _from_index(calendar, finish_idx, end=True),
+        _from_index(calendar, finish_idx, end=False),
+    )
+    finish = np.where(off_hours[:, None], finish_idx, work_finish)
+    finish = np.where(valid, finish, np.nan)
+    total = np.nanmax(np.where(valid, finish, -np.inf), axis=1)
+    empty = ~valid.any(axis=1)
+    total = np.where(empty, 0.0, total)
+    return {
+        "start_index": np.where(valid, start_idx, np.nan),
+        "finish_index": np.where(valid, finish_idx, np.nan),
+        "finish": finish,
+        "total": total,
+        "levels": level,
+    }
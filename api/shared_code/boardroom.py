@@ -0,0 +1,728 @@
+import datetime
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from shared_code.prompts import context_block, layered_messages, record_usage
+from shared_code.speaker_weights import (
+    CARRY_BLEND,
+    REFRESH_BLEND,
+    add_line_to_stats,
+    blend_weights,
+    encode_weights,
+    local_weights,
+    should_refresh,
+)
+
+DIRECTIVE = (
+    "This is the first meeting of a new startup. "
+    "The goal is to come up with the first product or service that the company will offer. "
+    "Reminder that this is the first meeting between the employees, "
+    "so they don't know each other yet. "
+)
+
+STAGES = [
+    {"name": "INTRODUCTIONS", "minutes": 10, "goal": "everyone_spoke"},
+    {"name": "BRAINSTORMING", "minutes": 15, "goal": "idea_from_each"},
+    {"name": "DECIDE ON A PRODUCT", "minutes": 5, "goal": "consensus"},
+    {"name": "REFINEMENT", "minutes": 10, "goal": "time_only"},
+    {"name": "CONCLUSION", "minutes": 5, "goal": "everyone_spoke"},
+]
+NAMING_STAGES = {"DECIDE ON A PRODUCT", "REFINEMENT"}
+
+RECENT_LINES = 12
+
+# Static, identical for every line of every meeting, so it leads the prompt.
+LINE_INSTRUCTIONS = (
+    "You are an employee speaking in a meeting at a new startup. "
+    f"Meeting goal: {DIRECTIVE}"
+    "You should respond naturally as if you are in a real meeting. "
+    "When replying to someone, AVOID mentioning them by name. "
+    "Your responses should be more natural which means you can use filler words, pauses, and other natural speech patterns. "
+    "Sometimes you may question, disagree, or express doubts about what was said before you. "
+    "Your response should still feel collaborative but not always perfectly aligned. "
+    "Respond with a single natural-sounding line of dialogue. "
+    "While brainstorming and deciding, prioritize ideas that can generate revenue quickly enough to at least meet the first bank payment on time. "
+    "Encourage discussion of pricing, payment flow, and early go-to-market to achieve that goal. "
+    "The company, its finances, and who you are come in the following messages."
+)
+NAMING_INSTRUCTIONS = (
+    "The team **must** agree on ONE specific product or service **name** "
+    "(two or three words max). "
+    "If no name has been chosen yet, propose one now in quotes. "
+    "The name DOES NOT need to be clever or catchy. "
+    "The name should be similar to existing product names in the market. "
+    "After a name is chosen, stop proposing new ones and focus on refining details."
+)
+CONCLUSION_INSTRUCTIONS = (
+    "This meeting is wrapping up. "
+    "You can offer some closing remarks, "
+    "but do not summarize the meeting or repeat what was said. "
+    "No need to continue the conversation in any way. "
+)
+
+
+class StaleTurnError(Exception):
+    """The meeting gained a line after the turn was planned; plan it again."""
+
+
+class StageClock:
+    def __init__(self, idx=0, elapsed=0, turns=0):
+        self.idx = idx
+        self.elapsed = elapsed
+        self.turns = turns
+
+    @classmethod
+    def from_doc(cls, doc):
+        raw_stage = doc.get("stage", STAGES[0]["name"])
+        if isinstance(raw_stage, int):
+            raw_stage = STAGES[min(raw_stage, len(STAGES) - 1)]["name"]
+        names = [s["name"] for s in STAGES]
+        idx = names.index(raw_stage) if raw_stage in names else 0
+        return cls(idx=idx, elapsed=doc.get("elapsed", 0), turns=doc.get("turns", 0))
+
+    @property
+    def stage(self):
+        return STAGES[self.idx]["name"]
+
+    def tick(self):
+        self.elapsed += 2
+        self.turns += 1
+
+    def goal_met(self, stats, outcome, emp_names):
+        if self.stage == "CONCLUSION":
+            return self.turns >= len(emp_names)
+        goal = STAGES[self.idx]["goal"]
+        spoken = stats.get("spoken") or {}
+        if goal == "everyone_spoke":
+            return len(spoken) >= len(emp_names)
+        if goal == "idea_from_each":
+            return not stats.get("non_idea_lines", 0)
+        if goal == "consensus":
+            return bool(outcome.get("product"))
+        return False
+
+    def advance(self, stats, outcome, emp_names):
+        goal_hit = self.goal_met(stats, outcome, emp_names)
+        time_up = self.elapsed >= STAGES[self.idx]["minutes"]
+        if self.stage in NAMING_STAGES and not outcome.get("product"):
+            return
+        if (goal_hit or time_up) and self.idx < len(STAGES) - 1:
+            self.idx += 1
+            self.turns = 0
+
+
+def recent_entry(entry: Mapping[str, Any]) -> Dict[str, str]:
+    return {
+        "speaker": str(entry.get("speaker", "")),
+        "msg": str(entry.get("msg", "")),
+        "stage": str(entry.get("stage", "")),
+    }
+
+
+def roll_recent(
+    recent: Sequence[Mapping[str, Any]], entry: Mapping[str, Any]
+) -> List[Dict[str, str]]:
+    return ([recent_entry(r) for r in recent or []] + [recent_entry(entry)])[
+        -RECENT_LINES:
+    ]
+
+
+def next_header(doc: Mapping[str, Any], entry: Mapping[str, Any]) -> Dict[str, Any]:
+    """Header fields for the product doc once entry has been appended."""
+    stats = add_line_to_stats(doc.get("stats") or {}, entry)
+    return {
+        "stats": stats,
+        "line_count": stats["line_count"],
+        "recent": roll_recent(doc.get("recent") or [], entry),
+    }
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _prompt_key(kind: str, messages: Sequence[Mapping[str, Any]]) -> str:
+    raw = json.dumps([kind, list(messages)], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMBackend:
+    """
+    Chat completion backend used by the engine. Subclasses implement
+    _complete; this base class keeps call and token counters.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self._lock = threading.Lock()
+
+    def complete(
+        self,
+        kind: str,
+        messages: List[Dict[str, str]],
+        json_mode: bool = False,
+        hint: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        text, usage = self._complete(kind, messages, json_mode, hint or {})
+        if usage is None:
+            usage = (
+                sum(_estimate_tokens(str(m.get("content", ""))) for m in messages),
+                _estimate_tokens(text),
+            )
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += int(usage[0])
+            self.completion_tokens += int(usage[1])
+            self.cached_tokens += int(usage[2]) if len(usage) > 2 else 0
+        return text
+
+    def _complete(
+        self,
+        kind: str,
+        messages: List[Dict[str, str]],
+        json_mode: bool,
+        hint: Dict[str, Any],
+    ) -> Tuple[str, Optional[Tuple[int, ...]]]:
+        """(text, (prompt, completion[, cached]) tokens or None to estimate)."""
+        raise NotImplementedError
+
+    def counters(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+        }
+
+
+class AzureBackend(LLMBackend):
+    def __init__(self, client, deployment):
+        super().__init__()
+        self.client = client
+        self.deployment = deployment
+
+    def _complete(self, kind, messages, json_mode, hint):
+        kwargs = {"model": self.deployment, "messages": messages}
+        if json_mode:
+            kwargs["response_format"] = {"type": "json_object"}
+        rsp = self.client.chat.completions.create(**kwargs)
+        text = rsp.choices[0].message.content or ""
+        usage = record_usage(f"boardroom.{kind}", rsp)
+        if not usage:
+            return text, None
+        return text, (
+            usage["prompt_tokens"],
+            usage["completion_tokens"],
+            usage["cached_tokens"],
+        )
+
+
+SCRIPTED_LINES = {
+    "INTRODUCTIONS": [
+        "Hi everyone, glad to be here. I mostly work on the product side.",
+        "Hey, nice to meet you all. I handle operations and numbers.",
+        "Hello! Um, I'm the one who'll probably be asking about timelines.",
+    ],
+    "BRAINSTORMING": [
+        "One idea: a simple subscription tool small shops could pay for right away.",
+        "Here's an idea, maybe a scheduling add-on we can sell per seat?",
+        "I have an idea too, but I'm not sure the margins work on it.",
+    ],
+    "DECIDE ON A PRODUCT": [
+        'Let\'s just call it "{product}" and move on.',
+        'I think "{product}" works, honestly.',
+    ],
+    "REFINEMENT": [
+        "For pricing, a monthly plan with a free trial seems right.",
+        "We should get the payment flow working before anything fancy.",
+    ],
+    "CONCLUSION": [
+        "Thanks all, this was a good first meeting.",
+        "Alright, let's get started then.",
+    ],
+}
+
+
+class ScriptedBackend(LLMBackend):
+    """
+    Deterministic fake that returns canned lines, weights and outcomes
+    without touching the network. latency adds a fixed sleep per call.
+    """
+
+    def __init__(
+        self,
+        lines: Optional[Dict[str, List[str]]] = None,
+        product: str = "Shop Ledger",
+        description: str = "A monthly subscription tool that helps small shops track sales.",
+        latency: float = 0.0,
+        seed: int = 0,
+    ):
+        super().__init__()
+        self.lines = lines or SCRIPTED_LINES
+        self.product = product
+        self.description = description
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self._cursor: Dict[str, int] = {}
+
+    def _complete(self, kind, messages, json_mode, hint):
+        if self.latency:
+            time.sleep(self.latency)
+        if kind == "line":
+            stage = hint.get("stage", STAGES[0]["name"])
+            options = self.lines.get(stage) or self.lines[STAGES[0]["name"]]
+            idx = self._cursor.get(stage, 0)
+            self._cursor[stage] = idx + 1
+            return options[idx % len(options)].format(product=self.product), None
+        if kind == "weights":
+            names = hint.get("names") or []
+            return (
+                json.dumps({n: round(self.rng.uniform(0.1, 0.9), 2) for n in names}),
+                None,
+            )
+        if kind == "product_name":
+            transcript = str(messages[-1].get("content", ""))
+            found = self.product if f'"{self.product}"' in transcript else ""
+            return json.dumps({"name": found}), None
+        if kind == "describe":
+            return self.description, None
+        return "", None
+
+
+class RecordingBackend(LLMBackend):
+    """Wraps another backend and appends every exchange to a JSONL file."""
+
+    def __init__(self, inner: LLMBackend, path: str):
+        super().__init__()
+        self.inner = inner
+        self.path = path
+
+    def _complete(self, kind, messages, json_mode, hint):
+        before = (
+            self.inner.prompt_tokens,
+            self.inner.completion_tokens,
+            self.inner.cached_tokens,
+        )
+        text = self.inner.complete(kind, messages, json_mode, hint)
+        usage = (
+            self.inner.prompt_tokens - before[0],
+            self.inner.completion_tokens - before[1],
+            self.inner.cached_tokens - before[2],
+        )
+        record = {
+            "key": _prompt_key(kind, messages),
+            "kind": kind,
+            "response": text,
+            "usage": list(usage),
+        }
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return text, usage
+
+
+class ReplayBackend(LLMBackend):
+    """
+    Serves responses captured by RecordingBackend. Exact prompt matches are
+    preferred; otherwise responses of the same kind are replayed in order.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.by_key: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_kind: Dict[str, List[Dict[str, Any]]] = {}
+        with open(path, encoding="utf-8") as f:
+            for raw in f:
+                raw = raw.strip()
+                if not raw:
+                    continue
+                record = json.loads(raw)
+                self.by_key.setdefault(record["key"], []).append(record)
+                self.by_kind.setdefault(record["kind"], []).append(record)
+
+    def _complete(self, kind, messages, json_mode, hint):
+        with self._lock:
+            exact = self.by_key.get(_prompt_key(kind, messages))
+            if exact:
+                record = exact.pop(0)
+                self.by_kind[kind].remove(record)
+            else:
+                queue = self.by_kind.get(kind)
+                if not queue:
+                    raise KeyError(f"no recorded {kind} response left")
+                record = queue.pop(0)
+                self.by_key[record["key"]].remove(record)
+        usage = record.get("usage") or None
+        return record["response"], tuple(usage) if usage else None
+
+
+class MemoryStore:
+    """
+    In-process stand-in for the Firestore product doc and transcript
+    subcollection. Reads and writes are counted the way Firestore bills them.
+    """
+
+    def __init__(self):
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.lines: Dict[str, List[Dict[str, Any]]] = {}
+        self.reads = 0
+        self.writes = 0
+
+    def load(self, meeting_id: str) -> Optional[Dict[str, Any]]:
+        self.reads += 1
+        doc = self.docs.get(meeting_id)
+        return json.loads(json.dumps(doc)) if doc is not None else None
+
+    def append(
+        self,
+        meeting_id: str,
+        doc: Mapping[str, Any],
+        entry: Dict[str, Any],
+        fields: Dict[str, Any],
+        expect_line_count: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        stored_count = int(self.docs.get(meeting_id, {}).get("line_count", 0) or 0)
+        if expect_line_count is not None and stored_count != expect_line_count:
+            raise StaleTurnError(meeting_id)
+        header = {**next_header(doc, entry), **fields}
+        lines = self.lines.setdefault(meeting_id, [])
+        lines.append({"seq": len(lines), **entry})
+        stored = self.docs.setdefault(meeting_id, {})
+        stored.update(json.loads(json.dumps(header)))
+        self.writes += 2
+        return header
+
+    def load_transcript(self, meeting_id: str) -> List[Dict[str, Any]]:
+        lines = self.lines.get(meeting_id, [])
+        self.reads += max(1, len(lines))
+        return [dict(line) for line in lines]
+
+    def ops(self) -> Dict[str, int]:
+        return {"reads": self.reads, "writes": self.writes}
+
+
+def _now():
+    return datetime.datetime.utcnow().isoformat()
+
+
+def strip_speaker_prefix(content: str, emp_names: Sequence[str]) -> str:
+    for name in emp_names:
+        low = name.lower()
+        first = name.split()[0].lower()
+        last = name.split()[-1].lower()
+        if content.lower().startswith(low):
+            content = content[len(name) :].lstrip(":,.- ").strip()
+            break
+        if content.lower().startswith(first):
+            content = content[len(first) :].lstrip(":,.- ").strip()
+            break
+        if content.lower().startswith(last):
+            content = content[len(last) :].lstrip(":,.- ").strip()
+            break
+    return content.strip()
+
+
+def calc_weights(llm, emps, directive, recent_lines, rng=random):
+    sys = (
+        "Re-evaluate each participant’s confidence weight (0-1) for the *next* turn.\n"
+        "• Start from their previous weight if given.\n"
+        "• **Increase** if their most recent comment advanced the meeting goal.\n"
+        "• **Decrease** if they sounded uncertain, repetitive, or off-topic.\n"
+        "Return JSON: {name: weight}.  At least one ≥0.75 and one ≤0.25."
+    )
+    user = json.dumps(
+        {
+            "directive": directive,
+            "recent_dialogue": recent_lines,
+            "participants": [
+                {
+                    "name": e["name"],
+                    "title": e["title"],
+                    "personality": e["personality"],
+                }
+                for e in emps
+            ],
+        }
+    )
+    content = llm.complete(
+        "weights",
+        [{"role": "system", "content": sys}, {"role": "user", "content": user}],
+        json_mode=True,
+        hint={"names": [e["name"] for e in emps]},
+    )
+    raw = json.loads(content)
+    weights = {
+        k: max(0, min(1, float(v)))
+        for k, v in raw.items()
+        if isinstance(v, (int, float, str))
+    }
+    if len(set(weights.values())) <= 1:
+        for e in emps:
+            weights[e["name"]] = max(0, min(1, rng.gauss(0.5, 0.15)))
+    return weights
+
+
+def pick_first_speaker(emps, weights, rng=random):
+    return max(emps, key=lambda e: weights.get(e["name"], 0.4) + rng.gauss(0, 0.05))
+
+
+def choose_next_speaker(emps, stats, weights, rng=random):
+    last_speaker = stats.get("last_speaker")
+    candidates = [e for e in emps if e["name"] != last_speaker] or list(emps)
+    spoken = stats.get("spoken") or {}
+    return max(
+        candidates,
+        key=lambda e: (weights.get(e["name"], 0.4) / (1 + spoken.get(e["name"], 0)))
+        + rng.gauss(0, 0.05),
+    )
+
+
+def agent_line_messages(agent, history, ctx, counter, stage):
+    """
+    Static meeting instructions, then the company block shared by every line
+    of the meeting, then the transcript; the speaker and the clock go last.
+    """
+    dialogue = [
+        {"role": "assistant", "content": f"{h['speaker']}: {h['msg']}"} for h in history
+    ]
+    if stage == "CONCLUSION":
+        return layered_messages(
+            CONCLUSION_INSTRUCTIONS, history=dialogue, turn=f"{agent['name']}:"
+        )
+    finance = ctx["finance"]
+    context = context_block(
+        "Company",
+        {
+            "Name": ctx["company"],
+            "Description": ctx["description"],
+            "Financial constraint": (
+                f"The company has a bank loan of ${finance['amount']:.0f}. "
+                f"The first payment due is ${finance['first_payment']:.0f} "
+                f"in {finance['grace_period_days']} days."
+            ),
+        },
+    )
+    turn = (
+        f"You are {agent['name']}, a {agent['title']}. "
+        f"Personality: {agent['personality']}. "
+        f"So far, {counter*2} minutes have passed in the meeting, "
+        f"which means you are in the {stage} stage of the meeting. "
+    )
+    if stage in NAMING_STAGES:
+        turn += NAMING_INSTRUCTIONS
+    turn += f"\n\n{agent['name']}:"
+    return layered_messages(LINE_INSTRUCTIONS, context, dialogue, turn)
+
+
+def gen_agent_line(llm, agent, history, ctx, counter, stage, emp_names):
+    msgs = agent_line_messages(agent, history, ctx, counter, stage)
+    content = llm.complete("line", msgs, hint={"stage": stage, "speaker": agent["name"]})
+    return strip_speaker_prefix(content or "", emp_names)
+
+
+def _transcript_text(history):
+    return "\n".join(f"{h['speaker']}: {h['msg']}" for h in history)
+
+
+def detect_product_name(llm, history):
+    sys = (
+        "You are an impartial meeting observer.\n"
+        'Return JSON {"name":""} unless a single, specific product or service NAME '
+        "was literally spoken in the transcript.\n"
+        'Return {"name":"<exact literal name taken from the transcript>"}.\n'
+        "Under NO circumstances invent or reformulate the name yourself."
+    )
+    msgs = [
+        {"role": "system", "content": sys},
+        {"role": "user", "content": _transcript_text(history)},
+    ]
+    return json.loads(llm.complete("product_name", msgs, json_mode=True))
+
+
+def describe_product(llm, history, product_name):
+    sys = (
+        f"You are an impartial meeting observer.\n"
+        f"Write a concise description of '{product_name}', "
+        "as mentioned in the transcript, "
+        "using ONLY details that appear in the transcript. "
+        "Do NOT add any new capabilities or marketing spin."
+        "The description should be one or two sentences long, "
+        "and should not refer to the meeting or the participants. "
+        "It should also not repeat the name of the product. "
+    )
+    msgs = [
+        {"role": "system", "content": sys},
+        {"role": "user", "content": _transcript_text(history)},
+    ]
+    return llm.complete("describe", msgs).strip()
+
+
+def first_turn(llm, ctx, emps, rng=random):
+    stage = STAGES[0]["name"]
+    weights = local_weights(emps, {}, stage)
+    speaker = pick_first_speaker(emps, weights, rng)
+    line = gen_agent_line(
+        llm, speaker, [], ctx, 0, stage, [e["name"] for e in emps]
+    )
+    return {
+        "line_count": 0,
+        "stage": stage,
+        "speaker": speaker["name"],
+        "msg": line,
+        "weights": weights,
+        "llm_weights": {},
+    }
+
+
+def plan_turn(llm, ctx, emps, doc, stage, rng=random):
+    """
+    Pick the next speaker and generate their line from the product header.
+    Used both for the live step and for speculative pre-generation.
+    """
+    emp_names = [e["name"] for e in emps]
+    stats = doc.get("stats") or {}
+    history = doc.get("recent") or []
+    line_count = int(doc.get("line_count", 0) or 0)
+    weights = local_weights(emps, stats, stage)
+    llm_weights = doc.get("llm_weights") or {}
+    if should_refresh(line_count):
+        try:
+            llm_weights = calc_weights(
+                llm, emps, DIRECTIVE, _transcript_text(history), rng
+            )
+            weights = blend_weights(weights, llm_weights, REFRESH_BLEND)
+        except Exception:
+            llm_weights = {}
+    elif llm_weights:
+        weights = blend_weights(weights, llm_weights, CARRY_BLEND)
+    speaker = choose_next_speaker(emps, stats, weights, rng)
+    line = gen_agent_line(llm, speaker, history, ctx, line_count, stage, emp_names)
+    return {
+        "line_count": line_count,
+        "stage": stage,
+        "speaker": speaker["name"],
+        "msg": line,
+        "weights": weights,
+        "llm_weights": llm_weights,
+    }
+
+
+def start_meeting(llm, store, meeting_id, ctx, emps, fields=None, rng=random):
+    turn = first_turn(llm, ctx, emps, rng)
+    codes, speakers = encode_weights(turn["weights"], [e["name"] for e in emps])
+    entry = {
+        "speaker": turn["speaker"],
+        "msg": turn["msg"],
+        "w": codes,
+        "stage": turn["stage"],
+        "at": _now(),
+    }
+    store.append(
+        meeting_id,
+        {},
+        entry,
+        {
+            "product": "",
+            "description": "",
+            "speakers": speakers,
+            **(fields or {}),
+        },
+    )
+    return entry
+
+
+def commit_turn(llm, store, meeting_id, emps, doc, turn, extra=None):
+    """
+    Append a planned turn to the transcript, detect the product name while
+    the team is naming it, and advance the stage clock. Returns the step
+    result together with the new header. The stage, clock and speaker table
+    all come from doc, so the append is rejected with StaleTurnError if the
+    stored meeting has moved past the line the turn was planned for.
+    """
+    emp_names = [e["name"] for e in emps]
+    clock = StageClock.from_doc(doc)
+    stats = doc.get("stats") or {}
+    known = doc.get("speakers") or []
+    codes, speakers = encode_weights(turn["weights"], known)
+    entry = {
+        "speaker": turn["speaker"],
+        "msg": turn["msg"],
+        "w": codes,
+        "stage": clock.stage,
+        "at": _now(),
+    }
+    history = (doc.get("recent") or []) + [entry]
+
+    product_existing = doc.get("product")
+    description_existing = doc.get("description")
+
+    outcome = {}
+    if not product_existing and clock.stage in NAMING_STAGES:
+        name_check = detect_product_name(llm, history)
+        if name_check.get("name"):
+            outcome = {
+                "product": name_check["name"],
+                "description": describe_product(
+                    llm,
+                    store.load_transcript(meeting_id) + [entry],
+                    name_check["name"],
+                ),
+            }
+
+    merged_outcome = {
+        "product": product_existing,
+        "description": description_existing,
+    } | outcome
+
+    clock.tick()
+    clock.advance(add_line_to_stats(stats, entry), merged_outcome, emp_names)
+    expected = turn.get("line_count")
+    header = store.append(
+        meeting_id,
+        doc,
+        entry,
+        {
+            "stage": clock.stage,
+            "elapsed": clock.elapsed,
+            "turns": clock.turns,
+            "llm_weights": turn.get("llm_weights") or {},
+            **({"speakers": speakers} if speakers != list(known) else {}),
+            **outcome,
+            **(extra or {}),
+        },
+        expect_line_count=int(expected) if expected is not None else None,
+    )
+    done = bool(
+        clock.stage == "CONCLUSION"
+        and clock.turns >= len(emp_names)
+        and merged_outcome.get("product")
+        and merged_outcome.get("description")
+    )
+    return {
+        "speaker": turn["speaker"],
+        "line": turn["msg"],
+        "outcome": merged_outcome,
+        "done": done,
+        "stage": clock.stage,
+        "header": header,
+    }
+
+
+def run_meeting(llm, store, meeting_id, ctx, emps, max_turns=60, rng=random):
+    """Drive a whole meeting through the engine, as the UI does step by step."""
+    start_meeting(llm, store, meeting_id, ctx, emps, rng=rng)
+    result = {"done": False, "outcome": {}}
+    for _ in range(max_turns - 1):
+        doc = store.load(meeting_id)
+        clock = StageClock.from_doc(doc)
+        turn = plan_turn(llm, ctx, emps, doc, clock.stage, rng)
+        result = commit_turn(llm, store, meeting_id, emps, doc, turn)
+        if result["done"]:
+            break
+    return result
@@ -0,0 +1,290 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import zlib
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from shared_code.intent_match import (
+    EMPLOYEE_EMAIL_LEXICON,
+    EMPLOYEE_EMAIL_NEGATED,
+    INTENT_SKIP_THRESHOLD,
+    MOM_MONEY_LEXICON,
+    MOM_MONEY_NEGATED,
+    SUPEREATS_CANCEL_LEXICON,
+    SUPEREATS_CANCEL_NEGATED,
+    PhraseMatcher,
+)
+
+HASH_DIM = 4096
+MODEL_DIR = os.path.join(os.path.dirname(__file__), "models")
+TIERS = ("rules", "model", "llm", "fallback")
+
+logger = logging.getLogger("classify")
+
+# App setting that opts in to logging the player's text with each LLM
+# decision, for collecting model-tier training data. Off by default.
+LOG_TEXT_SETTING = "CLASSIFY_LOG_TEXT"
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+# (label, confidence, extra payload) from the caller's LLM tier
+LlmTier = Callable[[str], Tuple[str, float, Dict[str, Any]]]
+
+
+class Task:
+    """
+    A classification task: its labels, the compiled rule tier and the
+    confidence each cheap tier needs before the LLM is skipped.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        lexicon: Mapping[str, Mapping[str, float]],
+        negated: Optional[Mapping[str, str]] = None,
+        priority: Sequence[str] = (),
+        rules_threshold: float = 0.75,
+        model_threshold: float = 0.97,
+        default: Optional[str] = None,
+    ):
+        self.name = name
+        self.labels = list(lexicon)
+        self.matcher = PhraseMatcher(lexicon, negated)
+        self.priority = tuple(priority)
+        self.rules_threshold = rules_threshold
+        self.model_threshold = model_threshold
+        self.default = default or self.labels[-1]
+
+
+TASKS: Dict[str, Task] = {
+    "employee_intent": Task(
+        "employee_intent",
+        {**EMPLOYEE_EMAIL_LEXICON, "neutral": {}},
+        EMPLOYEE_EMAIL_NEGATED,
+        priority=("off_hours",),
+        rules_threshold=INTENT_SKIP_THRESHOLD,
+        default="neutral",
+    ),
+    "supereats_cancel": Task(
+        "supereats_cancel",
+        SUPEREATS_CANCEL_LEXICON,
+        SUPEREATS_CANCEL_NEGATED,
+        rules_threshold=0.7,
+        default="keep",
+    ),
+    "mom_money": Task(
+        "mom_money",
+        MOM_MONEY_LEXICON,
+        MOM_MONEY_NEGATED,
+        rules_threshold=0.7,
+        default="no_money",
+    ),
+}
+
+
+def hashed_features(text: str, dim: int = HASH_DIM) -> np.ndarray:
+    """Signed crc32 hashing of words and word bigrams, unit length."""
+    words = _WORD.findall((text or "").lower().replace("\u2019", "'"))
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vec = np.zeros(dim, dtype=np.float32)
+    for g in grams:
+        h = zlib.crc32(g.encode("utf-8"))
+        vec[h % dim] += 1.0 if (h >> 20) & 1 else -1.0
+    norm = float(np.linalg.norm(vec))
+    if norm:
+        vec /= norm
+    return vec
+
+
+class HashedLogReg:
+    """Multinomial logistic regression over hashed n-grams."""
+
+    def __init__(self, labels: Sequence[str], weights: np.ndarray, bias: np.ndarray):
+        self.labels = list(labels)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+
+    @property
+    def dim(self) -> int:
+        return self.weights.shape[1]
+
+    def proba(self, texts: Sequence[str]) -> np.ndarray:
+        x = np.stack([hashed_features(t, self.dim) for t in texts])
+        logits = x @ self.weights.T + self.bias
+        logits -= logits.max(axis=1, keepdims=True)
+        p = np.exp(logits)
+        return p / p.sum(axis=1, keepdims=True)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        p = self.proba([text])[0]
+        k = int(np.argmax(p))
+        return self.labels[k], float(p[k])
+
+    @classmethod
+    def fit(
+        cls,
+        texts: Sequence[str],
+        labels: Sequence[str],
+        label_set: Optional[Sequence[str]] = None,
+        dim: int = HASH_DIM,
+        l2: float = 1e-3,
+        lr: float = 2.0,
+        epochs: int = 300,
+    ) -> "HashedLogReg":
+        names = list(label_set or sorted(set(labels)))
+        index = {name: k for k, name in enumerate(names)}
+        x = np.stack([hashed_features(t, dim) for t in texts])
+        y = np.zeros((len(texts), len(names)), dtype=np.float32)
+        y[np.arange(len(texts)), [index[label] for label in labels]] = 1.0
+        w = np.zeros((len(names), dim), dtype=np.float32)
+        b = np.zeros(len(names), dtype=np.float32)
+        for _ in range(epochs):
+            logits = x @ w.T + b
+            logits -= logits.max(axis=1, keepdims=True)
+            p = np.exp(logits)
+            p /= p.sum(axis=1, keepdims=True)
+            grad = (p - y) / len(texts)
+            w -= lr * (grad.T @ x + l2 * w)
+            b -= lr * grad.sum(axis=0)
+        return cls(names, w, b)
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            labels=np.asarray(self.labels),
+            weights=self.weights.astype(np.float16),
+            bias=self.bias,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "HashedLogReg":
+        data = np.load(path)
+        return cls([str(x) for x in data["labels"]], data["weights"], data["bias"])
+
+
+@lru_cache(maxsize=None)
+def load_model(task: str) -> Optional[HashedLogReg]:
+    path = os.path.join(MODEL_DIR, f"{task}.npz")
+    if not os.path.exists(path):
+        return None
+    try:
+        return HashedLogReg.load(path)
+    except Exception as exc:
+        logger.warning("failed to load %s classifier: %s", task, exc)
+        return None
+
+
+_STATS: Dict[str, Dict[str, List[float]]] = {}
+
+
+def _record(task: str, tier: str, seconds: float) -> None:
+    stats = _STATS.setdefault(task, {t: [0, 0.0] for t in TIERS})
+    stats[tier][0] += 1
+    stats[tier][1] += seconds
+
+
+def tier_stats() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Per task and tier: decisions settled there, hit rate and mean latency."""
+    out: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for task, stats in _STATS.items():
+        total = sum(int(n) for n, _ in stats.values()) or 1
+        out[task] = {
+            tier: {
+                "hits": int(n),
+                "hit_rate": round(n / total, 4),
+                "mean_ms": round(1000 * s / n, 3) if n else 0.0,
+            }
+            for tier, (n, s) in stats.items()
+        }
+    return out
+
+
+def reset_stats() -> None:
+    _STATS.clear()
+
+
+def classify_text(
+    task_name: str,
+    text: str,
+    llm: Optional[LlmTier] = None,
+    model: Optional[HashedLogReg] = None,
+) -> Dict[str, Any]:
+    """
+    Tiered classification: compiled rules, then the optional local model, then
+    the LLM. Each tier answers only when its confidence clears the task's
+    threshold; a failed LLM call falls back to the best cheap guess. Returns
+    label, confidence, the tier that decided, the time spent up to that
+    decision and any payload the LLM tier returned.
+    """
+    task = TASKS[task_name]
+    start = time.perf_counter()
+    label, confidence = task.matcher.classify(text, task.priority)
+    if label and confidence >= task.rules_threshold:
+        return _decide(task, "rules", label, confidence, start)
+    guess = (label or task.default, confidence)
+
+    model = model or load_model(task_name)
+    if model is not None:
+        m_label, m_conf = model.predict(text)
+        if m_conf >= task.model_threshold:
+            return _decide(task, "model", m_label, m_conf, start)
+        if m_conf > guess[1]:
+            guess = (m_label, m_conf)
+
+    if llm is not None:
+        try:
+            l_label, l_conf, payload = llm(text)
+        except Exception as exc:
+            logger.warning("%s LLM tier failed: %s", task_name, exc)
+        else:
+            result = _decide(task, "llm", l_label, l_conf, start, payload)
+            logger.info(
+                "classify_decision %s", json.dumps(_decision_log(task_name, l_label, text))
+            )
+            return result
+    return _decide(task, "fallback", guess[0], guess[1], start)
+
+
+def _log_text_enabled() -> bool:
+    return os.environ.get(LOG_TEXT_SETTING, "").strip().lower() in ("1", "true", "yes")
+
+
+def _decision_log(task_name: str, label: str, text: str) -> Dict[str, Any]:
+    """
+    Log payload for an LLM-tier decision. The raw text, which the model tier
+    trains on, is only included when LOG_TEXT_SETTING is on; otherwise a
+    hash lets repeated inputs be counted without storing what the player wrote.
+    """
+    entry = {
+        "task": task_name,
+        "label": label,
+        "text_sha256": hashlib.sha256(text.encode("utf-8")).hexdigest()[:16],
+    }
+    if _log_text_enabled():
+        entry["text"] = text[:2000]
+    return entry
+
+
+def _decide(
+    task: Task,
+    tier: str,
+    label: str,
+    confidence: float,
+    start: float,
+    payload: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    elapsed = time.perf_counter() - start
+    _record(task.name, tier, elapsed)
+    return {
+        "label": label,
+        "confidence": round(float(confidence), 4),
+        "tier": tier,
+        "latency_ms": round(elapsed * 1000, 3),
+        "payload": payload or {},
+    }
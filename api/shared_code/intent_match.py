@@ -0,0 +1,279 @@
+import re
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+NEGATIONS = frozenset(
+    {
+        "not",
+        "no",
+        "never",
+        "dont",
+        "don't",
+        "doesnt",
+        "doesn't",
+        "isnt",
+        "isn't",
+        "wasnt",
+        "wasn't",
+        "without",
+        "nothing",
+        "hardly",
+        "stop",
+    }
+)
+NEGATION_WINDOW = 3  # tokens before a hit that can negate it
+# confidence at which a caller may trust the rules and skip the LLM
+INTENT_SKIP_THRESHOLD = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+_SPACES = re.compile(r"[\s\-_]+")
+
+# label -> phrase -> weight. Phrases match on word boundaries with hyphens and
+# runs of whitespace treated alike.
+EMPLOYEE_EMAIL_LEXICON: Dict[str, Dict[str, float]] = {
+    "off_hours": {
+        "weekend": 2.0,
+        "weekends": 2.0,
+        "saturday": 1.5,
+        "sunday": 1.5,
+        "after hours": 2.0,
+        "after work": 1.5,
+        "late tonight": 2.0,
+        "tonight": 1.0,
+        "overnight": 2.0,
+        "overtime": 2.0,
+        "off hours": 2.0,
+        "past 5": 1.5,
+        "past five": 1.5,
+        "stay late": 2.0,
+        "work late": 2.0,
+        "all nighter": 2.0,
+        "8pm": 1.5,
+        "9pm": 1.5,
+        "10pm": 1.5,
+        "11pm": 1.5,
+        "midnight": 1.5,
+    },
+    "encouraging": {
+        "thank you": 1.5,
+        "thanks": 1.0,
+        "appreciate": 1.5,
+        "great job": 2.0,
+        "well done": 2.0,
+        "awesome": 1.0,
+        "nice work": 2.0,
+        "amazing": 1.0,
+        "proud of": 2.0,
+        "kudos": 2.0,
+        "good job": 2.0,
+        "great work": 2.0,
+        "keep it up": 1.5,
+        "impressed": 1.5,
+    },
+    "discouraging": {
+        "disappointed": 2.0,
+        "disappointing": 2.0,
+        "frustrated": 1.5,
+        "angry": 1.5,
+        "upset": 1.0,
+        "unacceptable": 2.0,
+        "furious": 2.0,
+        "mad": 1.0,
+        "bad job": 2.0,
+        "awful": 1.5,
+        "terrible": 1.5,
+        "horrible": 1.5,
+        "useless": 2.0,
+        "sucks": 1.5,
+        "let down": 1.5,
+        "fired": 2.0,
+        "last warning": 2.0,
+        "not good enough": 2.0,
+    },
+}
+
+# a negated hit counts toward this label instead ("not great work" is
+# criticism); labels without an entry drop negated hits ("no weekend work")
+EMPLOYEE_EMAIL_NEGATED = {"encouraging": "discouraging", "discouraging": "encouraging"}
+
+
+def _norm(text: str) -> str:
+    return _SPACES.sub(" ", (text or "").lower().replace("\u2019", "'"))
+
+
+class PhraseMatcher:
+    """
+    Weighted phrase lexicon compiled into a single alternation regex with word
+    boundaries, longest phrase first, so one pass over the text finds every
+    hit. A hit preceded by a negation within NEGATION_WINDOW tokens is moved
+    to the label in negated, or dropped.
+    """
+
+    def __init__(
+        self,
+        lexicon: Mapping[str, Mapping[str, float]],
+        negated: Optional[Mapping[str, str]] = None,
+    ):
+        self.labels = list(lexicon)
+        self.negated = dict(negated or {})
+        self._phrases: Dict[str, Tuple[str, float]] = {}
+        for label, phrases in lexicon.items():
+            for phrase, weight in phrases.items():
+                self._phrases[_norm(phrase)] = (label, float(weight))
+        alternation = "|".join(
+            re.escape(p) for p in sorted(self._phrases, key=len, reverse=True)
+        )
+        self._pattern = re.compile(rf"(?<![a-z0-9])(?:{alternation})(?![a-z0-9])")
+
+    def _negated(self, text: str, start: int) -> bool:
+        before = _TOKEN.findall(text[max(0, start - 40) : start])
+        return any(tok in NEGATIONS for tok in before[-NEGATION_WINDOW:])
+
+    def hits(self, text: str) -> List[Tuple[str, str, float]]:
+        """(label, phrase, weight) for every hit, after negation handling."""
+        norm = _norm(text)
+        out: List[Tuple[str, str, float]] = []
+        for m in self._pattern.finditer(norm):
+            label, weight = self._phrases[m.group(0)]
+            if self._negated(norm, m.start()):
+                label = self.negated.get(label)
+                if not label:
+                    continue
+            out.append((label, m.group(0), weight))
+        return out
+
+    def scores(self, text: str) -> Dict[str, float]:
+        totals = {label: 0.0 for label in self.labels}
+        for label, _, weight in self.hits(text):
+            totals[label] += weight
+        return totals
+
+    def classify(
+        self, text: str, priority: Iterable[str] = ()
+    ) -> Tuple[Optional[str], float]:
+        """
+        Best label and a confidence in 0..1 that grows with the winning score
+        and shrinks with the runner-up: (top - second) / (top + 1). Labels in
+        priority win whenever they score at all, in the order given.
+        """
+        totals = self.scores(text)
+        ranked = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)
+        if not ranked or ranked[0][1] <= 0:
+            return None, 0.0
+        for label in priority:
+            if totals.get(label, 0.0) > 0:
+                top = totals[label]
+                second = max((v for k, v in totals.items() if k != label), default=0.0)
+                return label, max(0.0, (top - second) / (top + 1.0))
+        top_label, top = ranked[0]
+        second = ranked[1][1] if len(ranked) > 1 else 0.0
+        return top_label, max(0.0, (top - second) / (top + 1.0))
+
+
+EMPLOYEE_EMAIL_MATCHER = PhraseMatcher(EMPLOYEE_EMAIL_LEXICON, EMPLOYEE_EMAIL_NEGATED)
+
+
+SUPEREATS_CANCEL_LEXICON: Dict[str, Dict[str, float]] = {
+    "cancel": {
+        "cancel": 2.0,
+        "cancel my order": 3.0,
+        "cancellation": 2.0,
+        "stop": 1.0,
+        "stop the order": 2.5,
+        "stop charging": 2.5,
+        "undo": 1.5,
+        "reverse": 1.5,
+        "refund": 1.5,
+        "do not charge": 2.5,
+        "wrong order": 1.5,
+        "changed my mind": 2.0,
+        "change my mind": 2.0,
+        "no longer want": 2.5,
+        "don't want it": 2.0,
+        "unsubscribe": 2.0,
+        "call it off": 2.0,
+    },
+    "keep": {
+        "where is my order": 2.0,
+        "eta": 1.0,
+        "on its way": 1.0,
+        "thank you": 1.0,
+        "thanks": 1.0,
+        "add": 1.0,
+        "extra": 1.0,
+        "keep my order": 3.0,
+        "still want": 2.0,
+        "delicious": 1.5,
+        "tracking": 1.0,
+    },
+}
+# "don't cancel" keeps the order; "never charge me" is still a cancel
+SUPEREATS_CANCEL_NEGATED = {"cancel": "keep"}
+
+MOM_MONEY_LEXICON: Dict[str, Dict[str, float]] = {
+    "money": {
+        "money": 2.0,
+        "loan": 2.0,
+        "borrow": 2.0,
+        "lend me": 2.5,
+        "cash": 1.5,
+        "funds": 1.5,
+        "funding": 1.5,
+        "invest": 1.5,
+        "investment": 1.5,
+        "a few bucks": 2.5,
+        "some dollars": 2.0,
+        "dollars": 1.5,
+        "bucks": 1.5,
+        "pay rent": 2.0,
+        "help me out financially": 3.0,
+        "wire": 1.5,
+        "venmo": 2.0,
+    },
+    "no_money": {
+        "just checking in": 2.0,
+        "how are you": 1.5,
+        "miss you": 1.5,
+        "happy birthday": 2.0,
+        "see you": 1.0,
+        "call you": 1.0,
+        "love you": 1.0,
+        "pay you back": 1.0,
+    },
+}
+# "I don't need money" is a plain update
+MOM_MONEY_NEGATED = {"money": "no_money"}
+
+# praise and thanks toward mom, scored 0-10 from phrase weights
+MOM_PRAISE_LEXICON: Dict[str, Dict[str, float]] = {
+    "compliment": {
+        "best mom": 4.0,
+        "amazing": 2.0,
+        "wonderful": 2.0,
+        "the best": 2.0,
+        "beautiful": 1.5,
+        "smartest": 2.5,
+        "wisest": 2.5,
+        "incredible": 2.0,
+        "proud to be your": 3.0,
+        "role model": 3.0,
+        "love you": 1.5,
+        "you're right": 1.5,
+    },
+    "gratitude": {
+        "thank you": 2.5,
+        "thanks": 1.5,
+        "grateful": 3.0,
+        "appreciate": 2.5,
+        "couldn't have done it without you": 4.0,
+        "owe you": 2.0,
+        "means so much": 2.5,
+        "for everything": 2.0,
+    },
+}
+
+
+def match_employee_intent(subject: str, message: str) -> Tuple[Optional[str], float]:
+    """Rule-based intent for a founder email; off_hours outranks tone."""
+    return EMPLOYEE_EMAIL_MATCHER.classify(
+        f"{subject or ''} {message or ''}", priority=("off_hours",)
+    )
@@ -0,0 +1,301 @@
+import json
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from firebase_admin import firestore
+from pydantic import BaseModel, ConfigDict, Field
+
+POOL_COLLECTION = "order_pool"
+POOL_DOC = "current"
+POOL_BATCH = 15
+POOL_LOW_WATER = 4
+SEEN_LIMIT = 200
+ORDER_POOL_QUEUE = "order-pool"
+# a refill request older than this is assumed lost and may be queued again
+REFILL_RETRY_MS = 5 * 60 * 1000
+
+
+class CadabraOrder(BaseModel):
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+
+    item: str = Field(..., min_length=2, max_length=120)
+    quantity: int = Field(..., ge=1, le=50)
+    unit_price: float = Field(..., gt=0, le=5000)
+    total: float | None = Field(default=None, gt=0, le=20000)
+
+
+class CadabraOrderBatch(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    orders: List[CadabraOrder] = Field(..., min_length=1, max_length=25)
+
+
+def order_key(item: str) -> str:
+    """Normalized product name used for dedup: case, punctuation and plurals ignored."""
+    words = re.sub(r"[^a-z0-9]+", " ", (item or "").lower()).split()
+    if words and len(words[-1]) > 3 and words[-1].endswith("s") and not words[-1].endswith("ss"):
+        words[-1] = words[-1][:-1]
+    return " ".join(words)
+
+
+def prompt_for_orders(
+    client: Any, model: str, description: str, prev_items: List[str], count: int
+) -> List[CadabraOrder]:
+    system_message = (
+        "You imagine humorous but plausible Amazon purchases a naive VC might make for a startup. "
+        "Stick to real, recognizable products without adjectives or add-ons. "
+        "Return only JSON that matches the schema."
+    )
+    user_prompt = (
+        f"Given this description for a company, come up with {count} different humorous items that a VC who doesn’t know any better, "
+        "might purchase for said company. Each purchase must be formatted as a purchase from Amazon, with a quantity and price. "
+        "The title of each product should just be the product and nothing else. Lean toward existing items instead of items that are tailored toward the specific company description. "
+        "Every item must be a different product. "
+        "The total cost of each purchase should be more than $3 but less than $1,000\n\n"
+        f"{description}"
+    )
+    if prev_items:
+        prior = ", ".join(prev_items[-40:])
+        user_prompt += (
+            "\n\nAvoid repeating any of these previously purchased items. "
+            f"All suggestions must be different from: {prior}"
+        )
+    completion = client.beta.chat.completions.parse(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_prompt},
+        ],
+        temperature=0.9,
+        top_p=0.9,
+        max_tokens=64 * count + 64,
+        response_format=CadabraOrderBatch,
+    )
+    parsed = completion.choices[0].message.parsed
+    if not isinstance(parsed, CadabraOrderBatch):
+        raise ValueError("LLM parse failure")
+    return parsed.orders
+
+
+def normalize_order(order: CadabraOrder) -> Dict[str, Any]:
+    item = order.item.strip() or "Office chair mat"
+    qty = order.quantity if order.quantity and order.quantity > 0 else 1
+    qty = min(max(int(qty), 1), 50)
+    unit = float(order.unit_price) if order.unit_price and order.unit_price > 0 else 19.99
+    unit = round(unit, 2)
+    total = float(order.total) if order.total and order.total > 0 else unit * qty
+    if total < 3:
+        total = 3.25
+    elif total > 999.99:
+        total = 999.99
+    unit = round(total / qty, 2) if qty else unit
+    return {
+        "item": item,
+        "quantity": qty,
+        "unit_price": unit,
+        "total": round(total, 2),
+    }
+
+
+def fallback_order(seen: List[str]) -> CadabraOrder:
+    candidates = [
+        ("Conference room speaker", 1, 89.99),
+        ("Standing desk mat", 1, 39.99),
+        ("Whiteboard markers", 3, 11.49),
+        ("Cable management box", 2, 24.99),
+        ("Surge protector", 1, 18.99),
+        ("Office chair wheels", 1, 32.99),
+    ]
+    random.shuffle(candidates)
+    used = set(seen)
+    for name, qty, price in candidates:
+        if order_key(name) not in used:
+            return CadabraOrder(item=name, quantity=qty, unit_price=price, total=qty * price)
+    name, qty, price = candidates[0]
+    return CadabraOrder(item=name, quantity=qty, unit_price=price, total=qty * price)
+
+
+def extract_prev_items(data: Dict[str, Any]) -> List[str]:
+    items = []
+    raw = data.get("cadabra_orders") or data.get("cadabraOrders") or []
+    if isinstance(raw, list):
+        for entry in raw:
+            if isinstance(entry, str):
+                val = entry.strip()
+                if val:
+                    items.append(val)
+            elif isinstance(entry, dict):
+                val = str(entry.get("item") or "").strip()
+                if val:
+                    items.append(val)
+    # Deduplicate preserving order
+    seen = set()
+    uniq = []
+    for val in items:
+        key = val.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        uniq.append(val)
+    return uniq
+
+
+def pool_ref(db, company_id: str):
+    return (
+        db.collection("companies")
+        .document(company_id)
+        .collection(POOL_COLLECTION)
+        .document(POOL_DOC)
+    )
+
+
+def refill_message(company_id: str) -> str:
+    return json.dumps({"company": company_id})
+
+
+def parse_refill_message(body: Any) -> Optional[str]:
+    if isinstance(body, (bytes, bytearray)):
+        body = body.decode("utf-8")
+    if isinstance(body, str):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            return None
+    if not isinstance(body, dict):
+        return None
+    return str(body.get("company") or "").strip() or None
+
+
+def take_order(
+    db, company_id: str, claim_when_empty: bool = True
+) -> Tuple[Dict[str, Any] | None, int, List[str], bool]:
+    """
+    Pop the next pooled order and mark it as handed out, in one transaction so
+    concurrent calls never get the same order. When the pool is at or below
+    POOL_LOW_WATER, the first caller also claims the refill request, so one
+    queue message goes out per refill across all workers. A caller that will
+    refill an empty pool inline passes claim_when_empty=False. Returns (order
+    or None, orders left, handed-out keys, whether to queue a refill).
+    """
+    ref = pool_ref(db, company_id)
+    tr = db.transaction()
+    now_ms = int(time.time() * 1000)
+
+    @firestore.transactional
+    def txn(transaction):
+        snap = ref.get(transaction=transaction)
+        data = (snap.to_dict() or {}) if snap.exists else {}
+        orders = list(data.get("orders") or [])
+        seen = list(data.get("seen") or [])
+        order = None
+        update: Dict[str, Any] = {}
+        if orders:
+            order = orders.pop(0)
+            seen = (seen + [order_key(order.get("item", ""))])[-SEEN_LIMIT:]
+            update.update({"orders": orders, "seen": seen})
+        requested_at = int(data.get("refill_requested_at") or 0)
+        request_refill = (
+            (order is not None or claim_when_empty)
+            and len(orders) <= POOL_LOW_WATER
+            and now_ms - requested_at > REFILL_RETRY_MS
+        )
+        if request_refill:
+            update["refill_requested_at"] = now_ms
+        if update:
+            update["updated"] = firestore.SERVER_TIMESTAMP
+            transaction.set(ref, update, merge=True)
+        return order, len(orders), seen, request_refill
+
+    return txn(tr)
+
+
+def mark_seen(db, company_id: str, item: str) -> None:
+    """
+    Record an order handed out outside the pool (a fallback) as seen. A pool
+    without a seen list is seeded from the legacy cadabra_orders first, as
+    refill_pool would.
+    """
+    ref = pool_ref(db, company_id)
+    company_ref = db.collection("companies").document(company_id)
+    tr = db.transaction()
+
+    @firestore.transactional
+    def txn(transaction):
+        snap = ref.get(transaction=transaction)
+        data = (snap.to_dict() or {}) if snap.exists else {}
+        if "seen" in data:
+            seen = list(data.get("seen") or [])
+        else:
+            company = company_ref.get(transaction=transaction).to_dict() or {}
+            seen = [order_key(i) for i in extract_prev_items(company)]
+        seen = (seen + [order_key(item)])[-SEEN_LIMIT:]
+        transaction.set(
+            ref, {"seen": seen, "updated": firestore.SERVER_TIMESTAMP}, merge=True
+        )
+
+    txn(tr)
+
+
+def refill_pool(db, client: Any, model: str, company_id: str, only_below: int | None = None) -> int:
+    """
+    Generate a batch of orders in one structured call and append the ones
+    whose normalized names are neither handed out nor already pooled.
+    Companies without a pool seed the handed-out set from the legacy
+    cadabra_orders list. With only_below, a pool already holding that many
+    orders is left alone (a duplicate refill message). Returns the number of
+    orders added.
+    """
+    ref = pool_ref(db, company_id)
+    pool_doc = ref.get()
+    pool = (pool_doc.to_dict() or {}) if pool_doc.exists else {}
+    if only_below is not None and len(pool.get("orders") or []) >= only_below:
+        ref.set({"refill_requested_at": 0}, merge=True)
+        return 0
+
+    company_doc = db.collection("companies").document(company_id).get()
+    data = company_doc.to_dict() if company_doc.exists else {}
+    company_desc = str(data.get("description") or "").strip()
+    company_name = str(data.get("company_name") or company_id).strip()
+    description = f"{company_name}: {company_desc}" if company_desc else company_name
+
+    if "seen" in pool:
+        prev_items = list(pool.get("seen") or [])
+    else:
+        prev_items = [order_key(item) for item in extract_prev_items(data)]
+    avoid = prev_items + [order_key(o.get("item", "")) for o in pool.get("orders") or []]
+    generated = [
+        normalize_order(o) for o in prompt_for_orders(client, model, description, avoid, POOL_BATCH)
+    ]
+
+    tr = db.transaction()
+
+    @firestore.transactional
+    def txn(transaction):
+        snap = ref.get(transaction=transaction)
+        current = (snap.to_dict() or {}) if snap.exists else {}
+        orders = list(current.get("orders") or [])
+        seen = list(current.get("seen") or []) if "seen" in current else prev_items[-SEEN_LIMIT:]
+        taken = set(seen) | {order_key(o.get("item", "")) for o in orders}
+        added = 0
+        for order in generated:
+            key = order_key(order["item"])
+            if not key or key in taken:
+                continue
+            taken.add(key)
+            orders.append(order)
+            added += 1
+        transaction.set(
+            ref,
+            {
+                "orders": orders,
+                "seen": seen,
+                "refill_requested_at": 0,
+                "updated": firestore.SERVER_TIMESTAMP,
+            },
+            merge=True,
+        )
+        return added
+
+    return txn(tr)
@@ -0,0 +1,139 @@
+import json
+from typing import Any, Container, Dict, Iterable, Iterator, List, Optional
+
+BLOCKER_MIN_FREE_PREFIX = 2
+BLOCKER_MAX_PER_ITEM = 2
+# key the parser adds to each item: its 0-based slot in the LLM's array
+PLAN_INDEX = "plan_index"
+
+
+class WorkItemStreamParser:
+    """
+    Incremental parser for a {"workitems": [...]} completion. Feed it text as
+    tokens arrive; every object in the workitems array is returned as soon as
+    its closing brace is seen. A malformed item is skipped without losing the
+    items around it, but still takes its slot: each item carries its position
+    in the original array under PLAN_INDEX so blocker orders stay aligned.
+    """
+
+    def __init__(self, key: str = "workitems"):
+        self.key = key
+        self._buf: List[str] = []
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._prefix = ""
+        self._obj: List[str] = []
+        self._index = 0
+        self.skipped = 0
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def _find_array(self, chunk: str) -> str:
+        # keep scanning until '"workitems"' ... '[' appears; return what follows
+        self._prefix += chunk
+        marker = f'"{self.key}"'
+        at = self._prefix.find(marker)
+        if at < 0:
+            self._prefix = self._prefix[-(len(marker) + 8) :]
+            return ""
+        rest = self._prefix[at + len(marker) :]
+        bracket = rest.find("[")
+        if bracket < 0:
+            return ""
+        self._in_array = True
+        self._prefix = ""
+        return rest[bracket + 1 :]
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        if self._done or not chunk:
+            return []
+        if not self._in_array:
+            chunk = self._find_array(chunk)
+        out: List[Dict[str, Any]] = []
+        for ch in chunk:
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._obj = [ch]
+                elif ch == "]":
+                    self._done = True
+                    break
+                continue
+            self._obj.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    item = self._decode("".join(self._obj))
+                    self._obj = []
+                    if item is not None:
+                        item[PLAN_INDEX] = self._index
+                        out.append(item)
+                    self._index += 1
+        return out
+
+    def _decode(self, text: str) -> Optional[Dict[str, Any]]:
+        try:
+            item = json.loads(text)
+        except ValueError:
+            self.skipped += 1
+            return None
+        if not isinstance(item, dict):
+            self.skipped += 1
+            return None
+        return item
+
+
+def parse_stream(chunks: Iterable[str], key: str = "workitems") -> Iterator[Dict[str, Any]]:
+    parser = WorkItemStreamParser(key)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            return
+
+
+def clean_blocker_orders(
+    raw_orders: Any,
+    position: int,
+    min_free_prefix: int = BLOCKER_MIN_FREE_PREFIX,
+    max_per_item: int = BLOCKER_MAX_PER_ITEM,
+    known: Optional[Container[int]] = None,
+) -> List[int]:
+    """
+    Valid 1-based blocker orders for the item at 0-based position, checked
+    against the items already seen. Orders that point forward, repeat, or
+    exceed the per-item cap are dropped rather than failing the whole plan.
+    When known is given, orders whose 0-based slot is not in it (an item the
+    parser skipped) are dropped too.
+    """
+    if position < min_free_prefix or not isinstance(raw_orders, list):
+        return []
+    out: List[int] = []
+    for raw in raw_orders:
+        try:
+            order = int(raw)
+        except (TypeError, ValueError):
+            continue
+        if known is not None and order - 1 not in known:
+            continue
+        if 1 <= order <= position and order not in out:
+            out.append(order)
+        if len(out) >= max_per_item:
+            break
+    return out
@@ -0,0 +1,165 @@
+import math
+from typing import Any, Dict, Mapping, Optional
+
+from shared_code.schedule import MS_PER_HOUR, UI_CALENDAR, WorkCalendar
+
+ASSIST_MIN_SIM_MS = 20_000
+ASSIST_PROGRESS_MAX = 85
+ACTIVE_STATUSES = ("doing", "in_progress")
+ASSIST_OPEN_STATUSES = ("due", "sending", "pending", "awaiting_reply")
+
+
+def _num(value: Any, default: float = 0.0) -> float:
+    try:
+        out = float(value)
+    except (TypeError, ValueError):
+        return default
+    return out if math.isfinite(out) else default
+
+
+def is_burned_out(employee: Optional[Mapping[str, Any]]) -> bool:
+    return str((employee or {}).get("status") or "").lower() == "burnout"
+
+
+def stress_multiplier(employee: Optional[Mapping[str, Any]]) -> float:
+    """Same rule as getStressMultiplier in the UI stress service."""
+    if not employee:
+        return 1.0
+    if is_burned_out(employee):
+        return math.inf
+    stress = min(100.0, max(0.0, _num(employee.get("stress"))))
+    return 1.0 + stress / 100.0
+
+
+def allows_off_hours(employee: Optional[Mapping[str, Any]]) -> bool:
+    emp = employee or {}
+    return bool(emp.get("offHoursAllowed", emp.get("off_hours_allowed", False)))
+
+
+def worked_ms(
+    item: Mapping[str, Any],
+    employee: Optional[Mapping[str, Any]],
+    sim_ms: float,
+    calendar: WorkCalendar = UI_CALENDAR,
+) -> float:
+    base = _num(item.get("worked_ms"))
+    started = _num(item.get("started_at"))
+    status = str(item.get("status") or "")
+    if status not in ACTIVE_STATUSES or not started or is_burned_out(employee):
+        return base
+    if sim_ms <= started:
+        return base
+    if allows_off_hours(employee):
+        return base + (sim_ms - started)
+    hours = calendar.working_hours_between(
+        calendar.from_ms(started), calendar.from_ms(sim_ms)
+    )
+    return base + hours * MS_PER_HOUR
+
+
+def needed_ms(item: Mapping[str, Any], employee: Optional[Mapping[str, Any]]) -> float:
+    return _num(item.get("estimated_hours")) * stress_multiplier(employee) * MS_PER_HOUR
+
+
+def progress_pct(
+    item: Mapping[str, Any],
+    employee: Optional[Mapping[str, Any]],
+    sim_ms: float,
+    calendar: WorkCalendar = UI_CALENDAR,
+) -> int:
+    if not item.get("assignee_id") or is_burned_out(employee):
+        return 0
+    need = needed_ms(item, employee)
+    if not need or not math.isfinite(need):
+        return 0
+    done = worked_ms(item, employee, sim_ms, calendar)
+    return int(round(min(100.0, max(0.0, done / need * 100.0))))
+
+
+def reached_at(
+    item: Mapping[str, Any],
+    employee: Optional[Mapping[str, Any]],
+    pct: float,
+    calendar: WorkCalendar = UI_CALENDAR,
+) -> Optional[int]:
+    """
+    Sim time (ms) at which the running item reaches pct, solved in closed form
+    from started_at, banked worked_ms and the assignee's calendar.
+    """
+    need = needed_ms(item, employee)
+    started = _num(item.get("started_at"))
+    if not need or not math.isfinite(need) or not started:
+        return None
+    # the UI rounds progress, so 99.5% already shows as done
+    target = need * max(0.0, pct - 0.5) / 100.0
+    remaining = target - _num(item.get("worked_ms"))
+    if remaining <= 0:
+        return int(started)
+    if allows_off_hours(employee):
+        return int(started + remaining)
+    finish = calendar.add_work_hours(calendar.from_ms(started), remaining / MS_PER_HOUR)
+    return calendar.to_ms(finish)
+
+
+def _blocked(item: Mapping[str, Any], status_by_id: Mapping[str, str]) -> bool:
+    return any(
+        status_by_id.get(str(b), "done") != "done" for b in item.get("blockers") or []
+    )
+
+
+def assist_trigger(item: Mapping[str, Any]) -> Optional[int]:
+    raw = item.get("assist_trigger_pct")
+    if raw is None:
+        return None
+    value = int(round(_num(raw)))
+    if value < 1 or value > ASSIST_PROGRESS_MAX:
+        return None
+    return value
+
+
+def advance_items(
+    items: Mapping[str, Mapping[str, Any]],
+    employees: Mapping[str, Mapping[str, Any]],
+    sim_ms: float,
+    calendar: WorkCalendar = UI_CALENDAR,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    One catch-up pass over a company's work items at sim_ms. Returns only the
+    patches for items whose state changes: finished items become done (with
+    the sim time they actually finished), and items that crossed their assist
+    trigger are flagged as due.
+    """
+    status_by_id = {wid: str(it.get("status") or "todo") for wid, it in items.items()}
+    patches: Dict[str, Dict[str, Any]] = {}
+    for wid, item in items.items():
+        if status_by_id[wid] not in ACTIVE_STATUSES:
+            continue
+        emp_id = str(item.get("assignee_id") or "")
+        if not emp_id or not item.get("started_at"):
+            continue
+        employee = employees.get(emp_id)
+        if is_burned_out(employee) or _blocked(item, status_by_id):
+            continue
+        pct = progress_pct(item, employee, sim_ms, calendar)
+        if pct >= 100:
+            done_at = reached_at(item, employee, 100, calendar)
+            patches[wid] = {
+                "status": "done",
+                "completed_at": int(min(sim_ms, done_at or sim_ms)),
+            }
+            continue
+        trigger = assist_trigger(item)
+        if trigger is None or pct < trigger:
+            continue
+        if item.get("assist_last_sent_at"):
+            continue
+        if str(item.get("assist_status") or "").lower() in ASSIST_OPEN_STATUSES:
+            continue
+        if sim_ms - _num(item.get("started_at")) < ASSIST_MIN_SIM_MS:
+            continue
+        due_at = reached_at(item, employee, trigger, calendar)
+        patches[wid] = {
+            "assist_status": "due",
+            "assist_due_at": int(min(sim_ms, due_at or sim_ms)),
+        }
+    return patches
@@ -0,0 +1,79 @@
+import json
+import logging
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+logger = logging.getLogger("prompts")
+
+# Azure OpenAI only caches prompts of at least this many tokens, in 128-token steps.
+CACHE_MIN_TOKENS = 1024
+
+
+def layered_messages(
+    instructions: str,
+    context: str = "",
+    history: Sequence[Mapping[str, str]] = (),
+    turn: str = "",
+) -> List[Dict[str, str]]:
+    """
+    Chat messages ordered for provider-side prefix caching: the static
+    instructions shared by every call of an endpoint come first, then the
+    per-company context, then prior messages, and the data that changes on
+    every call (speaker, clock, latest email) last. Anything volatile placed
+    earlier would change the prefix and miss the cache.
+    """
+    messages = [{"role": "system", "content": instructions}]
+    if context:
+        messages.append({"role": "system", "content": context})
+    messages.extend({"role": m["role"], "content": m["content"]} for m in history)
+    if turn:
+        messages.append({"role": "user", "content": turn})
+    return messages
+
+
+def context_block(title: str, fields: Mapping[str, Any]) -> str:
+    """A per-company block with stable key order, so equal context renders equal text."""
+    lines = [f"{title}:"]
+    for key, value in fields.items():
+        if value in (None, "", [], {}):
+            continue
+        if not isinstance(value, str):
+            value = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+        lines.append(f"{key}: {value}")
+    return "\n".join(lines)
+
+
+def usage_counts(response: Any) -> Dict[str, int]:
+    """prompt, completion and cached prompt tokens from a completion's usage field."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) if details is not None else 0
+    return {
+        "prompt_tokens": int(getattr(usage, "prompt_tokens", 0) or 0),
+        "completion_tokens": int(getattr(usage, "completion_tokens", 0) or 0),
+        "cached_tokens": int(cached or 0),
+    }
+
+
+def record_usage(endpoint: str, response: Any) -> Optional[Dict[str, int]]:
+    """
+    Log a prompt_usage line with the call's tokens and cached share, so
+    cache-hit rate and cost can be read from the logs per endpoint.
+    """
+    counts = usage_counts(response)
+    if not counts:
+        return None
+    prompt = counts["prompt_tokens"]
+    logger.info(
+        "prompt_usage %s",
+        json.dumps(
+            {
+                "endpoint": endpoint,
+                **counts,
+                "cached_share": round(counts["cached_tokens"] / prompt, 4) if prompt else 0.0,
+            }
+        ),
+    )
+    return counts
+
@@ -0,0 +1,167 @@
+import re
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+MIN_RATE = 0.1
+MAX_RATE = 5.0
+EMBED_DIM = 512
+
+# log(rate) is linear in FEATURES. These hand-set values follow the old
+# estimate_hours curve (6 + 8 * complexity hours, +-5% per skill level) plus a
+# skill-match bonus; refit them with tests/company/calibrate_rate_model.py.
+DEFAULT_PARAMS: Dict[str, float] = {
+    "intercept": 0.35,
+    "match": 1.9,
+    "role": 0.8,
+    "level": 0.55,
+    "complexity": -0.21,
+}
+FEATURES = ("match", "role", "level", "complexity")
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _grams(text: str) -> List[str]:
+    out: List[str] = []
+    for word in _WORD.findall(text.lower()):
+        out.append("w:" + word)
+        padded = f"<{word}>"
+        out.extend("g:" + padded[i : i + 3] for i in range(len(padded) - 2))
+    return out
+
+
+@lru_cache(maxsize=8192)
+def text_vector(text: str) -> np.ndarray:
+    """
+    Local hashed embedding of words and character trigrams, unit length.
+    crc32 keeps buckets stable across processes (str hash is salted), and the
+    cache means each skill name or work item text is embedded once.
+    """
+    vec = np.zeros(EMBED_DIM, dtype=np.float32)
+    for g in _grams(text):
+        h = zlib.crc32(g.encode("utf-8"))
+        vec[h % EMBED_DIM] += 1.0 if (h >> 16) & 1 else -1.0
+    norm = float(np.linalg.norm(vec))
+    if norm:
+        vec /= norm
+    vec.flags.writeable = False
+    return vec
+
+
+def _stack(texts: Sequence[str]) -> np.ndarray:
+    if not texts:
+        return np.zeros((0, EMBED_DIM), dtype=np.float32)
+    return np.stack([text_vector(t) for t in texts])
+
+
+def _item_text(item: Mapping[str, Any]) -> str:
+    return f"{item.get('title') or ''} {item.get('description') or ''}".strip()
+
+
+def _complexity(item: Mapping[str, Any]) -> int:
+    try:
+        return max(1, min(5, int(item.get("complexity", 3))))
+    except (TypeError, ValueError):
+        return 3
+
+
+def _skill_level(skill: Mapping[str, Any]) -> float:
+    try:
+        return max(1.0, min(10.0, float(skill.get("level", 5))))
+    except (TypeError, ValueError):
+        return 5.0
+
+
+def features(
+    employees: Sequence[Mapping[str, Any]], workitems: Sequence[Mapping[str, Any]]
+) -> Dict[str, np.ndarray]:
+    """
+    Feature matrices of shape (items, employees):
+      match       best skill similarity to the item, weighted by skill level
+      role        similarity between the employee's title and the item
+      level       mean skill level, centered and scaled to -0.5..0.5
+      complexity  item complexity minus 3
+    """
+    n_items, n_emps = len(workitems), len(employees)
+    items = _stack([_item_text(it) for it in workitems])
+    skill_texts: List[str] = []
+    skill_levels: List[float] = []
+    starts: List[int] = []
+    mean_level = np.full(n_emps, 5.0)
+    for e, emp in enumerate(employees):
+        starts.append(len(skill_texts))
+        skills = [s for s in emp.get("skills") or [] if str(s.get("skill") or "").strip()]
+        if not skills:
+            skills = [{"skill": "generalist", "level": 5}]
+        levels = [_skill_level(s) for s in skills]
+        mean_level[e] = sum(levels) / len(levels)
+        skill_texts.extend(str(s["skill"]) for s in skills)
+        skill_levels.extend(levels)
+
+    if n_emps and n_items:
+        sim = np.clip(items @ _stack(skill_texts).T, 0.0, None)
+        sim *= np.asarray(skill_levels, dtype=np.float32)[None, :] / 10.0
+        match = np.maximum.reduceat(sim, starts, axis=1)
+        titles = _stack([str(emp.get("title") or "") for emp in employees])
+        role = np.clip(items @ titles.T, 0.0, None)
+    else:
+        match = np.zeros((n_items, n_emps), dtype=np.float32)
+        role = np.zeros((n_items, n_emps), dtype=np.float32)
+    cx = np.asarray([_complexity(it) for it in workitems], dtype=np.float64) - 3.0
+    return {
+        "match": match.astype(np.float64),
+        "role": role.astype(np.float64),
+        "level": np.broadcast_to((mean_level - 5.0) / 10.0, (n_items, n_emps)),
+        "complexity": np.broadcast_to(cx[:, None], (n_items, n_emps)),
+    }
+
+
+def rate_matrix(
+    employees: Sequence[Mapping[str, Any]],
+    workitems: Sequence[Mapping[str, Any]],
+    params: Optional[Mapping[str, float]] = None,
+) -> np.ndarray:
+    p = dict(DEFAULT_PARAMS, **(params or {}))
+    feats = features(employees, workitems)
+    log_rate = np.full((len(workitems), len(employees)), p["intercept"])
+    for name in FEATURES:
+        log_rate = log_rate + p[name] * feats[name]
+    return np.clip(np.exp(log_rate), MIN_RATE, MAX_RATE)
+
+
+def heuristic_rates(
+    employees: Sequence[Mapping[str, Any]],
+    workitems: Sequence[Mapping[str, Any]],
+    params: Optional[Mapping[str, float]] = None,
+) -> Dict[str, Dict[str, float]]:
+    """Employee x work item rates in the same shape the LLM rate call returns."""
+    rates = rate_matrix(employees, workitems, params)
+    emp_ids = [str(e["id"]) for e in employees]
+    return {
+        str(it["id"]): {eid: round(float(r), 4) for eid, r in zip(emp_ids, row)}
+        for it, row in zip(workitems, rates)
+    }
+
+
+def fit_params(
+    samples: Sequence[Tuple[Mapping[str, Any], Mapping[str, Any], float]],
+) -> Dict[str, float]:
+    """
+    Least-squares fit of log(rate) on the features, from (employee, item,
+    observed rate) triples.
+    """
+    rows = []
+    targets = []
+    for emp, item, rate in samples:
+        if not rate or rate <= 0:
+            continue
+        feats = features([emp], [item])
+        rows.append([1.0] + [float(feats[name][0, 0]) for name in FEATURES])
+        targets.append(np.log(min(MAX_RATE, max(MIN_RATE, float(rate)))))
+    if len(rows) <= len(FEATURES):
+        return dict(DEFAULT_PARAMS)
+    coef, *_ = np.linalg.lstsq(np.asarray(rows), np.asarray(targets), rcond=None)
+    return {"intercept": float(coef[0]), **{n: float(c) for n, c in zip(FEATURES, coef[1:])}}
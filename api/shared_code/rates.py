@@ -0,0 +1,569 @@
+import hashlib
+import logging
+import math
+from enum import Enum
+from json import dumps
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from firebase_admin import firestore
+from pydantic import BaseModel, ConfigDict, Field, create_model
+from shared_code.assignment import assign_workitems
+from shared_code.rate_model import MAX_RATE, MIN_RATE, heuristic_rates
+
+MAX_EMPLOYEES = 25
+MAX_SKILLS_PER_EMPLOYEE = 12
+MAX_WORKITEMS = 60
+RATE_CACHE_COLLECTION = "rate_cache"
+RATE_MATRIX_COLLECTION = "rate_matrix"
+RATE_MATRIX_DOC = "current"
+RATE_MATRIX_SCHEMA = 1
+
+logger = logging.getLogger("rates")
+
+Assignments = Dict[str, Dict[str, float]]
+
+
+def safe_int(value: Any, default: int = 0) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def clamp_rate(value: Any) -> float:
+    try:
+        num = float(value)
+    except (TypeError, ValueError):
+        return MIN_RATE
+    if not math.isfinite(num):
+        return MIN_RATE
+    return max(MIN_RATE, min(MAX_RATE, num))
+
+
+def hours_from_rate(rate: float) -> int:
+    pct = max(MIN_RATE, min(MAX_RATE, rate))
+    return max(1, int(round(100.0 / pct)))
+
+
+def normalize_skills(raw_skills: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    skills: List[Dict[str, Any]] = []
+    for sk in raw_skills or []:
+        title = str((sk or {}).get("skill") or "").strip()
+        if not title:
+            continue
+        lvl = max(1, min(10, safe_int((sk or {}).get("level", 5), 5)))
+        skills.append({"skill": title, "level": lvl})
+        if len(skills) >= MAX_SKILLS_PER_EMPLOYEE:
+            break
+    if not skills:
+        skills.append({"skill": "generalist", "level": 5})
+    return skills
+
+
+def employee_record(
+    emp_id: str, data: Mapping[str, Any], raw_skills: Sequence[Mapping[str, Any]]
+) -> Dict[str, Any]:
+    return {
+        "id": emp_id,
+        "name": str(data.get("name") or "").strip(),
+        "title": str(data.get("title") or "").strip(),
+        "skills": normalize_skills(raw_skills),
+    }
+
+
+def employees_from_context(
+    raw_employees: Sequence[Mapping[str, Any]],
+) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+    """Employees already loaded with their skills (the workitems bootstrap)."""
+    by_id: Dict[str, Dict[str, Any]] = {}
+    ordered: List[Dict[str, Any]] = []
+    for emp in raw_employees or []:
+        emp_id = str(emp.get("id") or "").strip()
+        if not emp_id:
+            continue
+        record = employee_record(emp_id, emp, emp.get("skills") or [])
+        by_id[emp_id] = record
+        ordered.append(record)
+        if len(ordered) >= MAX_EMPLOYEES:
+            break
+    return by_id, ordered
+
+
+def load_employees(
+    company_ref,
+) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+    by_id: Dict[str, Dict[str, Any]] = {}
+    ordered: List[Dict[str, Any]] = []
+    try:
+        cursor = company_ref.collection("employees").where("hired", "==", True).stream()
+    except Exception:
+        cursor = []
+    for snap in cursor:
+        skills: List[Dict[str, Any]] = []
+        try:
+            skills = [s.to_dict() or {} for s in snap.reference.collection("skills").stream()]
+        except Exception as exc:
+            logger.debug("failed to load skills for %s: %s", snap.id, exc)
+        record = employee_record(snap.id, snap.to_dict() or {}, skills)
+        by_id[snap.id] = record
+        ordered.append(record)
+        if len(ordered) >= MAX_EMPLOYEES:
+            break
+    return by_id, ordered
+
+
+def load_workitems(company_ref, include_done: bool = False) -> List[Dict[str, Any]]:
+    items: List[Dict[str, Any]] = []
+    try:
+        cursor = company_ref.collection("workitems").stream()
+    except Exception:
+        cursor = []
+    for snap in cursor:
+        data = snap.to_dict() or {}
+        status = str(data.get("status") or "").strip().lower()
+        if not include_done and status == "done":
+            continue
+        items.append(
+            {
+                "id": snap.id,
+                "title": str(data.get("title") or ""),
+                "description": str(data.get("description") or ""),
+                "complexity": safe_int(data.get("complexity"), 3),
+                "status": status,
+                "assignee_id": str(data.get("assignee_id") or ""),
+                "blockers": [str(b) for b in data.get("blockers") or []],
+                "rate_per_hour": data.get("rate_per_hour"),
+                "estimated_hours": data.get("estimated_hours"),
+                "legacy_rates": "rates" in data,
+            }
+        )
+        if len(items) >= MAX_WORKITEMS:
+            break
+    return items
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha1(dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:20]
+
+
+def employee_key(emp: Mapping[str, Any]) -> str:
+    """Content hash of what the rate depends on for an employee: title and skills."""
+    skills = sorted(
+        (str(s.get("skill") or "").strip().lower(), safe_int(s.get("level"), 5))
+        for s in emp.get("skills") or []
+    )
+    return _digest(str(emp.get("title") or "").strip().lower(), skills)
+
+
+def workitem_key(item: Mapping[str, Any]) -> str:
+    return _digest(
+        str(item.get("title") or "").strip(),
+        str(item.get("description") or "").strip(),
+        max(1, min(5, safe_int(item.get("complexity"), 3))),
+    )
+
+
+def build_rate_payload(
+    employees: Sequence[Mapping[str, Any]],
+    workitems: Sequence[Mapping[str, Any]],
+    context: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    payload = {
+        "employees": [
+            {"id": emp["id"], "title": emp["title"], "skills": emp["skills"]}
+            for emp in employees
+        ],
+        "workitems": [
+            {
+                "id": itm["id"],
+                "title": itm["title"],
+                "description": itm["description"],
+                "complexity": max(1, min(5, safe_int(itm.get("complexity"), 3))),
+            }
+            for itm in workitems
+        ],
+        "instructions": (
+            "For every work item return an object with fields workitem_id and employees. "
+            "employees is an array that lists every employee exactly once. "
+            "Each entry has fields employee_id and rate. "
+            "Rate must be between 0.1 and 5.0."
+        ),
+        "rate_scale": "percentage of work completed per simulated hour",
+    }
+    if context:
+        payload["focus_context"] = context
+    return payload
+
+
+def call_rate_assignments(client, deployment: str, payload: Dict[str, Any]) -> Assignments:
+    if not payload.get("employees") or not payload.get("workitems"):
+        return {}
+    employee_ids = [str(e["id"]) for e in payload.get("employees", [])]
+    workitem_ids = [str(w["id"]) for w in payload.get("workitems", [])]
+    EmpEnum = Enum("EmpEnum", {f"e_{i}": v for i, v in enumerate(employee_ids)})
+    WorkEnum = Enum("WorkEnum", {f"w_{i}": v for i, v in enumerate(workitem_ids)})
+
+    class SOModel(BaseModel):
+        model_config = ConfigDict(extra="forbid")
+
+    RateCellDyn = create_model(
+        "RateCellDyn",
+        __base__=SOModel,
+        employee_id=(EmpEnum, ...),
+        rate=(float, Field(..., ge=MIN_RATE, le=MAX_RATE)),
+    )
+    WorkItemRatesDyn = create_model(
+        "WorkItemRatesDyn",
+        __base__=SOModel,
+        workitem_id=(WorkEnum, ...),
+        employees=(
+            List[RateCellDyn],
+            Field(..., min_length=len(employee_ids), max_length=len(employee_ids)),
+        ),
+    )
+    RateAssignmentsDyn = create_model(
+        "RateAssignmentsDyn",
+        __base__=SOModel,
+        assignments=(
+            List[WorkItemRatesDyn],
+            Field(..., min_length=len(workitem_ids), max_length=len(workitem_ids)),
+        ),
+    )
+    system = (
+        "You are an expert workforce planner. "
+        "Return only JSON that conforms to the schema. "
+        f"Rates must be between {MIN_RATE} and {MAX_RATE}. "
+        "For each work item include workitem_id and an employees array that contains every employee exactly once."
+    )
+    completion = client.beta.chat.completions.parse(
+        model=deployment,
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": dumps(payload)},
+        ],
+        temperature=0.2,
+        top_p=0.9,
+        max_tokens=8192,
+        response_format=RateAssignmentsDyn,
+    )
+    parsed = completion.choices[0].message.parsed
+    mapped: Assignments = {}
+    for row in getattr(parsed, "assignments", []):
+        mapped[str(row.workitem_id.value)] = {
+            str(cell.employee_id.value): float(cell.rate) for cell in row.employees
+        }
+    return {
+        wid: {
+            eid: clamp_rate(rate)
+            for eid, rate in mapped.get(wid, {}).items()
+            if eid in employee_ids
+        }
+        for wid in workitem_ids
+    }
+
+
+def fallback_assignments(
+    workitems: Sequence[Mapping[str, Any]], employees_by_id: Mapping[str, Any]
+) -> Assignments:
+    """Skill-match heuristic rates, used when the LLM has no answer."""
+    if not employees_by_id or not workitems:
+        return {}
+    return heuristic_rates(list(employees_by_id.values()), workitems)
+
+
+class MemoryRateCache:
+    """Rate cells keyed by employee hash, then work item hash."""
+
+    def __init__(self):
+        self.cells: Dict[str, Dict[str, float]] = {}
+
+    def get_many(self, emp_keys: Sequence[str]) -> Dict[str, Dict[str, float]]:
+        return {k: dict(self.cells[k]) for k in emp_keys if k in self.cells}
+
+    def put_many(self, cells: Mapping[str, Mapping[str, float]]) -> None:
+        for ek, row in cells.items():
+            self.cells.setdefault(ek, {}).update(row)
+
+
+class FirestoreRateCache:
+    """
+    Company-scoped rate cache: one doc per employee hash under rate_cache,
+    holding a map of work item hash to rate.
+    """
+
+    def __init__(self, db, company_ref):
+        self.db = db
+        self.col = company_ref.collection(RATE_CACHE_COLLECTION)
+
+    def get_many(self, emp_keys: Sequence[str]) -> Dict[str, Dict[str, float]]:
+        if not emp_keys:
+            return {}
+        out: Dict[str, Dict[str, float]] = {}
+        for snap in self.db.get_all([self.col.document(k) for k in emp_keys]):
+            if snap.exists:
+                out[snap.id] = dict((snap.to_dict() or {}).get("rates") or {})
+        return out
+
+    def put_many(self, cells: Mapping[str, Mapping[str, float]]) -> None:
+        if not cells:
+            return
+        batch = self.db.batch()
+        for ek, row in cells.items():
+            batch.set(
+                self.col.document(ek),
+                {"rates": dict(row), "updated": firestore.SERVER_TIMESTAMP},
+                merge=True,
+            )
+        batch.commit()
+
+
+def rate_matrix_ref(company_ref):
+    return company_ref.collection(RATE_MATRIX_COLLECTION).document(RATE_MATRIX_DOC)
+
+
+def pack_rate_matrix(
+    assignments: Assignments, employee_ids: Sequence[str], item_ids: Sequence[str]
+) -> Dict[str, Any]:
+    """
+    The company's rate matrix as one document: employee and item id arrays
+    plus the cells as little-endian float32 bytes, row-major by item. Cells
+    without a rate are NaN.
+    """
+    col = {str(eid): k for k, eid in enumerate(employee_ids)}
+    grid = np.full((len(item_ids), len(employee_ids)), np.nan, dtype="<f4")
+    for i, wid in enumerate(item_ids):
+        for eid, rate in (assignments.get(str(wid)) or {}).items():
+            if str(eid) in col:
+                grid[i, col[str(eid)]] = clamp_rate(rate)
+    return {
+        "schema": RATE_MATRIX_SCHEMA,
+        "employees": [str(e) for e in employee_ids],
+        "items": [str(w) for w in item_ids],
+        "rates": grid.tobytes(),
+    }
+
+
+def unpack_rate_matrix(data: Mapping[str, Any]) -> Assignments:
+    employees = [str(e) for e in data.get("employees") or []]
+    items = [str(w) for w in data.get("items") or []]
+    raw = data.get("rates") or b""
+    if not employees or not items or len(raw) != 4 * len(employees) * len(items):
+        return {}
+    grid = np.frombuffer(bytes(raw), dtype="<f4").reshape(len(items), len(employees))
+    out: Assignments = {}
+    for wid, row in zip(items, grid):
+        cells = {eid: round(float(v), 4) for eid, v in zip(employees, row) if np.isfinite(v)}
+        if cells:
+            out[wid] = cells
+    return out
+
+
+def load_rate_matrix(company_ref) -> Assignments:
+    try:
+        snap = rate_matrix_ref(company_ref).get()
+    except Exception as exc:
+        logger.debug("failed to load rate matrix: %s", exc)
+        return {}
+    return unpack_rate_matrix(snap.to_dict() or {}) if snap.exists else {}
+
+
+def rate_matrix(
+    employees: Sequence[Mapping[str, Any]],
+    workitems: Sequence[Mapping[str, Any]],
+    cache,
+    fetch: Callable[[Dict[str, Any]], Assignments],
+    context: Optional[Dict[str, Any]] = None,
+) -> Tuple[Assignments, Dict[str, Any]]:
+    """
+    Full employee x work item rate matrix, reusing cached cells. Only the
+    employees and items that own a missing cell are sent to fetch, and the
+    fresh cells are written back. Returns (assignments, info).
+    """
+    ekeys = {emp["id"]: employee_key(emp) for emp in employees}
+    wkeys = {itm["id"]: workitem_key(itm) for itm in workitems}
+    cached = cache.get_many(sorted(set(ekeys.values())))
+    out: Assignments = {itm["id"]: {} for itm in workitems}
+    missing_emps: List[Mapping[str, Any]] = []
+    missing_items: Dict[str, Mapping[str, Any]] = {}
+    for emp in employees:
+        row = cached.get(ekeys[emp["id"]], {})
+        emp_missing = False
+        for itm in workitems:
+            rate = row.get(wkeys[itm["id"]])
+            if rate is None:
+                emp_missing = True
+                missing_items[itm["id"]] = itm
+            else:
+                out[itm["id"]][emp["id"]] = clamp_rate(rate)
+        if emp_missing:
+            missing_emps.append(emp)
+    info = {
+        "cells": len(employees) * len(workitems),
+        "cached": sum(len(r) for r in out.values()),
+        "requested": 0,
+    }
+    if not missing_emps:
+        return out, info
+    items = [itm for itm in workitems if itm["id"] in missing_items]
+    fresh = fetch(build_rate_payload(missing_emps, items, context)) or {}
+    to_cache: Dict[str, Dict[str, float]] = {}
+    for itm in items:
+        for emp in missing_emps:
+            rate = (fresh.get(itm["id"]) or {}).get(emp["id"])
+            if rate is None:
+                continue
+            rate = clamp_rate(rate)
+            out[itm["id"]][emp["id"]] = rate
+            to_cache.setdefault(ekeys[emp["id"]], {})[wkeys[itm["id"]]] = round(rate, 4)
+            info["requested"] += 1
+    try:
+        cache.put_many(to_cache)
+    except Exception as exc:
+        logger.debug("failed to store rate cells: %s", exc)
+    return out, info
+
+
+def apply_assignments(
+    db,
+    company_ref,
+    workitems: List[Dict[str, Any]],
+    employees_by_id: Mapping[str, Any],
+    assignments: Assignments,
+    extra: Optional[Dict[str, Any]] = None,
+    reassign: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Store the matrix in the company's rate_matrix doc and write each work
+    item's assignee, the assignee's rate and estimated hours. Assignees come
+    from the makespan solver over the whole matrix; existing assignments are
+    kept unless reassign is set and the item is not started. Items whose
+    values did not change are not rewritten. The item dicts are updated in
+    place so callers can keep scheduling from them.
+    """
+    normalized: Dict[str, Dict[str, float]] = {}
+    for wi in workitems:
+        row = {
+            emp_id: round(clamp_rate(rate), 4)
+            for emp_id, rate in (assignments.get(wi["id"]) or {}).items()
+            if emp_id in employees_by_id
+        }
+        if row:
+            normalized[wi["id"]] = row
+    try:
+        chosen = assign_workitems(
+            [wi for wi in workitems if wi["id"] in normalized],
+            list(employees_by_id),
+            normalized,
+            reassign=reassign,
+        )
+    except Exception as exc:
+        logger.warning("assignment solver failed, using best rates: %s", exc)
+        chosen = {}
+
+    summaries: List[Dict[str, Any]] = []
+    batch = db.batch()
+    for wi in workitems:
+        work_id = wi["id"]
+        rounded = normalized.get(work_id)
+        if not rounded:
+            continue
+        current_assignee = str(wi.get("assignee_id") or "").strip()
+        best_emp, best_rate = max(rounded.items(), key=lambda pair: pair[1])
+        assignee = chosen.get(work_id) or current_assignee
+        if not assignee and str(wi.get("status") or "").lower() != "done":
+            assignee = best_emp
+        rate = rounded.get(assignee, best_rate)
+        est_hours = hours_from_rate(rate)
+        summaries.append(
+            {
+                "workitem_id": work_id,
+                "assignee_id": assignee,
+                "rate": rate,
+                "estimated_hours": est_hours,
+            }
+        )
+        update_doc: Dict[str, Any] = {}
+        if assignee != current_assignee:
+            update_doc["assignee_id"] = assignee
+        if abs(clamp_rate(wi.get("rate_per_hour")) - rate) > 1e-4:
+            update_doc["rate_per_hour"] = rate
+        if safe_int(wi.get("estimated_hours")) != est_hours:
+            update_doc["estimated_hours"] = est_hours
+        if wi.pop("legacy_rates", False):
+            # per-item maps predate the rate_matrix doc
+            update_doc["rates"] = firestore.DELETE_FIELD
+        wi.update(assignee_id=assignee, rate_per_hour=rate, estimated_hours=est_hours)
+        if update_doc:
+            update_doc["updated"] = firestore.SERVER_TIMESTAMP
+            batch.update(company_ref.collection("workitems").document(work_id), update_doc)
+    if normalized:
+        matrix = pack_rate_matrix(normalized, list(employees_by_id), list(normalized))
+        matrix.update(
+            {"version": firestore.Increment(1), "updated": firestore.SERVER_TIMESTAMP}
+        )
+        matrix.update(extra or {})
+        batch.set(rate_matrix_ref(company_ref), matrix, merge=True)
+        try:
+            batch.commit()
+        except Exception as exc:
+            logger.warning("failed to write work item rates: %s", exc)
+    return summaries
+
+
+def refresh_rates(
+    db,
+    client,
+    deployment: str,
+    company_ref,
+    context: Optional[Dict[str, Any]] = None,
+    extra: Optional[Dict[str, Any]] = None,
+    employees: Optional[Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]] = None,
+    workitems: Optional[List[Dict[str, Any]]] = None,
+    reassign: bool = False,
+) -> Dict[str, Any]:
+    """
+    The rate service shared by estimate, focus_rates and the work item
+    bootstrap: load (or take) employees and items, fill the matrix from the
+    cache plus one LLM call for the changed cells, and apply it.
+    """
+    by_id, ordered = employees if employees is not None else load_employees(company_ref)
+    if not ordered:
+        return {"error": "no employees"}
+    items = workitems if workitems is not None else load_workitems(company_ref)
+    if not items:
+        return {"error": "no workitems"}
+    used_fallback = False
+
+    def fetch(payload: Dict[str, Any]) -> Assignments:
+        try:
+            return call_rate_assignments(client, deployment, payload)
+        except Exception as exc:
+            # cached cells still apply; the heuristic fills the rest below
+            logger.exception("LLM rate generation failed: %s", exc)
+            return {}
+
+    try:
+        assignments, info = rate_matrix(
+            ordered, items, FirestoreRateCache(db, company_ref), fetch, context
+        )
+    except Exception as exc:
+        logger.exception("Rate cache lookup failed: %s", exc)
+        assignments, info = {}, {}
+    if not assignments or any(len(row) < len(ordered) for row in assignments.values()):
+        fallback = fallback_assignments(items, by_id)
+        for wid, row in fallback.items():
+            merged = dict(row)
+            merged.update(assignments.get(wid) or {})
+            assignments[wid] = merged
+        used_fallback = True
+    summaries = apply_assignments(
+        db, company_ref, items, by_id, assignments, extra, reassign=reassign
+    )
+    return {
+        "ok": True,
+        "used_fallback": used_fallback,
+        "rates": assignments,
+        "applied": summaries,
+        "cache": info,
+    }
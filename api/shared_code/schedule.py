@@ -0,0 +1,234 @@
+import heapq
+import math
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+MS_PER_HOUR = 3_600_000
+EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday (Monday == 0)
+SLACK_EPSILON = 1e-6
+
+
+class WorkCalendar:
+    """
+    Working-hours calendar with closed-form arithmetic. Times are hours since
+    the Unix epoch in the calendar's local time; every conversion is O(1)
+    regardless of how many days or weekends a span covers.
+
+    The defaults match the UI (08:00-17:00, Monday to Friday).
+    """
+
+    def __init__(
+        self,
+        start_hour: float = 8,
+        end_hour: float = 17,
+        workdays: Iterable[int] = (0, 1, 2, 3, 4),
+        utc_offset_minutes: int = 0,
+    ):
+        if end_hour <= start_hour:
+            raise ValueError("end_hour must be after start_hour")
+        self.start_hour = float(start_hour)
+        self.end_hour = float(end_hour)
+        self.hours_per_day = self.end_hour - self.start_hour
+        self.utc_offset_hours = utc_offset_minutes / 60.0
+        weekdays = sorted({int(d) % 7 for d in workdays})
+        if not weekdays:
+            raise ValueError("at least one workday is required")
+        # day offsets (0-6) within a week counted from the epoch that are workdays
+        self._cycle = [d for d in range(7) if (d + EPOCH_WEEKDAY) % 7 in weekdays]
+        self._prefix = [0] * 8
+        for d in range(7):
+            self._prefix[d + 1] = self._prefix[d] + (1 if d in self._cycle else 0)
+
+    @property
+    def days_per_week(self) -> int:
+        return len(self._cycle)
+
+    def from_ms(self, ms: float) -> float:
+        return ms / MS_PER_HOUR + self.utc_offset_hours
+
+    def to_ms(self, hour: float) -> int:
+        return int(round((hour - self.utc_offset_hours) * MS_PER_HOUR))
+
+    def is_workday(self, day: int) -> bool:
+        return (day % 7) in self._cycle
+
+    def _workdays_before(self, day: int) -> int:
+        weeks, rem = divmod(day, 7)
+        return weeks * self.days_per_week + self._prefix[rem]
+
+    def _nth_workday(self, n: int) -> int:
+        weeks, rem = divmod(n, self.days_per_week)
+        return weeks * 7 + self._cycle[rem]
+
+    def work_index(self, hour: float) -> float:
+        """Working hours elapsed between the epoch and hour."""
+        day = math.floor(hour / 24)
+        done = self._workdays_before(day) * self.hours_per_day
+        if self.is_workday(day):
+            in_day = hour - day * 24 - self.start_hour
+            done += max(0.0, min(self.hours_per_day, in_day))
+        return done
+
+    def from_index_start(self, index: float) -> float:
+        n = math.floor(index / self.hours_per_day)
+        day = self._nth_workday(n)
+        return day * 24 + self.start_hour + (index - n * self.hours_per_day)
+
+    def from_index_end(self, index: float) -> float:
+        n = math.ceil(index / self.hours_per_day) - 1
+        day = self._nth_workday(n)
+        return day * 24 + self.start_hour + (index - n * self.hours_per_day)
+
+    def align(self, hour: float) -> float:
+        """Earliest working instant at or after hour."""
+        return self.from_index_start(self.work_index(hour))
+
+    def add_work_hours(self, hour: float, hours: float) -> float:
+        """
+        Instant at which hours of work starting at hour are finished. Work
+        that ends exactly at closing time finishes that day, not the next.
+        """
+        if hours <= 0:
+            return self.align(hour)
+        return self.from_index_end(self.work_index(hour) + hours)
+
+    def working_hours_between(self, start: float, end: float) -> float:
+        if end <= start:
+            return 0.0
+        return self.work_index(end) - self.work_index(start)
+
+
+UI_CALENDAR = WorkCalendar()
+SIM_CALENDAR = WorkCalendar(start_hour=10, end_hour=20, workdays=range(7))
+MAX_TZ_OFFSET_MINUTES = 14 * 60
+
+
+def local_calendar(offset_raw: Any) -> WorkCalendar:
+    """UI work calendar in the player's zone, from the client's tzOffsetMinutes."""
+    try:
+        offset = int(offset_raw or 0)
+    except (TypeError, ValueError):
+        offset = 0
+    offset = max(-MAX_TZ_OFFSET_MINUTES, min(MAX_TZ_OFFSET_MINUTES, offset))
+    return WorkCalendar(utc_offset_minutes=offset)
+
+
+def topological_order(items: Sequence[Mapping[str, Any]]) -> List[str]:
+    """
+    Kahn's algorithm over the blockers DAG. Ties keep the input order so the
+    result is stable; blockers that are not in items are ignored.
+    """
+    ids = [str(it.get("id")) for it in items]
+    position = {wid: idx for idx, wid in enumerate(ids)}
+    indegree = {wid: 0 for wid in ids}
+    dependents: Dict[str, List[str]] = {wid: [] for wid in ids}
+    for it in items:
+        wid = str(it.get("id"))
+        for b in {str(b) for b in it.get("blockers") or []}:
+            if b in position and b != wid:
+                indegree[wid] += 1
+                dependents[b].append(wid)
+    ready = [(position[w], w) for w in ids if indegree[w] == 0]
+    heapq.heapify(ready)
+    order: List[str] = []
+    while ready:
+        _, wid = heapq.heappop(ready)
+        order.append(wid)
+        for dep in dependents[wid]:
+            indegree[dep] -= 1
+            if indegree[dep] == 0:
+                heapq.heappush(ready, (position[dep], dep))
+    if len(order) != len(ids):
+        raise ValueError("blockers contain a cycle")
+    return order
+
+
+def compute_schedule(
+    items: Sequence[Mapping[str, Any]],
+    calendar: WorkCalendar = UI_CALENDAR,
+    start: float = 0.0,
+    hours_key: str = "estimated_hours",
+    assignee_key: str = "assignee_id",
+    employee_free: Optional[Mapping[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Project start and finish for every item. Items run after all of their
+    blockers and one at a time per assignee, in topological order. All
+    arithmetic happens in working-hour index space, so each item costs O(1)
+    plus its edges.
+
+    Returns per-item start/finish (calendar hours), slack in working hours,
+    the critical path and the overall completion time.
+    """
+    by_id = {str(it.get("id")): it for it in items}
+    order = topological_order(items)
+    origin = calendar.work_index(start)
+    free = {
+        str(k): calendar.work_index(v) for k, v in (employee_free or {}).items()
+    }
+    es: Dict[str, float] = {}
+    ef: Dict[str, float] = {}
+    preds: Dict[str, List[str]] = {wid: [] for wid in order}
+    binding: Dict[str, Optional[str]] = {}
+    last_on_emp: Dict[str, str] = {}
+    for wid in order:
+        it = by_id[wid]
+        cands = [str(b) for b in it.get("blockers") or [] if str(b) in ef]
+        emp = str(it.get(assignee_key) or "")
+        if emp and emp in last_on_emp:
+            cands.append(last_on_emp[emp])
+        preds[wid] = list(dict.fromkeys(cands))
+        begin = max(origin, free.get(emp, origin) if emp else origin)
+        bind = None
+        for p in preds[wid]:
+            if ef[p] > begin:
+                begin, bind = ef[p], p
+        try:
+            hours = max(0.0, float(it.get(hours_key) or 0))
+        except (TypeError, ValueError):
+            hours = 0.0
+        es[wid] = begin
+        ef[wid] = begin + hours
+        binding[wid] = bind
+        if emp:
+            last_on_emp[emp] = wid
+
+    end = max(ef.values(), default=origin)
+    lf = {wid: end for wid in order}
+    for wid in reversed(order):
+        ls = lf[wid] - (ef[wid] - es[wid])
+        for p in preds[wid]:
+            if ls < lf[p]:
+                lf[p] = ls
+
+    schedule: Dict[str, Dict[str, Any]] = {}
+    for wid in order:
+        slack = max(0.0, lf[wid] - ef[wid])
+        schedule[wid] = {
+            "start": calendar.from_index_start(es[wid]),
+            "finish": (
+                calendar.from_index_end(ef[wid])
+                if ef[wid] > es[wid]
+                else calendar.from_index_start(es[wid])
+            ),
+            "slack_hours": round(slack, 4),
+            "critical": slack <= SLACK_EPSILON,
+        }
+
+    path: List[str] = []
+    if order:
+        rank = {wid: idx for idx, wid in enumerate(order)}
+        cursor: Optional[str] = max(order, key=lambda w: (ef[w], -rank[w]))
+        while cursor is not None:
+            path.append(cursor)
+            cursor = binding.get(cursor)
+        path.reverse()
+
+    return {
+        "order": order,
+        "items": schedule,
+        "critical_path": path,
+        "total_work_hours": round(end - origin, 4),
+        "completion": (
+            calendar.from_index_end(end) if end > origin else calendar.align(start)
+        ),
+    }
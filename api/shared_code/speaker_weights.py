@@ -0,0 +1,236 @@
+import math
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+BASELINE_DEFAULT = 0.5
+BASELINE_MIN = 0.1
+BASELINE_MAX = 0.9
+BASELINE_SCALE = 2.5
+RECENCY_TURNS = 4
+WEIGHT_LOW = 0.15
+WEIGHT_HIGH = 0.9
+WEIGHT_REFRESH_TURNS = 6
+REFRESH_BLEND = 0.5
+CARRY_BLEND = 0.25
+WEIGHT_LEVELS = 255
+
+ASSERTIVE_ANCHOR = (
+    "Outspoken, confident and talkative. Quick to share opinions, "
+    "takes the lead in discussions and enjoys debating ideas."
+)
+RESERVED_ANCHOR = (
+    "Quiet, reserved and reflective. Listens more than speaks, "
+    "rarely interrupts and waits to be asked before sharing ideas."
+)
+
+GOAL_BY_STAGE = {
+    "INTRODUCTION": "everyone_spoke",
+    "INTRODUCTIONS": "everyone_spoke",
+    "BRAINSTORMING": "idea_from_each",
+    "DECIDE ON A PRODUCT": "consensus",
+    "REFINEMENT": "time_only",
+    "CONCLUSION": "everyone_spoke",
+}
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    na = math.sqrt(sum(x * x for x in a))
+    nb = math.sqrt(sum(y * y for y in b))
+    if not na or not nb:
+        return 0.0
+    return dot / (na * nb)
+
+
+def personality_baseline(
+    embedding: Sequence[float],
+    assertive: Sequence[float],
+    reserved: Sequence[float],
+) -> float:
+    """
+    Project a personality embedding onto the assertive/reserved axis and
+    map it to a 0-1 speaking baseline. Computed once when the employee is
+    created and stored as speakBaseline on the employee doc.
+    """
+    delta = _cosine(embedding, assertive) - _cosine(embedding, reserved)
+    value = BASELINE_DEFAULT + BASELINE_SCALE * delta
+    return round(max(BASELINE_MIN, min(BASELINE_MAX, value)), 4)
+
+
+def employee_baseline(emp: Mapping[str, Any]) -> float:
+    try:
+        value = float(emp.get("speakBaseline", BASELINE_DEFAULT))
+    except (TypeError, ValueError):
+        return BASELINE_DEFAULT
+    if not math.isfinite(value):
+        return BASELINE_DEFAULT
+    return max(0.0, min(1.0, value))
+
+
+def empty_stats() -> Dict[str, Any]:
+    return {
+        "line_count": 0,
+        "last_speaker": "",
+        "spoken": {},
+        "last_spoke": {},
+        "stage_speakers": {},
+        "idea_speakers": [],
+        "non_idea_lines": 0,
+    }
+
+
+def add_line_to_stats(
+    stats: Mapping[str, Any], entry: Mapping[str, Any]
+) -> Dict[str, Any]:
+    """
+    Fold one transcript line into the rolling meeting stats. The stats live
+    on the product doc so a turn never has to re-read the whole transcript.
+    """
+    base = empty_stats()
+    base.update(stats or {})
+    speaker = str(entry.get("speaker", ""))
+    msg = str(entry.get("msg", ""))
+    stage = str(entry.get("stage", ""))
+    seq = int(base["line_count"])
+    spoken = dict(base["spoken"])
+    spoken[speaker] = spoken.get(speaker, 0) + 1
+    last_spoke = dict(base["last_spoke"])
+    last_spoke[speaker] = seq
+    stage_speakers = {k: list(v) for k, v in base["stage_speakers"].items()}
+    if speaker not in stage_speakers.setdefault(stage, []):
+        stage_speakers[stage].append(speaker)
+    idea_speakers = list(base["idea_speakers"])
+    has_idea = "idea" in msg.lower()
+    if has_idea and speaker not in idea_speakers:
+        idea_speakers.append(speaker)
+    return {
+        "line_count": seq + 1,
+        "last_speaker": speaker,
+        "spoken": spoken,
+        "last_spoke": last_spoke,
+        "stage_speakers": stage_speakers,
+        "idea_speakers": idea_speakers,
+        "non_idea_lines": int(base["non_idea_lines"]) + (0 if has_idea else 1),
+    }
+
+
+def stats_from_lines(lines: Sequence[Mapping[str, Any]]) -> Dict[str, Any]:
+    stats = empty_stats()
+    for entry in lines:
+        stats = add_line_to_stats(stats, entry)
+    return stats
+
+
+def _goal_pending(name: str, goal: str, stage: str, stats: Mapping[str, Any]) -> bool:
+    if goal == "everyone_spoke":
+        return name not in (stats.get("stage_speakers") or {}).get(stage, [])
+    if goal == "idea_from_each":
+        return name not in (stats.get("idea_speakers") or [])
+    return False
+
+
+def _stretch(raw: Dict[str, float]) -> Dict[str, float]:
+    lo = min(raw.values())
+    hi = max(raw.values())
+    if hi - lo < 1e-9:
+        return {k: round(max(0.0, min(1.0, v)), 4) for k, v in raw.items()}
+    span = WEIGHT_HIGH - WEIGHT_LOW
+    return {
+        k: round(WEIGHT_LOW + span * (v - lo) / (hi - lo), 4) for k, v in raw.items()
+    }
+
+
+def local_weights(
+    emps: Sequence[Mapping[str, Any]],
+    stats: Mapping[str, Any],
+    stage: str,
+) -> Dict[str, float]:
+    """
+    Deterministic 0-1 confidence weights for the next turn, built from the
+    cached personality baseline, how often and how recently each person
+    spoke, and whether they still owe something to the current stage goal.
+    """
+    if not emps:
+        return {}
+    stats = stats or empty_stats()
+    spoken = stats.get("spoken") or {}
+    last_turn = stats.get("last_spoke") or {}
+    line_count = int(stats.get("line_count", 0) or 0)
+    fair_share = line_count / len(emps)
+    goal = GOAL_BY_STAGE.get(stage, "time_only")
+    raw: Dict[str, float] = {}
+    for e in emps:
+        name = e["name"]
+        if name in last_turn:
+            gap = line_count - int(last_turn[name])
+            recency = 1.0 - math.exp(-gap / RECENCY_TURNS)
+        else:
+            recency = 1.0
+        deficit = fair_share - spoken.get(name, 0)
+        share = 1.0 / (1.0 + math.exp(-deficit))
+        pending = 1.0 if _goal_pending(name, goal, stage, stats) else 0.0
+        if goal == "consensus":
+            pending = employee_baseline(e)
+        raw[name] = (
+            0.4 * employee_baseline(e)
+            + 0.25 * recency
+            + 0.2 * pending
+            + 0.15 * share
+        )
+    return _stretch(raw)
+
+
+def blend_weights(
+    local: Mapping[str, float], refreshed: Mapping[str, Any], alpha: float
+) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for name, value in local.items():
+        try:
+            other = float(refreshed[name])
+        except (KeyError, TypeError, ValueError):
+            out[name] = value
+            continue
+        other = max(0.0, min(1.0, other))
+        out[name] = round((1 - alpha) * value + alpha * other, 4)
+    return out
+
+
+def should_refresh(turn: int, every: int = WEIGHT_REFRESH_TURNS) -> bool:
+    return every > 0 and turn > 0 and turn % every == 0
+
+
+def encode_weights(
+    weights: Mapping[str, float], speakers: Sequence[str]
+) -> Tuple[List[int], List[str]]:
+    """
+    Quantize a {name: weight} map to one uint8 per speaker, ordered by the
+    product's speaker table. Unknown names are appended to the table, so
+    callers must persist the returned table when it grew.
+    """
+    table = list(speakers)
+    for name in weights:
+        if name not in table:
+            table.append(name)
+    codes = []
+    for name in table:
+        try:
+            value = float(weights.get(name, 0.0))
+        except (TypeError, ValueError):
+            value = 0.0
+        if not math.isfinite(value):
+            value = 0.0
+        codes.append(int(round(max(0.0, min(1.0, value)) * WEIGHT_LEVELS)))
+    return codes, table
+
+
+def decode_weights(codes: Any, speakers: Sequence[str]) -> Dict[str, float]:
+    """Inverse of encode_weights; accepts the stored bytes or a list of ints."""
+    return {
+        name: round(int(code) / WEIGHT_LEVELS, 4)
+        for name, code in zip(speakers, codes or [])
+    }
+
+
+def line_weights(line: Mapping[str, Any], speakers: Sequence[str]) -> Dict[str, float]:
+    if isinstance(line.get("weights"), dict):
+        return dict(line["weights"])
+    return decode_weights(line.get("w"), speakers)
@@ -0,0 +1,149 @@
+from typing import Any, Dict, List, Mapping, Optional
+
+from firebase_admin import firestore
+
+from shared_code.boardroom import RECENT_LINES, StaleTurnError, next_header, recent_entry
+from shared_code.speaker_weights import encode_weights, stats_from_lines
+
+TRANSCRIPT_COLLECTION = "transcript"
+BATCH_LIMIT = 400
+
+
+def line_id(seq: int) -> str:
+    return f"{seq:06d}"
+
+
+def append_line(
+    db,
+    ref,
+    doc: Mapping[str, Any],
+    entry: Dict[str, Any],
+    fields: Dict[str, Any],
+    expect_line_count: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Write one transcript line as its own document and refresh the rolling
+    header on the product doc. The seq is reserved in a transaction against
+    the stored header, not the caller's copy of doc, so overlapping calls
+    append distinct lines instead of overwriting one. With expect_line_count,
+    the append is refused with StaleTurnError when the stored header has a
+    different line count, since fields were computed from the caller's doc.
+    Returns the new header.
+    """
+    col = ref.collection(TRANSCRIPT_COLLECTION)
+
+    @firestore.transactional
+    def txn(transaction):
+        snap = ref.get(transaction=transaction)
+        current = (snap.to_dict() if snap.exists else None) or doc
+        stored_count = int(current.get("line_count", 0) or 0)
+        if expect_line_count is not None and stored_count != expect_line_count:
+            raise StaleTurnError(ref.id)
+        header = {
+            **next_header(current, entry),
+            "updated": firestore.SERVER_TIMESTAMP,
+            **fields,
+        }
+        seq = header["line_count"] - 1
+        transaction.set(col.document(line_id(seq)), _stored_line(seq, entry))
+        transaction.set(ref, header, merge=True)
+        return header
+
+    return txn(db.transaction())
+
+
+def _stored_line(seq: int, entry: Mapping[str, Any]) -> Dict[str, Any]:
+    line = {"seq": seq, **entry}
+    if isinstance(line.get("w"), list):
+        line["w"] = bytes(line["w"])
+    return line
+
+
+def compact_legacy_lines(lines: List[Dict[str, Any]]):
+    """Swap per-line weight maps for uint8 codes against one speaker table."""
+    speakers: List[str] = []
+    compact = []
+    for entry in lines:
+        if entry.get("speaker") and entry["speaker"] not in speakers:
+            speakers.append(entry["speaker"])
+    for entry in lines:
+        line = {k: v for k, v in entry.items() if k != "weights"}
+        codes, speakers = encode_weights(entry.get("weights") or {}, speakers)
+        line["w"] = codes
+        compact.append(line)
+    return compact, speakers
+
+
+def load_transcript(ref, start: int = 0) -> List[Dict[str, Any]]:
+    query = ref.collection(TRANSCRIPT_COLLECTION).order_by("seq")
+    if start:
+        query = query.where("seq", ">=", start)
+    return [d.to_dict() for d in query.stream()]
+
+
+def read_transcript(ref, doc: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    """Full transcript for readers that need every line, legacy or not."""
+    legacy = doc.get("boardroom")
+    if isinstance(legacy, list) and "line_count" not in doc:
+        return [e for e in legacy if isinstance(e, dict)]
+    return load_transcript(ref)
+
+
+def migrate_legacy_transcript(db, ref, doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Move an array-based boardroom field into the transcript subcollection
+    and replace it with the rolling header. Safe to call on every load.
+    """
+    legacy = doc.get("boardroom")
+    if not isinstance(legacy, list):
+        return doc
+    lines, speakers = compact_legacy_lines(
+        [e for e in legacy if isinstance(e, dict)]
+    )
+    col = ref.collection(TRANSCRIPT_COLLECTION)
+    for chunk_start in range(0, len(lines), BATCH_LIMIT):
+        batch = db.batch()
+        for seq, entry in enumerate(
+            lines[chunk_start : chunk_start + BATCH_LIMIT], start=chunk_start
+        ):
+            batch.set(col.document(line_id(seq)), _stored_line(seq, entry))
+        batch.commit()
+    stats = stats_from_lines(lines)
+    header = {
+        "stats": stats,
+        "line_count": stats["line_count"],
+        "recent": [recent_entry(e) for e in lines[-RECENT_LINES:]],
+        "speakers": speakers,
+    }
+    ref.update({**header, "boardroom": firestore.DELETE_FIELD})
+    migrated = {k: v for k, v in doc.items() if k != "boardroom"}
+    migrated.update(header)
+    return migrated
+
+
+class FirestoreMeetingStore:
+    """Meeting store used by the boardroom engine for a company's products."""
+
+    def __init__(self, db, company: str):
+        self.db = db
+        self.products = (
+            db.collection("companies").document(company).collection("products")
+        )
+
+    def ref(self, meeting_id: str):
+        return self.products.document(meeting_id)
+
+    def load(self, meeting_id: str):
+        ref = self.ref(meeting_id)
+        doc = ref.get().to_dict()
+        if doc is None:
+            return None
+        return migrate_legacy_transcript(self.db, ref, doc)
+
+    def append(self, meeting_id, doc, entry, fields, expect_line_count=None):
+        return append_line(
+            self.db, self.ref(meeting_id), doc, entry, fields, expect_line_count
+        )
+
+    def load_transcript(self, meeting_id: str):
+        return load_transcript(self.ref(meeting_id))
@@ -1,11 +1,12 @@
 import azure.functions as func
 import json
-import logging
+from typing import Tuple
 
 from azure.identity import DefaultAzureCredential
 from azure.keyvault.secrets import SecretClient
 from openai import OpenAI
 from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from shared_code.classify import classify_text
 
 vault_url = "https://kv-strtupifyio.vault.azure.net/"
 credential = DefaultAzureCredential()
@@ -56,22 +57,25 @@ def classify_with_llm(message: str) -> CancelDecision:
     return parsed
 
 
-def fallback_classify(message: str) -> CancelDecision:
-    text = (message or "").lower()
-    cancel_keywords = [
-        "cancel",
-        "stop",
-        "undo",
-        "reverse",
-        "do not charge",
-        "wrong order",
-        "change my mind",
-        "no longer want",
-    ]
-    matched = any(k in text for k in cancel_keywords)
-    confidence = 0.65 if matched else 0.08
-    reason = "keyword_match" if matched else "no_signal"
-    return CancelDecision(cancel=matched, confidence=confidence, reason=reason)
+def classify_message(message: str) -> Tuple[CancelDecision, str]:
+    """
+    Compiled cancel/keep rules first, then the local model, and the LLM only
+    when neither is confident. The decision's reason names the tier for
+    anything the LLM did not decide.
+    """
+
+    def llm(text: str):
+        decision = classify_with_llm(text)
+        label = "cancel" if decision.cancel else "keep"
+        return label, decision.confidence, {"reason": decision.reason}
+
+    result = classify_text("supereats_cancel", message or "", llm=llm)
+    reason = result["payload"].get("reason") or f"{result['tier']}_match"
+    return CancelDecision(
+        cancel=result["label"] == "cancel",
+        confidence=max(0.0, min(1.0, result["confidence"])),
+        reason=reason,
+    ), result["tier"]
 
 
 def build_error_response(message: str, status: int = 400) -> func.HttpResponse:
@@ -94,14 +98,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             f"invalid request: {exc.errors()}", status=400
         )
 
-    result: CancelDecision
-    source = "llm"
-    try:
-        result = classify_with_llm(parsed.message)
-    except Exception as err:
-        logging.warning("LLM cancel classification failed: %s", err)
-        result = fallback_classify(parsed.message)
-        source = "fallback"
+    result, source = classify_message(parsed.message)
 
     payload = result.model_dump()
     payload["source"] = source
@@ -0,0 +1,98 @@
+import azure.functions as func
+import firebase_admin
+import logging
+import time
+from json import dumps, loads
+
+from azure.identity import DefaultAzureCredential
+from azure.keyvault.secrets import SecretClient
+from firebase_admin import credentials, firestore, initialize_app
+from shared_code.progress import ACTIVE_STATUSES, advance_items
+from shared_code.schedule import local_calendar
+
+vault_url = "https://kv-strtupifyio.vault.azure.net/"
+credential = DefaultAzureCredential()
+secret_client = SecretClient(vault_url=vault_url, credential=credential)
+
+firestore_sdk = secret_client.get_secret("FirebaseSDK").value
+cred = credentials.Certificate(loads(firestore_sdk))
+if not firebase_admin._apps:
+    initialize_app(cred)
+db = firestore.client()
+
+logger = logging.getLogger("work_progress")
+
+BATCH_LIMIT = 400
+
+
+def _sim_time(company_doc, body) -> int:
+    stored = company_doc.get("simTime")
+    candidates = []
+    for raw in (stored, body.get("simTime")):
+        try:
+            value = int(raw)
+        except (TypeError, ValueError):
+            continue
+        if value > 0:
+            candidates.append(value)
+    return max(candidates) if candidates else int(time.time() * 1000)
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        body = req.get_json()
+    except Exception:
+        return func.HttpResponse(dumps({"error": "invalid json"}), status_code=400)
+    company = body.get("company")
+    if not company:
+        return func.HttpResponse(dumps({"error": "missing company"}), status_code=400)
+
+    company_ref = db.collection("companies").document(company)
+    company_doc = company_ref.get().to_dict() or {}
+    if company_doc.get("endgameTriggered") or company_doc.get("endgameResolved"):
+        return func.HttpResponse(
+            dumps({"ok": True, "skipped": True}), mimetype="application/json"
+        )
+    sim_ms = _sim_time(company_doc, body)
+
+    items = {
+        d.id: d.to_dict() or {} for d in company_ref.collection("workitems").stream()
+    }
+    if not any(str(x.get("status") or "") in ACTIVE_STATUSES for x in items.values()):
+        return func.HttpResponse(
+            dumps({"ok": True, "simTime": sim_ms, "updated": {}}),
+            mimetype="application/json",
+        )
+    employees = {
+        d.id: d.to_dict() or {}
+        for d in company_ref.collection("employees")
+        .where("hired", "==", True)
+        .stream()
+    }
+
+    calendar = local_calendar(body.get("tzOffsetMinutes"))
+    patches = advance_items(items, employees, sim_ms, calendar)
+    work_ref = company_ref.collection("workitems")
+    ids = list(patches.keys())
+    for start in range(0, len(ids), BATCH_LIMIT):
+        batch = db.batch()
+        for wid in ids[start : start + BATCH_LIMIT]:
+            batch.update(
+                work_ref.document(wid),
+                {**patches[wid], "updated": firestore.SERVER_TIMESTAMP},
+            )
+        try:
+            batch.commit()
+        except Exception as exc:
+            logger.exception(
+                "failed to write progress updates for %s: %s", company, exc
+            )
+            return func.HttpResponse(
+                dumps({"error": "write failed"}),
+                status_code=500,
+                mimetype="application/json",
+            )
+    return func.HttpResponse(
+        dumps({"ok": True, "simTime": sim_ms, "updated": patches}),
+        mimetype="application/json",
+    )
@@ -1,14 +1,22 @@
 import azure.functions as func
 import firebase_admin
 import json
-import re
-from typing import Any, Dict
+from typing import Dict
 
 from azure.identity import DefaultAzureCredential
 from azure.keyvault.secrets import SecretClient
 from firebase_admin import credentials, firestore, initialize_app
 from openai import OpenAI
-from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from pydantic import ValidationError
+from shared_code.assist_email import (
+    AssigneeInfo,
+    ProductInfo,
+    WorkItemInfo,
+    call_assist_email,
+    company_identity,
+    format_email,
+    llm_payload,
+)
 
 vault_url = "https://kv-strtupifyio.vault.azure.net/"
 credential = DefaultAzureCredential()
@@ -26,95 +34,10 @@ if not firebase_admin._apps:
 db = firestore.client()
 
 
-class ProductInfo(BaseModel):
-    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
-
-    name: str = Field(..., min_length=1, max_length=200)
-    description: str = Field(..., min_length=1, max_length=5000)
-
-
-class AssigneeInfo(BaseModel):
-    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
-
-    name: str | None = Field(default=None, max_length=200)
-    title: str | None = Field(default=None, max_length=200)
-
-
-class WorkItemInfo(BaseModel):
-    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
-
-    id: str | None = Field(default=None, max_length=200)
-    title: str = Field(..., min_length=1, max_length=300)
-    description: str = Field(..., min_length=1, max_length=6000)
-    category: str | None = Field(default=None, max_length=200)
-    assignee: AssigneeInfo | None = None
-
-
-class WorkerAssistEmail(BaseModel):
-    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
-
-    subject: str = Field(..., min_length=5, max_length=300)
-    body: str = Field(..., min_length=40, max_length=6000)
-    question: str = Field(..., min_length=5, max_length=400)
-    pause_reason: str = Field(..., min_length=5, max_length=300)
-    tone: str = Field(..., min_length=3, max_length=60)
-    confidence: float = Field(..., ge=0.0, le=1.0)
-
-
-class AssistEmailResponse(BaseModel):
-    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
-
-    summary: str = Field(..., min_length=10, max_length=400)
-    email: WorkerAssistEmail
-    talking_points: list[str] = Field(default_factory=list)
-
-
-def _slugify_localpart(name: str) -> str:
-    lowered = name.strip().lower()
-    if not lowered:
-        return "team"
-    replaced = re.sub(r"[^a-z0-9]+", ".", lowered)
-    trimmed = replaced.strip(".")
-    return trimmed or "team"
-
-
 def _load_company(company_id: str) -> Dict[str, str]:
     snap = db.collection("companies").document(company_id).get()
     data = snap.to_dict() if snap.exists else {}
-    company_name = str(data.get("company_name") or company_id).strip()
-    normalized = re.sub(r"[^a-z0-9]", "", company_name.lower()) or company_id.lower()
-    domain = f"{normalized}.com"
-    return {
-        "name": company_name or company_id,
-        "domain": domain,
-        "me_address": f"me@{domain}",
-    }
-
-
-def _call_llm(payload: Dict[str, Any]) -> AssistEmailResponse:
-    system_message = (
-        "You are roleplaying a teammate who paused work on a startup deliverable. "
-        "You don't know the founder's name, so just avoid using it. "
-        "Do not use any kind of template like 'Dear [Name]' or 'To whom it may concern'. "
-        "Write a concise, human email to the founder explaining the blocker and ask exactly one question. "
-        "The blocker should be something the founder can easily answer in one reply, without expert knowledge. "
-        "Return only JSON that matches the schema."
-    )
-    completion = client.beta.chat.completions.parse(
-        model=deployment,
-        messages=[
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
-        ],
-        temperature=0.6,
-        top_p=0.9,
-        max_tokens=2048,
-        response_format=AssistEmailResponse,
-    )
-    parsed = completion.choices[0].message.parsed
-    if not isinstance(parsed, AssistEmailResponse):
-        raise ValueError("LLM parsing failure")
-    return parsed
+    return company_identity(company_id, data or {})
 
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
@@ -154,22 +77,10 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             status_code=400,
         )
 
-    llm_payload: Dict[str, Any] = {
-        "company": {
-            "name": company.get("name"),
-            "domain": company.get("domain"),
-        },
-        "product": product.model_dump(),
-        "workitem": workitem.model_dump(),
-        "instructions": {
-            "focus": "Explain why progress is paused and ask the founder for input.",
-            "question_requirements": "Ask a single, concrete question the founder can answer in one reply.",
-            "tone": "Respectful, collaborative, concise.",
-        },
-    }
+    payload = llm_payload(company, product, workitem)
 
     try:
-        parsed = _call_llm(llm_payload)
+        parsed = call_assist_email(client, deployment, payload)
     except Exception as exc:
         return func.HttpResponse(
             json.dumps({"error": "llm_failure", "message": str(exc)}),
@@ -177,28 +88,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             status_code=502,
         )
 
-    sender_name = (assignee.name or "").strip() or "Product Teammate"
-    sender_title = (assignee.title or "").strip() or "Contributor"
-    local_part = _slugify_localpart(sender_name)
-    from_address = f"{local_part}@{company['domain']}"
-
-    response_payload = {
-        "ok": True,
-        "email": {
-            "from": from_address,
-            "sender_name": sender_name,
-            "sender_title": sender_title,
-            "subject": parsed.email.subject,
-            "body": parsed.email.body,
-            "question": parsed.email.question,
-            "pause_reason": parsed.email.pause_reason,
-            "tone": parsed.email.tone,
-            "confidence": parsed.email.confidence,
-        },
-        "summary": parsed.summary,
-        "talking_points": parsed.talking_points,
-        "company": company,
-    }
+    response_payload = format_email(parsed, assignee, company)
 
     return func.HttpResponse(
         json.dumps(response_payload, ensure_ascii=False),
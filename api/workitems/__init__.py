@@ -1,18 +1,34 @@
 import azure.functions as func
 import firebase_admin
 import logging
-import math
 import time
 import secrets
 from json import dumps, loads
 from typing import Any, Dict, List, Tuple
 
-from enum import Enum
 from azure.identity import DefaultAzureCredential
 from azure.keyvault.secrets import SecretClient
 from firebase_admin import credentials, firestore, initialize_app
 from openai import OpenAI
-from pydantic import BaseModel, ConfigDict, Field, create_model
+from shared_code.assist_queue import assist_messages
+from shared_code.plan_stream import (
+    BLOCKER_MAX_PER_ITEM,
+    BLOCKER_MIN_FREE_PREFIX,
+    PLAN_INDEX,
+    clean_blocker_orders,
+    parse_stream,
+)
+from shared_code.rate_model import heuristic_rates
+from shared_code.rates import (
+    MAX_WORKITEMS,
+    employees_from_context,
+    hours_from_rate,
+    pack_rate_matrix,
+    rate_matrix_ref,
+    refresh_rates,
+)
+from shared_code.schedule import UI_CALENDAR, WorkCalendar, compute_schedule, local_calendar
+from shared_code.transcript import read_transcript
 
 vault_url = "https://kv-strtupifyio.vault.azure.net/"
 credential = DefaultAzureCredential()
@@ -38,24 +54,14 @@ if not firebase_admin._apps:
     initialize_app(cred)
 db = firestore.client()
 
-MAX_EMPLOYEES = 25
-MAX_SKILLS_PER_EMPLOYEE = 12
-MAX_WORKITEMS = 60
-MIN_RATE = 0.1
-MAX_RATE = 5.0
 ASSIST_PROBABILITY = 0.1
 ASSIST_PROGRESS_MAX = 85
-BLOCKER_MIN_FREE_PREFIX = 2
-BLOCKER_MAX_PER_ITEM = 2
+PLAN_LEASE_SECONDS = 180
+PLAN_PERSIST_BATCH = 3
 
 logger = logging.getLogger("workitems_llm")
 
 
-class RateAssignments(BaseModel):
-    model_config = ConfigDict(extra="forbid")
-    assignments: List[Dict[str, Any]]
-
-
 def _safe_int(value: Any, default: int = 0) -> int:
     try:
         return int(value)
@@ -63,21 +69,6 @@ def _safe_int(value: Any, default: int = 0) -> int:
         return default
 
 
-def _clamp_rate(value: Any) -> float:
-    try:
-        num = float(value)
-    except (TypeError, ValueError):
-        return MIN_RATE
-    if not math.isfinite(num):
-        return MIN_RATE
-    return max(MIN_RATE, min(MAX_RATE, num))
-
-
-def _hours_from_rate(rate: float) -> int:
-    pct = max(MIN_RATE, min(MAX_RATE, rate))
-    return max(1, int(round(100.0 / pct)))
-
-
 def _assist_trigger_value(
     company: str, workitem_id: str, assignee_id: str = ""
 ) -> int | None:
@@ -92,243 +83,67 @@ def _assist_trigger_value(
     return pct
 
 
-def _map_blocker_orders(
-    items: List[Dict[str, Any]], doc_ids: List[str]
-) -> Dict[int, List[str]]:
-    blockers_by_idx: Dict[int, List[str]] = {idx: [] for idx in range(len(items))}
-    for idx, item in enumerate(items):
-        raw_orders = item.get("blocker_orders")
-        if raw_orders is None:
-            raw_orders = []
-        if not isinstance(raw_orders, list):
-            raise ValueError(f"work item {idx + 1} blocker_orders must be a list")
-        if len(raw_orders) > BLOCKER_MAX_PER_ITEM:
-            raise ValueError(f"work item {idx + 1} has too many blockers")
-        order_numbers: List[int] = []
-        for raw_order in raw_orders:
-            order = _safe_int(raw_order, -1)
-            if order < 1 or order > idx:
-                raise ValueError(
-                    f"work item {idx + 1} has invalid blocker order {raw_order}"
-                )
-            order_numbers.append(order)
-        if len(order_numbers) != len(set(order_numbers)):
-            raise ValueError(f"work item {idx + 1} has duplicate blocker orders")
-        if idx < BLOCKER_MIN_FREE_PREFIX and order_numbers:
-            raise ValueError(f"work item {idx + 1} must not have blockers")
-        blockers_by_idx[idx] = [doc_ids[order - 1] for order in order_numbers]
-    return blockers_by_idx
-
-
-def _prepare_employees_for_rates(
-    raw_employees: List[Dict[str, Any]],
-) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
-    employees_by_id: Dict[str, Dict[str, Any]] = {}
-    ordered: List[Dict[str, Any]] = []
-    for emp in raw_employees or []:
-        emp_id = str(emp.get("id") or "").strip()
-        if not emp_id:
-            continue
-        skills_list: List[Dict[str, Any]] = []
-        for skill in (emp.get("skills") or [])[:MAX_SKILLS_PER_EMPLOYEE]:
-            title = str((skill or {}).get("skill") or "").strip()
-            if not title:
-                continue
-            lvl_raw = (skill or {}).get("level", 5)
-            try:
-                lvl = int(lvl_raw)
-            except (TypeError, ValueError):
-                lvl = 5
-            lvl = max(1, min(10, lvl))
-            skills_list.append({"skill": title, "level": lvl})
-        if not skills_list:
-            skills_list.append({"skill": "generalist", "level": 5})
-        record = {
-            "id": emp_id,
-            "name": str(emp.get("name") or "").strip(),
-            "title": str(emp.get("title") or "").strip(),
-            "skills": skills_list,
-        }
-        employees_by_id[emp_id] = record
-        ordered.append({"id": emp_id, "title": record["title"], "skills": skills_list})
-        if len(ordered) >= MAX_EMPLOYEES:
-            break
-    return employees_by_id, ordered
-
-
-def _build_rate_payload(
-    employees_payload: List[Dict[str, Any]], workitems_payload: List[Dict[str, Any]]
-) -> Dict[str, Any]:
-    return {
-        "employees": employees_payload,
-        "workitems": [
-            {
-                "id": itm["id"],
-                "title": itm["title"],
-                "description": itm["description"],
-                "complexity": max(1, min(5, _safe_int(itm.get("complexity"), 3))),
-            }
-            for itm in workitems_payload
-        ],
-        "instructions": (
-            "For every work item return an object with fields workitem_id and employees. "
-            "employees is an array that lists every employee exactly once. "
-            "Each entry has fields employee_id and rate. "
-            "Rate must be between 0.1 and 5.0."
-        ),
-        "rate_scale": "percentage of work completed per simulated hour",
-    }
-
-
-def _call_rate_assignments(payload: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
-    if not payload.get("employees") or not payload.get("workitems"):
-        return {}
-    employee_ids = [str(e["id"]) for e in payload.get("employees", [])]
-    workitem_ids = [str(w["id"]) for w in payload.get("workitems", [])]
-    EmpEnum = Enum("EmpEnum", {f"e_{i}": v for i, v in enumerate(employee_ids)})
-    WorkEnum = Enum("WorkEnum", {f"w_{i}": v for i, v in enumerate(workitem_ids)})
-
-    class SOModel(BaseModel):
-        model_config = ConfigDict(extra="forbid")
-
-    RateCellDyn = create_model(
-        "RateCellDyn",
-        __base__=SOModel,
-        employee_id=(EmpEnum, ...),
-        rate=(float, Field(..., ge=MIN_RATE, le=MAX_RATE)),
-    )
-    WorkItemRatesDyn = create_model(
-        "WorkItemRatesDyn",
-        __base__=SOModel,
-        workitem_id=(WorkEnum, ...),
-        employees=(
-            List[RateCellDyn],
-            Field(..., min_length=len(employee_ids), max_length=len(employee_ids)),
-        ),
-    )
-    RateAssignmentsDyn = create_model(
-        "RateAssignmentsDyn",
-        __base__=SOModel,
-        assignments=(
-            List[WorkItemRatesDyn],
-            Field(..., min_length=len(workitem_ids), max_length=len(workitem_ids)),
-        ),
-    )
-    system = (
-        "You are an expert workforce planner. "
-        "Return only JSON that conforms to the schema. "
-        f"Rates must be between {MIN_RATE} and {MAX_RATE}. "
-        "For each work item include workitem_id and an employees array that contains every employee exactly once."
-    )
-    user = dumps(payload)
-    completion = structured_client.beta.chat.completions.parse(
-        model=deployment,
-        messages=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": user},
-        ],
-        temperature=0.2,
-        top_p=0.9,
-        max_tokens=8192,
-        response_format=RateAssignmentsDyn,
+def _apply_llm_rates(company_ref, created_items: List[Dict[str, Any]], raw_employees):
+    """
+    Rate the fresh plan through the shared rate engine. The planner's
+    assignees are only suggestions, so the solver may move any item. Items are
+    updated in place (estimated hours, assignee) so the schedule projection
+    sees them.
+    """
+    if not created_items:
+        return
+    result = refresh_rates(
+        db,
+        structured_client,
+        deployment,
+        company_ref,
+        employees=employees_from_context(raw_employees),
+        workitems=created_items[:MAX_WORKITEMS],
+        reassign=True,
     )
-    parsed = completion.choices[0].message.parsed
-    assignments_list = getattr(parsed, "assignments", [])
-    mapped: Dict[str, Dict[str, float]] = {}
-    for row in assignments_list:
-        emp_map: Dict[str, float] = {}
-        for cell in row.employees:
-            emp_map[str(cell.employee_id.value)] = float(cell.rate)
-        mapped[str(row.workitem_id.value)] = emp_map
-    for wid in workitem_ids:
-        if wid not in mapped:
-            mapped[wid] = {}
-        for eid in employee_ids:
-            if eid not in mapped[wid]:
-                mapped[wid][eid] = 1.0
-    return {
-        wid: {eid: _clamp_rate(rate) for eid, rate in (emps or {}).items()}
-        for wid, emps in mapped.items()
-    }
-
-
-def _fallback_assignments(
-    workitems_payload: List[Dict[str, Any]], employees_by_id: Dict[str, Dict[str, Any]]
-) -> Dict[str, Dict[str, float]]:
-    if not employees_by_id or not workitems_payload:
-        return {}
-    default_rate = 1.0
-    return {
-        wi["id"]: {emp_id: default_rate for emp_id in employees_by_id.keys()}
-        for wi in workitems_payload
-    }
+    if result.get("used_fallback"):
+        logger.warning("Work item bootstrap used fallback rates for some cells")
 
 
-def _apply_llm_rates(
+def _project_schedule(
     company_ref,
     created_items: List[Dict[str, Any]],
-    raw_employees: List[Dict[str, Any]],
+    start_at: int,
+    calendar: WorkCalendar = UI_CALENDAR,
 ):
-    if not created_items:
-        return
-    employees_by_id, employees_payload = _prepare_employees_for_rates(raw_employees)
-    if not employees_payload:
+    """
+    Store the projected completion of the freshly planned work on the company
+    doc: finish time, critical path and per-item slack in working hours.
+    calendar should be in the player's zone so completion_at lines up with
+    the UI's local work hours.
+    """
+    items = [
+        {
+            "id": item["doc_id"],
+            "estimated_hours": item.get("estimated_hours", 0),
+            "assignee_id": item.get("assignee_id", ""),
+            "blockers": item.get("blockers", []),
+        }
+        for item in created_items
+    ]
+    if not items:
         return
-    workitems_payload: List[Dict[str, Any]] = []
-    for item in created_items[:MAX_WORKITEMS]:
-        workitems_payload.append(
-            {
-                "id": item["doc_id"],
-                "title": item["title"],
-                "description": item["description"],
-                "complexity": item.get("complexity", 3),
+    plan = compute_schedule(items, calendar, calendar.from_ms(start_at))
+    company_ref.set(
+        {
+            "work_projection": {
+                "completion_at": calendar.to_ms(plan["completion"]),
+                "total_work_hours": plan["total_work_hours"],
+                "critical_path": plan["critical_path"],
+                "slack_hours": {
+                    wid: entry["slack_hours"] for wid, entry in plan["items"].items()
+                },
+                "computed_from": start_at,
+                "computed_at": firestore.SERVER_TIMESTAMP,
             }
-        )
-    if not workitems_payload:
-        return
-    try:
-        payload = _build_rate_payload(employees_payload, workitems_payload)
-        assignments = _call_rate_assignments(payload)
-    except Exception as exc:
-        logger.exception(
-            "LLM rate generation failed during workitem bootstrap: %s", exc
-        )
-        assignments = {}
-    if not assignments:
-        assignments = _fallback_assignments(workitems_payload, employees_by_id)
-    work_ref = company_ref.collection("workitems")
-    for item in created_items:
-        doc_id = item["doc_id"]
-        rates = assignments.get(doc_id)
-        if not rates:
-            continue
-        normalized = {
-            emp_id: _clamp_rate(rate)
-            for emp_id, rate in rates.items()
-            if emp_id in employees_by_id
-        }
-        if not normalized:
-            continue
-        rounded_rates = {emp_id: round(val, 4) for emp_id, val in normalized.items()}
-        best_emp, best_rate = max(rounded_rates.items(), key=lambda pair: pair[1])
-        est_hours = _hours_from_rate(best_rate)
-        update_doc: Dict[str, Any] = {
-            "rate_per_hour": best_rate,
-            "estimated_hours": est_hours,
-            "updated": firestore.SERVER_TIMESTAMP,
-            "rates": rounded_rates,
-        }
-        status = str(item.get("status") or "").lower()
-        current_assignee = str(item.get("assignee_id") or "").strip()
-        # Do not overwrite an existing manual assignment when refreshing rates.
-        if status != "done" and not current_assignee:
-            update_doc["assignee_id"] = best_emp
-        try:
-            work_ref.document(doc_id).update(update_doc)
-        except Exception as exc:
-            logger.debug(
-                "failed to update work item %s with LLM rates: %s", doc_id, exc
-            )
+        },
+        merge=True,
+    )
 
 
 def pull_context(company):
@@ -336,12 +151,14 @@ def pull_context(company):
     c = company_ref.get().to_dict() or {}
     products = company_ref.collection("products").where("accepted", "==", True).get()
     product = None
+    product_ref = None
     for p in products:
         product = p.to_dict() | {"id": p.id}
+        product_ref = p.reference
         break
     boardroom = []
     if product:
-        raw_board = product.get("boardroom") or []
+        raw_board = read_transcript(product_ref, product)
         for entry in raw_board:
             if not isinstance(entry, dict):
                 continue
@@ -388,7 +205,7 @@ def pull_context(company):
     }
 
 
-def llm_plan(ctx):
+def _plan_messages(ctx) -> List[Dict[str, str]]:
     company_name = ctx.get("company", {}).get("company_name", "")
     company_description = ctx.get("company", {}).get("description", "")
     funding = (ctx.get("company", {}) or {}).get("funding", {})
@@ -466,22 +283,36 @@ def llm_plan(ctx):
             "boardroom_transcript": boardroom_transcript,
         }
     )
-    rsp = plan_client.chat.completions.create(
+    return [
+        {"role": "system", "content": sys},
+        {"role": "user", "content": user},
+    ]
+
+
+def llm_plan(ctx):
+    """
+    Stream the plan and yield each work item as soon as its JSON object is
+    complete. If the stream breaks, the items already yielded are kept.
+    """
+    stream = plan_client.chat.completions.create(
         model=deployment,
         response_format={"type": "json_object"},
-        messages=[
-            {"role": "system", "content": sys},
-            {"role": "user", "content": user},
-        ],
+        messages=_plan_messages(ctx),
+        stream=True,
     )
+
+    def chunks():
+        for event in stream:
+            if not event.choices:
+                continue
+            delta = event.choices[0].delta.content
+            if delta:
+                yield delta
+
     try:
-        data = loads(rsp.choices[0].message.content)
-        items = data.get("workitems") or []
-        if isinstance(items, list):
-            return items
-        return []
-    except Exception:
-        return []
+        yield from parse_stream(chunks())
+    except Exception as exc:
+        logger.warning("Work item plan stream ended early: %s", exc)
 
 
 def level_avg(emp):
@@ -498,84 +329,96 @@ def estimate_hours(complexity, emp_level):
     return int(round(base * mult))
 
 
-def ensure_items(company, ctx, items, start_at):
-    if not items:
-        emps = ctx.get("employees", [])
-        fallback = []
-        for e in emps:
-            title = (e.get("title") or "").lower()
-            if "engineer" in title or "developer" in title:
-                fallback.append(
-                    {
-                        "title": "Set up project repo",
-                        "description": "Initialize repository, CI, and environments",
-                        "assignee_name": e.get("name"),
-                        "complexity": 2,
-                        "blocker_orders": [],
-                    }
-                )
-                fallback.append(
-                    {
-                        "title": "Implement core feature",
-                        "description": "Deliver the first user facing capability",
-                        "assignee_name": e.get("name"),
-                        "complexity": 4,
-                        "blocker_orders": [],
-                    }
-                )
-            elif "design" in title:
-                fallback.append(
-                    {
-                        "title": "Wireframes",
-                        "description": "Create wireframes for primary flows",
-                        "assignee_name": e.get("name"),
-                        "complexity": 3,
-                        "blocker_orders": [],
-                    }
-                )
-            elif "product" in title:
-                fallback.append(
-                    {
-                        "title": "MVP spec",
-                        "description": "Define MVP scope and acceptance criteria",
-                        "assignee_name": e.get("name"),
-                        "complexity": 2,
-                        "blocker_orders": [],
-                    }
-                )
-            elif "marketing" in title or "growth" in title:
-                fallback.append(
-                    {
-                        "title": "Launch plan",
-                        "description": "Draft channels, messaging, and KPIs",
-                        "assignee_name": e.get("name"),
-                        "complexity": 3,
-                        "blocker_orders": [],
-                    }
-                )
-        items = fallback
+def _fallback_items(ctx) -> List[Dict[str, Any]]:
+    emps = ctx.get("employees", [])
+    fallback = []
+    for e in emps:
+        title = (e.get("title") or "").lower()
+        if "engineer" in title or "developer" in title:
+            fallback.append(
+                {
+                    "title": "Set up project repo",
+                    "description": "Initialize repository, CI, and environments",
+                    "assignee_name": e.get("name"),
+                    "complexity": 2,
+                    "blocker_orders": [],
+                }
+            )
+            fallback.append(
+                {
+                    "title": "Implement core feature",
+                    "description": "Deliver the first user facing capability",
+                    "assignee_name": e.get("name"),
+                    "complexity": 4,
+                    "blocker_orders": [],
+                }
+            )
+        elif "design" in title:
+            fallback.append(
+                {
+                    "title": "Wireframes",
+                    "description": "Create wireframes for primary flows",
+                    "assignee_name": e.get("name"),
+                    "complexity": 3,
+                    "blocker_orders": [],
+                }
+            )
+        elif "product" in title:
+            fallback.append(
+                {
+                    "title": "MVP spec",
+                    "description": "Define MVP scope and acceptance criteria",
+                    "assignee_name": e.get("name"),
+                    "complexity": 2,
+                    "blocker_orders": [],
+                }
+            )
+        elif "marketing" in title or "growth" in title:
+            fallback.append(
+                {
+                    "title": "Launch plan",
+                    "description": "Draft channels, messaging, and KPIs",
+                    "assignee_name": e.get("name"),
+                    "complexity": 3,
+                    "blocker_orders": [],
+                }
+            )
+    return fallback
+
+
+def _normalize_item(
+    wi: Dict[str, Any], emps_by_name: Dict[str, Any], position: int
+) -> Dict[str, Any]:
+    nm = str(wi.get("assignee_name", "")).strip()
+    emp = emps_by_name.get(nm) or {}
+    if not emp:
+        nm = ""
+    return {
+        "title": str(wi.get("title", "")),
+        "description": str(wi.get("description", "")),
+        "complexity": max(1, min(5, _safe_int(wi.get("complexity", 3), 3))),
+        "assignee_name": nm,
+        "assignee_id": emp.get("id", ""),
+        "blocker_orders": wi.get("blocker_orders"),
+        PLAN_INDEX: _safe_int(wi.get(PLAN_INDEX, position), position),
+    }
+
+
+def ensure_items(company, ctx, items, start_at, keep_lease=None, calendar=UI_CALENDAR):
+    """
+    Persist planned work items as they arrive, PLAN_PERSIST_BATCH at a time,
+    so the board fills in while the plan is still streaming. Blocker orders
+    are positions in the LLM's array, so they are resolved through each
+    item's plan index; orders pointing at a skipped item are dropped. Falls
+    back to a role-based starter plan when the planner produced nothing.
+    keep_lease, when given, is called before every write so a long plan
+    renews the planning lease (and stops if it was lost). The first flush
+    marks the company work_plan_partial until the bootstrap finishes.
+    """
     company_ref = db.collection("companies").document(company)
     work_ref = company_ref.collection("workitems")
     emps_by_name = {e.get("name"): e for e in ctx.get("employees", [])}
-    normalized = []
-    for wi in items:
-        t = str(wi.get("title", ""))
-        d = str(wi.get("description", ""))
-        cx = max(1, min(5, int(wi.get("complexity", 3))))
-        nm = str(wi.get("assignee_name", "")).strip()
-        emp = emps_by_name.get(nm) or {}
-        if not emp:
-            nm = ""
-        normalized.append(
-            {
-                "title": t,
-                "description": d,
-                "complexity": cx,
-                "assignee_name": nm,
-                "assignee_id": emp.get("id", ""),
-                "blocker_orders": wi.get("blocker_orders"),
-            }
-        )
+    _, rate_employees = employees_from_context(ctx.get("employees", []))
 
     def reserve_tids(n):
         tr = db.transaction()
@@ -590,63 +433,253 @@ def ensure_items(company, ctx, items, start_at):
 
         return txn(tr, n)
 
-    start_tid = reserve_tids(len(normalized)) if normalized else 0
-    doc_ids = [str(start_tid + i) for i in range(len(normalized))]
-
-    blockers_by_idx = _map_blocker_orders(normalized, doc_ids)
     created_items: List[Dict[str, Any]] = []
-    for idx, wi in enumerate(normalized):
-        assignee_name = wi.get("assignee_name", "")
-        emp = emps_by_name.get(assignee_name) or {}
-        emp_id = str(wi.get("assignee_id") or emp.get("id") or "")
-        emp_level = level_avg(emp)
-        cx = int(wi.get("complexity", 3))
-        est = estimate_hours(cx, emp_level)
-        tid = start_tid + idx
-        doc_id = str(tid)
-        fallback_rate = round(100.0 / max(1, est), 4)
-        assist_trigger_pct = _assist_trigger_value(company, doc_id, emp_id)
-        work_ref.document(doc_id).set(
-            {
-                "title": wi.get("title", ""),
-                "description": wi.get("description", ""),
-                "assignee_id": emp_id,
-                "estimated_hours": est,
-                "rate_per_hour": fallback_rate,
-                "status": "todo",
-                "blockers": blockers_by_idx.get(idx, []),
-                "created": firestore.SERVER_TIMESTAMP,
-                "updated": firestore.SERVER_TIMESTAMP,
-                **(
-                    {"assist_trigger_pct": assist_trigger_pct}
-                    if assist_trigger_pct is not None
-                    else {}
-                ),
-            }
+    doc_by_index: Dict[int, str] = {}
+    pending: List[Dict[str, Any]] = []
+    plan_rates: Dict[str, Dict[str, float]] = {}
+
+    def flush():
+        if not pending:
+            return
+        if keep_lease is not None:
+            keep_lease()
+        start_tid = reserve_tids(len(pending))
+        # instant first pass from the skill-match model; the LLM refines it
+        first_pass = heuristic_rates(
+            rate_employees,
+            [{**wi, "id": str(start_tid + offset)} for offset, wi in enumerate(pending)],
         )
-        created_items.append(
-            {
-                "doc_id": doc_id,
-                "title": wi.get("title", ""),
-                "description": wi.get("description", ""),
-                "complexity": cx,
-                "status": "todo",
-                "assignee_id": emp_id,
-            }
+        plan_rates.update(first_pass)
+        batch = db.batch()
+        for offset, wi in enumerate(pending):
+            doc_id = str(start_tid + offset)
+            position = wi[PLAN_INDEX]
+            orders = clean_blocker_orders(
+                wi.get("blocker_orders"),
+                position,
+                BLOCKER_MIN_FREE_PREFIX,
+                BLOCKER_MAX_PER_ITEM,
+                known=doc_by_index,
+            )
+            blockers = [doc_by_index[order - 1] for order in orders]
+            doc_by_index[position] = doc_id
+            emp = emps_by_name.get(wi.get("assignee_name", "")) or {}
+            emp_id = str(wi.get("assignee_id") or emp.get("id") or "")
+            cx = int(wi.get("complexity", 3))
+            assignee_rate = (first_pass.get(doc_id) or {}).get(emp_id)
+            if assignee_rate:
+                fallback_rate = assignee_rate
+                est = hours_from_rate(fallback_rate)
+            else:
+                est = estimate_hours(cx, level_avg(emp))
+                fallback_rate = round(100.0 / max(1, est), 4)
+            assist_trigger_pct = _assist_trigger_value(company, doc_id, emp_id)
+            batch.set(
+                work_ref.document(doc_id),
+                {
+                    "title": wi.get("title", ""),
+                    "description": wi.get("description", ""),
+                    "assignee_id": emp_id,
+                    "complexity": cx,
+                    "estimated_hours": est,
+                    "rate_per_hour": fallback_rate,
+                    "status": "todo",
+                    "blockers": blockers,
+                    "created": firestore.SERVER_TIMESTAMP,
+                    "updated": firestore.SERVER_TIMESTAMP,
+                    **(
+                        {"assist_trigger_pct": assist_trigger_pct}
+                        if assist_trigger_pct is not None
+                        else {}
+                    ),
+                },
+            )
+            created_items.append(
+                {
+                    "id": doc_id,
+                    "doc_id": doc_id,
+                    "title": wi.get("title", ""),
+                    "description": wi.get("description", ""),
+                    "complexity": cx,
+                    "status": "todo",
+                    "assignee_id": emp_id,
+                    "estimated_hours": est,
+                    "rate_per_hour": fallback_rate,
+                    "blockers": blockers,
+                    "assist_trigger_pct": assist_trigger_pct,
+                }
+            )
+        if plan_rates:
+            matrix = pack_rate_matrix(
+                plan_rates, [str(e["id"]) for e in rate_employees], list(plan_rates)
+            )
+            matrix.update(
+                {"version": firestore.Increment(1), "updated": firestore.SERVER_TIMESTAMP}
+            )
+            batch.set(rate_matrix_ref(company_ref), matrix, merge=True)
+        batch.set(company_ref, {"work_plan_partial": True}, merge=True)
+        batch.commit()
+        pending.clear()
+
+    for position, wi in enumerate(items):
+        if not isinstance(wi, dict):
+            continue
+        pending.append(_normalize_item(wi, emps_by_name, position))
+        if len(pending) >= PLAN_PERSIST_BATCH:
+            flush()
+    flush()
+    if not created_items:
+        pending.extend(
+            _normalize_item(wi, emps_by_name, position)
+            for position, wi in enumerate(_fallback_items(ctx))
         )
+        flush()
+
+    if keep_lease is not None:
+        keep_lease()
     try:
         _apply_llm_rates(company_ref, created_items, ctx.get("employees", []))
     except Exception as exc:
         logger.exception(
             "Failed to apply structured rates after creating work items: %s", exc
         )
+    try:
+        _project_schedule(company_ref, created_items, start_at, calendar)
+    except Exception as exc:
+        logger.exception("Failed to project work item schedule: %s", exc)
     company_ref.set(
         {"work_enabled": True, "work_created_at": firestore.SERVER_TIMESTAMP},
         merge=True,
     )
+    return created_items
+
+
+def _acquire_plan_lease(company_ref) -> Tuple[str, str | None]:
+    """
+    Claim the per-company planning lease. Returns (state, token): "acquired"
+    with a token for the caller that should plan, "planning" while another
+    caller holds an unexpired lease, or "ready" once a plan has finished.
+    """
+    tr = db.transaction()
+    token = secrets.token_hex(8)
+
+    @firestore.transactional
+    def txn(transaction):
+        snap = company_ref.get(transaction=transaction)
+        data = snap.to_dict() or {}
+        status = str(data.get("work_status") or "")
+        if status == "ready":
+            return "ready", None
+        now_ms = int(time.time() * 1000)
+        if status == "planning" and _safe_int(data.get("work_lease_until")) > now_ms:
+            return "planning", None
+        transaction.set(
+            company_ref,
+            {
+                "work_status": "planning",
+                "work_lease_token": token,
+                "work_lease_until": now_ms + PLAN_LEASE_SECONDS * 1000,
+            },
+            merge=True,
+        )
+        return "acquired", token
+
+    return txn(tr)
+
+
+def _renew_plan_lease(company_ref, token: str) -> bool:
+    """Push work_lease_until out again; False once another caller holds the lease."""
+    tr = db.transaction()
+
+    @firestore.transactional
+    def txn(transaction):
+        snap = company_ref.get(transaction=transaction)
+        data = snap.to_dict() or {}
+        if data.get("work_lease_token") != token:
+            return False
+        transaction.update(
+            company_ref,
+            {"work_lease_until": int(time.time() * 1000) + PLAN_LEASE_SECONDS * 1000},
+        )
+        return True
+
+    return txn(tr)
+
+
+def _clear_partial_plan(company_ref) -> int:
+    """Delete the work items a crashed or timed-out bootstrap left behind."""
+    deleted = 0
+    while True:
+        docs = company_ref.collection("workitems").limit(400).get()
+        if not docs:
+            break
+        batch = db.batch()
+        for d in docs:
+            batch.delete(d.reference)
+        batch.commit()
+        deleted += len(docs)
+    rate_matrix_ref(company_ref).delete()
+    return deleted
+
+
+def _finish_plan_lease(company_ref, token: str, status: str | None):
+    """Mark the bootstrap ready, or drop the lease so a retry can plan."""
+    tr = db.transaction()
+
+    @firestore.transactional
+    def txn(transaction):
+        snap = company_ref.get(transaction=transaction)
+        data = snap.to_dict() or {}
+        if data.get("work_lease_token") != token:
+            return
+        update: Dict[str, Any] = {
+            "work_lease_token": firestore.DELETE_FIELD,
+            "work_lease_until": firestore.DELETE_FIELD,
+            "work_status": status if status else firestore.DELETE_FIELD,
+        }
+        if status == "ready":
+            update["work_plan_partial"] = firestore.DELETE_FIELD
+        transaction.update(company_ref, update)
+
+    txn(tr)
 
 
-def main(req: func.HttpRequest) -> func.HttpResponse:
+def _bootstrap(
+    company: str, company_ref, assistq, token: str, calendar: WorkCalendar
+) -> Dict[str, Any]:
+    """
+    Plan and write the company's work items; run only by the lease holder.
+    Items with no work_plan_partial marker predate the lease and count as a
+    finished plan; a partial board from an earlier attempt is cleared and
+    planned again.
+    """
+    existing = company_ref.collection("workitems").limit(1).get()
+    if len(existing) > 0:
+        data = company_ref.get().to_dict() or {}
+        if not data.get("work_plan_partial"):
+            return {"ok": True, "skipped": True}
+        cleared = _clear_partial_plan(company_ref)
+        logger.warning("Cleared %d work items from an unfinished plan for %s", cleared, company)
+
+    def keep_lease():
+        if not _renew_plan_lease(company_ref, token):
+            raise RuntimeError("work item planning lease lost")
+
+    ctx = pull_context(company)
+    if not ctx.get("product"):
+        return {"error": "no accepted product"}
+    cdoc = ctx.get("company") or {}
+    start_at = int(cdoc.get("simTime") or int(time.time() * 1000))
+    planned = llm_plan(ctx)
+    created = ensure_items(company, ctx, planned, start_at, keep_lease, calendar)
+    messages = assist_messages(company, created)
+    if messages:
+        # assist emails are drafted in the background by assist_email_worker
+        assistq.set(messages)
+    return {"ok": True}
+
+
+def main(req: func.HttpRequest, assistq: func.Out[List[str]]) -> func.HttpResponse:
     try:
         body = req.get_json()
     except Exception:
@@ -654,28 +687,28 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     company = body.get("company")
     if not company:
         return func.HttpResponse(dumps({"error": "missing company"}), status_code=400)
-    ctx = pull_context(company)
-    if not ctx.get("product"):
+    company_ref = db.collection("companies").document(company)
+    state, token = _acquire_plan_lease(company_ref)
+    if state == "ready":
         return func.HttpResponse(
-            dumps({"error": "no accepted product"}), status_code=400
+            dumps({"ok": True, "skipped": True}), mimetype="application/json"
         )
-    cdoc = db.collection("companies").document(company).get().to_dict() or {}
-    start_at = int(cdoc.get("simTime") or int(time.time() * 1000))
-    existing = (
-        db.collection("companies")
-        .document(company)
-        .collection("workitems")
-        .limit(1)
-        .get()
+    if state == "planning":
+        return func.HttpResponse(
+            dumps({"ok": True, "in_progress": True}),
+            mimetype="application/json",
+            status_code=202,
+        )
+    try:
+        result = _bootstrap(
+            company, company_ref, assistq, token, local_calendar(body.get("tzOffsetMinutes"))
+        )
+    except Exception:
+        _finish_plan_lease(company_ref, token, None)
+        raise
+    _finish_plan_lease(company_ref, token, "ready" if result.get("ok") else None)
+    return func.HttpResponse(
+        dumps(result),
+        mimetype="application/json",
+        status_code=200 if result.get("ok") else 400,
     )
-    if existing:
-        try:
-            if len(existing) > 0:
-                return func.HttpResponse(
-                    dumps({"ok": True, "skipped": True}), mimetype="application/json"
-                )
-        except Exception:
-            pass
-    planned = llm_plan(ctx)
-    ensure_items(company, ctx, planned, start_at)
-    return func.HttpResponse(dumps({"ok": True}), mimetype="application/json")
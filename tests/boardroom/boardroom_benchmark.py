@@ -0,0 +1,71 @@
+import argparse, json, os, random, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "api"))
+
+from shared_code.boardroom import (
+    MemoryStore,
+    ReplayBackend,
+    ScriptedBackend,
+    run_meeting,
+)
+
+parser = argparse.ArgumentParser(
+    description="Offline boardroom throughput benchmark against the shared engine."
+)
+parser.add_argument("--meetings", type=int, default=200)
+parser.add_argument("--max-turns", type=int, default=60)
+parser.add_argument("--latency", type=float, default=0.0)
+parser.add_argument("--replay", default="")
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument("--input", default="input.json")
+args = parser.parse_args()
+
+with open(args.input) as f:
+    companies = json.load(f)
+
+llm = ReplayBackend(args.replay) if args.replay else ScriptedBackend(
+    latency=args.latency, seed=args.seed
+)
+store = MemoryStore()
+rng = random.Random(args.seed)
+
+turns = 0
+finished = 0
+started = time.perf_counter()
+for i in range(args.meetings):
+    c = companies[i % len(companies)]
+    meeting_id = f"bench-{i}"
+    result = run_meeting(
+        llm,
+        store,
+        meeting_id,
+        {
+            "company": c["company"]["name"],
+            "description": c["company"]["description"],
+            "finance": {
+                "approved": True,
+                "amount": 50000.0,
+                "grace_period_days": 30,
+                "first_payment": 5000.0,
+            },
+        },
+        c["employees"],
+        max_turns=args.max_turns,
+        rng=rng,
+    )
+    turns += len(store.lines[meeting_id])
+    finished += int(bool(result["done"]))
+elapsed = time.perf_counter() - started
+
+ops = store.ops()
+counters = llm.counters()
+n = max(1, args.meetings)
+print(f"meetings           {args.meetings} ({finished} reached CONCLUSION)")
+print(f"meetings/s         {args.meetings / elapsed:.2f}")
+print(f"turns/meeting      {turns / n:.1f}")
+print(f"meeting doc reads  {ops['reads'] / n:.1f} per meeting")
+print(f"meeting doc writes {ops['writes'] / n:.1f} per meeting")
+print(f"llm calls          {counters['calls'] / n:.1f} per meeting")
+print(f"prompt tokens      {counters['prompt_tokens'] / n:.0f} per meeting")
+print(f"completion tokens  {counters['completion_tokens'] / n:.0f} per meeting")
+print(f"cached tokens      {counters['cached_tokens'] / n:.0f} per meeting")
@@ -1,4 +1,16 @@
-import glob, json, statistics, os
+import glob, json, statistics, os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "api"))
+
+from shared_code.speaker_weights import WEIGHT_LEVELS
+
+
+def line_weight_values(m):
+    # older archives carry a {name: weight} map per line, newer ones a
+    # uint8 code per entry in the meeting's speakers table
+    if isinstance(m.get("weights"), dict):
+        return list(m["weights"].values())
+    return [code / WEIGHT_LEVELS for code in m.get("w") or []]
 
 
 def collect_metrics(data):
@@ -7,7 +19,7 @@ def collect_metrics(data):
     msg_counts = [len(x["boardroom"]) for x in data]
     uniq_speakers = [len({m["speaker"] for m in x["boardroom"]}) for x in data]
     msg_lens = [len(m["msg"]) for x in data for m in x["boardroom"]]
-    weights = [w for x in data for m in x["boardroom"] for w in m["weights"].values()]
+    weights = [w for x in data for m in x["boardroom"] for w in line_weight_values(m)]
     prod_lens = [len(x["product"]) for x in data]
     desc_lens = [len(x["description"]) for x in data]
 
@@ -0,0 +1,95 @@
+"""Estimate how much of each boardroom line prompt a provider prefix cache can serve.
+
+Runs scripted meetings, captures every "line" prompt, and for each one finds
+the longest prefix (in estimated tokens) it shares with any earlier prompt of
+the same meeting. Azure OpenAI only caches prompts of at least CACHE_MIN_TOKENS
+tokens, so the report shows both the raw shared share and the share that a
+cache could actually serve.
+
+Usage:
+    python tests/boardroom/prompt_prefix_report.py [--meetings 20]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "api"))
+
+from shared_code.boardroom import MemoryStore, ScriptedBackend, run_meeting  # noqa: E402
+from shared_code.prompts import CACHE_MIN_TOKENS  # noqa: E402
+
+
+class CapturingBackend(ScriptedBackend):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.prompts = []
+
+    def _complete(self, kind, messages, json_mode, hint):
+        if kind == "line":
+            self.prompts.append(json.dumps(messages, ensure_ascii=False))
+        return super()._complete(kind, messages, json_mode, hint)
+
+
+def shared_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--meetings", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--input", default=os.path.join(os.path.dirname(__file__), "input.json")
+    )
+    args = parser.parse_args()
+
+    with open(args.input) as f:
+        companies = json.load(f)
+
+    total = shared = cacheable = 0
+    rng = random.Random(args.seed)
+    for i in range(args.meetings):
+        c = companies[i % len(companies)]
+        llm = CapturingBackend(seed=args.seed)
+        run_meeting(
+            llm,
+            MemoryStore(),
+            f"prefix-{i}",
+            {
+                "company": c["company"]["name"],
+                "description": c["company"]["description"],
+                "finance": {
+                    "approved": True,
+                    "amount": 50000.0,
+                    "grace_period_days": 30,
+                    "first_payment": 5000.0,
+                },
+            },
+            c["employees"],
+            rng=rng,
+        )
+        for k, prompt in enumerate(llm.prompts):
+            best = max((shared_prefix(prompt, p) for p in llm.prompts[:k]), default=0)
+            tokens, hit = len(prompt) // 4, best // 4
+            total += tokens
+            shared += hit
+            if hit >= CACHE_MIN_TOKENS:
+                cacheable += hit - hit % 128
+
+    print(f"line prompts       {total // max(1, args.meetings)} est. tokens per meeting")
+    print(f"shared prefix      {shared / max(1, total):.1%} of prompt tokens")
+    print(
+        f"cache-eligible     {cacheable / max(1, total):.1%} "
+        f"(prefixes of {CACHE_MIN_TOKENS}+ tokens)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Per-tier hit rates, accuracy and latency for the shared text classifier.
+
+Runs each task's labelled corpus through shared_code.classify. The model tier
+is trained with k-fold cross-validation, so every text is scored by a model
+that never saw it. The LLM tier is an oracle that returns the gold label and
+counts as --llm-ms of latency. With --save, a model trained on the whole
+corpus is written to api/shared_code/models/<task>.npz, where the functions
+pick it up.
+
+Usage:
+    python tests/classify/tier_report.py [--task supereats_cancel] [--decisions log.jsonl] [--save]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent.parent / "api"))
+
+from shared_code.classify import (  # noqa: E402
+    MODEL_DIR,
+    TASKS,
+    TIERS,
+    HashedLogReg,
+    classify_text,
+)
+
+CORPORA = {
+    "employee_intent": HERE.parent / "employee_email" / "founder_emails.jsonl",
+    "supereats_cancel": HERE / "supereats_cancel.jsonl",
+    "mom_money": HERE / "mom_money.jsonl",
+}
+
+
+def load_rows(task: str, decisions: Optional[Path] = None) -> List[Tuple[str, str]]:
+    """
+    The task's labelled corpus plus, optionally, logged LLM decisions: the
+    JSON payloads of classify_decision log lines, one per line. Only lines
+    logged with CLASSIFY_LOG_TEXT on carry the text needed for training.
+    """
+    rows: List[Tuple[str, str]] = []
+    with open(CORPORA[task], "r", encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if "text" in row:
+                rows.append((row["text"], row["label"]))
+            else:
+                rows.append((f"{row['subject']} {row['message']}", row["intent"]))
+    if decisions:
+        with open(decisions, "r", encoding="utf-8") as fh:
+            for line in fh:
+                row = json.loads(line) if line.strip() else {}
+                if "text" not in row:
+                    continue
+                if row.get("task") == task and row.get("label") in TASKS[task].labels:
+                    rows.append((row["text"], row["label"]))
+    return rows
+
+
+def report(task: str, rows: List[Tuple[str, str]], folds: int, llm_ms: float, seed: int) -> None:
+    order = list(range(len(rows)))
+    random.Random(seed).shuffle(order)
+    labels = TASKS[task].labels
+    hits: Dict[str, List[int]] = {t: [0, 0] for t in TIERS}
+    spent: Dict[str, float] = {t: 0.0 for t in TIERS}
+    model_right = 0
+    for k in range(folds):
+        test = order[k::folds]
+        held = set(test)
+        train = [i for i in order if i not in held]
+        model = HashedLogReg.fit(
+            [rows[i][0] for i in train], [rows[i][1] for i in train], label_set=labels
+        )
+        for i in test:
+            text, gold = rows[i]
+            model_right += model.predict(text)[0] == gold
+            t0 = time.perf_counter()
+            oracle = lambda _t, g=gold: (g, 1.0, {})  # noqa: E731
+            result = classify_text(task, text, llm=oracle, model=model)
+            elapsed = (time.perf_counter() - t0) * 1000
+            if result["tier"] == "llm":
+                elapsed += llm_ms
+            hits[result["tier"]][0] += 1
+            hits[result["tier"]][1] += result["label"] == gold
+            spent[result["tier"]] += elapsed
+
+    n = len(rows)
+    print(f"{task}  ({n} labelled texts, {folds}-fold model tier)")
+    print("  tier      hits  hit rate  accuracy  mean latency")
+    for tier in TIERS:
+        count, right = hits[tier]
+        if not count:
+            continue
+        print(
+            f"  {tier:<8} {count:5d}  {count / n:8.1%}  {right / count:8.1%}  "
+            f"{spent[tier] / count:9.2f}ms"
+        )
+    print(f"  model alone, held out: {model_right / n:.1%} accurate")
+    total_ms = sum(spent.values())
+    print(
+        f"  LLM calls avoided {1 - hits['llm'][0] / n:.1%}; "
+        f"mean latency {total_ms / n:.1f}ms vs {llm_ms:.0f}ms LLM-only"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--task", choices=sorted(CORPORA), action="append")
+    parser.add_argument("--folds", type=int, default=4)
+    parser.add_argument("--llm-ms", type=float, default=900.0, help="Assumed LLM latency")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--decisions", type=Path, help="Logged classify_decision payloads (JSONL)")
+    parser.add_argument("--save", action="store_true", help="Write full-corpus models")
+    args = parser.parse_args()
+
+    for task in args.task or sorted(CORPORA):
+        rows = load_rows(task, args.decisions)
+        report(task, rows, args.folds, args.llm_ms, args.seed)
+        if args.save:
+            model = HashedLogReg.fit(
+                [t for t, _ in rows], [y for _, y in rows], label_set=TASKS[task].labels
+            )
+            os.makedirs(MODEL_DIR, exist_ok=True)
+            path = os.path.join(MODEL_DIR, f"{task}.npz")
+            model.save(path)
+            print(f"  saved {path} ({os.path.getsize(path)} bytes)")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Benchmark the makespan assignment solver against per-item argmax.
+
+Replays archived simulation outputs (employees, work items, blockers) with
+rates from the skill-match model, or synthetic companies when no archive is
+given, and compares projected makespan for three assignments: the planner's
+own assignees, the best-rate employee per item, and the solver.
+
+Usage:
+    python tests/company/assignment_benchmark.py [--input archive/*.json] [--synthetic 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE))
+sys.path.insert(0, str(HERE.parent.parent / "api"))
+
+from calibrate_rate_model import load_companies  # noqa: E402
+from shared_code.assignment import (  # noqa: E402
+    durations,
+    makespans,
+    solve_assignment,
+)
+from shared_code.rate_model import rate_matrix  # noqa: E402
+from shared_code.schedule import topological_order  # noqa: E402
+
+Case = Tuple[np.ndarray, List[List[int]], np.ndarray]
+
+
+def archived_case(company: Dict[str, object]) -> Case:
+    employees = [
+        {
+            "id": emp.get("name"),
+            "title": emp.get("role", ""),
+            "skills": [
+                {"skill": s.get("name", ""), "level": s.get("level", 5)}
+                for s in emp.get("skillsets", [])
+            ],
+        }
+        for emp in company.get("employees", [])
+    ]
+    items = company.get("work_items", [])
+    index = {str(it.get("id")): i for i, it in enumerate(items)}
+    names = {emp["id"]: k for k, emp in enumerate(employees)}
+    blockers = [
+        [index[str(b)] for b in it.get("blockers") or [] if str(b) in index]
+        for it in items
+    ]
+    planned = np.asarray([names.get(it.get("assignee_name"), 0) for it in items])
+    return rate_matrix(employees, items), blockers, planned
+
+
+def synthetic_case(rng: random.Random) -> Case:
+    n_items = rng.randint(15, 40)
+    n_emps = rng.randint(3, 8)
+    noise = [[rng.gauss(0.0, 0.45) for _ in range(n_emps)] for _ in range(n_items)]
+    rates = np.exp(np.asarray(noise))
+    blockers: List[List[int]] = []
+    for idx in range(n_items):
+        picks: List[int] = []
+        if idx >= 2 and rng.random() < 0.3:
+            picks = rng.sample(range(idx), rng.randint(1, min(2, idx)))
+        blockers.append(picks)
+    planned = np.asarray([rng.randrange(n_emps) for _ in range(n_items)])
+    return rates, blockers, planned
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--input",
+        nargs="*",
+        default=[(HERE / "archive" / "*.json").as_posix()],
+        help="Simulation output files or globs",
+    )
+    parser.add_argument("--synthetic", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    cases = [archived_case(c) for c in load_companies(args.input or [])]
+    source = "archive"
+    if not cases:
+        rng = random.Random(args.seed)
+        cases = [synthetic_case(rng) for _ in range(args.synthetic)]
+        source = "synthetic"
+
+    planned_total = argmax_total = solved_total = 0.0
+    wins = 0
+    solve_s = 0.0
+    for rates, blockers, planned in cases:
+        hours = durations(rates)
+        preds = [np.asarray(b, dtype=np.int64) for b in blockers]
+        nodes = [{"id": i, "blockers": b} for i, b in enumerate(blockers)]
+        order = [int(i) for i in topological_order(nodes)]
+        planned_total += float(makespans(planned, hours, preds, order)[0])
+        t0 = time.perf_counter()
+        result = solve_assignment(rates, blockers)
+        solve_s += time.perf_counter() - t0
+        argmax_total += result["argmax_makespan"]
+        solved_total += result["makespan"]
+        wins += result["makespan"] < result["argmax_makespan"] - 1e-9
+
+    n = len(cases)
+    print(f"companies          {n} ({source})")
+    print(f"planner assignees  mean makespan {planned_total / n:8.1f}h")
+    print(f"per-item argmax    mean makespan {argmax_total / n:8.1f}h")
+    print(
+        f"solver             mean makespan {solved_total / n:8.1f}h "
+        f"({1 - solved_total / argmax_total:.1%} shorter, better on {wins}/{n})"
+    )
+    print(f"solve time         {solve_s / n * 1000:.1f}ms per company")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Run the assist-draft pipeline end to end with a local queue and stub LLMs.
+
+Builds synthetic plans shaped like workitems' output, enqueues them with
+assist_messages the way the plan endpoint does, and drains an InProcessQueue
+into the worker's drafting path (pending_items + draft_emails). The stub batch
+call leaves one item out of every answer so the one-at-a-time retry runs too.
+Checks that every triggered item gets exactly one draft from its assignee,
+that untriggered items get none, and that redelivering the messages drafts
+nothing new.
+
+Usage:
+    python tests/company/assist_queue_harness.py [--companies 50] [--seed 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent.parent / "api"))
+
+from shared_code.assist_email import (  # noqa: E402
+    AssigneeInfo,
+    AssistEmailResponse,
+    ProductInfo,
+    WorkItemInfo,
+    company_identity,
+    draft_emails,
+)
+from shared_code.assist_queue import (  # noqa: E402
+    InProcessQueue,
+    assist_messages,
+    pending_items,
+)
+
+EMPLOYEES = [
+    ("Ada Park", "Backend Engineer"),
+    ("Ben Ortiz", "Product Designer"),
+    ("Cleo Shah", "Product Manager"),
+    ("Dev Rao", "Growth Marketer"),
+]
+
+
+def synthetic_plan(rng: random.Random) -> List[Dict[str, Any]]:
+    items = []
+    for idx in range(rng.randint(4, 12)):
+        name, title = rng.choice(EMPLOYEES)
+        items.append(
+            {
+                "id": str(idx + 1),
+                "doc_id": str(idx + 1),
+                "title": f"Task {idx + 1}",
+                "description": f"Deliver part {idx + 1} of the launch plan",
+                "status": "todo",
+                "assignee": {"name": name, "title": title},
+                "assist_trigger_pct": rng.randint(20, 80) if rng.random() < 0.6 else None,
+            }
+        )
+    return items
+
+
+class StubLLM:
+    def __init__(self):
+        self.single_calls = 0
+        self.batch_calls = 0
+
+    @staticmethod
+    def _reply(workitem: Dict[str, Any]) -> AssistEmailResponse:
+        return AssistEmailResponse.model_validate(
+            {
+                "summary": f"Paused on {workitem['title']} pending a decision.",
+                "email": {
+                    "subject": f"Question on {workitem['title']}",
+                    "body": f"I paused {workitem['title']} because the scope is unclear. "
+                    "Could you confirm what matters most for the first release?",
+                    "question": "Which part should ship first?",
+                    "pause_reason": "Scope is unclear",
+                    "tone": "collaborative",
+                    "confidence": 0.7,
+                },
+            }
+        )
+
+    def single(self, payload: Dict[str, Any]) -> AssistEmailResponse:
+        self.single_calls += 1
+        return self._reply(payload["workitem"])
+
+    def batch(self, payload: Dict[str, Any]) -> Dict[str, AssistEmailResponse]:
+        self.batch_calls += 1
+        workitems = payload["workitems"][:-1]
+        return {wi["workitem_id"]: self._reply(wi) for wi in workitems}
+
+
+def run_company(rng: random.Random, idx: int, llm: StubLLM) -> List[str]:
+    company_id = f"harness-{idx}"
+    company = company_identity(company_id, {"company_name": f"Harness {idx}"})
+    product = ProductInfo(name="Widget", description="A widget for small teams.")
+    plan = synthetic_plan(rng)
+    store = {it["doc_id"]: dict(it) for it in plan}
+
+    def handler(msg: Dict[str, Any]) -> None:
+        infos = {
+            wid: WorkItemInfo(
+                id=wid,
+                title=store[wid]["title"],
+                description=store[wid]["description"],
+                assignee=AssigneeInfo(**store[wid]["assignee"]),
+            )
+            for wid in pending_items(msg["items"], store)
+        }
+        drafts = draft_emails(company, product, infos, llm.single, llm.batch)
+        for wid, draft in drafts.items():
+            store[wid]["assist_draft"] = draft
+
+    queue = InProcessQueue()
+    queue.set(assist_messages(company_id, plan))
+    queue.drain(handler)
+
+    errors = []
+    for wid, it in store.items():
+        draft = it.get("assist_draft")
+        if it["assist_trigger_pct"] is None:
+            if draft:
+                errors.append(f"{company_id}/{wid}: drafted without a trigger")
+            continue
+        if not draft:
+            errors.append(f"{company_id}/{wid}: triggered but not drafted")
+        elif draft["email"]["sender_name"] != it["assignee"]["name"]:
+            errors.append(f"{company_id}/{wid}: draft sent by {draft['email']['sender_name']}")
+
+    before = {wid: id(it.get("assist_draft")) for wid, it in store.items()}
+    queue.set(assist_messages(company_id, plan))
+    queue.drain(handler)
+    for wid, it in store.items():
+        if id(it.get("assist_draft")) != before[wid]:
+            errors.append(f"{company_id}/{wid}: redrafted on redelivery")
+    return errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--companies", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    llm = StubLLM()
+    errors: List[str] = []
+    for idx in range(args.companies):
+        errors.extend(run_company(rng, idx, llm))
+
+    print(f"batch calls        {llm.batch_calls}")
+    print(f"single calls       {llm.single_calls}")
+    if errors:
+        for line in errors[:20]:
+            print(f"FAIL {line}")
+        print(f"{len(errors)} problems")
+        sys.exit(1)
+    print("all triggered items drafted once by their assignee")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Calibrate the skill-match rate model against archived simulation outputs.
+
+Reads one or more output.json files written by full_game_simulation.py, pairs
+every work item with its assignee, and fits the model's log-rate weights by
+least squares. Companies are split into train and holdout sets; the report
+compares the fitted model with the current defaults, the old flat 1.0
+fallback and the level-only estimate_hours curve.
+
+Usage:
+    python tests/company/calibrate_rate_model.py [--input archive/*.json] [--holdout 0.2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import math
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent.parent / "api"))
+
+from shared_code.rate_model import (  # noqa: E402
+    DEFAULT_PARAMS,
+    MAX_RATE,
+    MIN_RATE,
+    fit_params,
+    rate_matrix,
+)
+
+Sample = Tuple[Dict[str, object], Dict[str, object], float]
+
+
+def load_companies(patterns: Sequence[str]) -> List[dict]:
+    companies: List[dict] = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, "r", encoding="utf-8") as fh:
+                companies.extend(json.load(fh).get("companies", []))
+    return companies
+
+
+def samples_for(company: Mapping[str, object]) -> List[Sample]:
+    employees = {}
+    for emp in company.get("employees", []):
+        employees[emp.get("name")] = {
+            "id": emp.get("name"),
+            "title": emp.get("role", ""),
+            "skills": [
+                {"skill": s.get("name", ""), "level": s.get("level", 5)}
+                for s in emp.get("skillsets", [])
+            ],
+        }
+    out: List[Sample] = []
+    for wi in company.get("work_items", []):
+        emp = employees.get(wi.get("assignee_name"))
+        rate = float(wi.get("rate_per_hour") or 0)
+        if emp and rate > 0:
+            out.append((emp, wi, rate))
+    return out
+
+
+def level_only_rate(emp: Mapping[str, object], item: Mapping[str, object]) -> float:
+    levels = [max(1, min(10, int(s.get("level", 5)))) for s in emp.get("skills", [])]
+    level = sum(levels) / len(levels) if levels else 5
+    base = 6 + 8 * max(1, min(5, int(item.get("complexity", 3))))
+    mult = max(0.6, min(1.4, 1.0 - (level - 5) * 0.05))
+    return 100.0 / max(1, int(round(base * mult)))
+
+
+def report(label: str, predicted: Sequence[float], observed: Sequence[float]) -> None:
+    logs = [
+        (math.log(max(MIN_RATE, min(MAX_RATE, p))) - math.log(max(MIN_RATE, min(MAX_RATE, o))))
+        ** 2
+        for p, o in zip(predicted, observed)
+    ]
+    hours = [abs(100.0 / p - 100.0 / o) for p, o in zip(predicted, observed)]
+    rmse = math.sqrt(sum(logs) / len(logs)) if logs else 0.0
+    mae = sum(hours) / len(hours) if hours else 0.0
+    print(f"{label:<16} log-rate RMSE {rmse:6.3f}   hours MAE {mae:7.2f}")
+
+
+def predict(samples: Sequence[Sample], params: Mapping[str, float]) -> List[float]:
+    return [float(rate_matrix([emp], [item], params)[0, 0]) for emp, item, _ in samples]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--input",
+        nargs="+",
+        default=[(HERE / "archive" / "*.json").as_posix()],
+        help="Simulation output files or globs",
+    )
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    companies = load_companies(args.input)
+    if not companies:
+        raise SystemExit("no simulation outputs found")
+    random.Random(args.seed).shuffle(companies)
+    cut = max(1, int(len(companies) * (1 - args.holdout)))
+    train = [s for c in companies[:cut] for s in samples_for(c)]
+    test = [s for c in companies[cut:] for s in samples_for(c)] or train
+    print(f"companies {len(companies)}  train samples {len(train)}  holdout samples {len(test)}")
+
+    fitted = fit_params(train)
+    observed = [rate for _, _, rate in test]
+    report("flat 1.0", [1.0] * len(test), observed)
+    report("level only", [level_only_rate(e, i) for e, i, _ in test], observed)
+    report("defaults", predict(test, DEFAULT_PARAMS), observed)
+    report("fitted", predict(test, fitted), observed)
+    print(json.dumps({k: round(v, 4) for k, v in fitted.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
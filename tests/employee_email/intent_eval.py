@@ -0,0 +1,106 @@
+"""Evaluate the employee_email rule matcher against a labelled founder-email corpus.
+
+For each confidence threshold, reports how many emails the rules settle on
+their own (LLM calls avoided) and how accurate those rule-only answers are.
+Also reports overall rule accuracy and the old substring scan for reference.
+
+Usage:
+    python tests/employee_email/intent_eval.py [--corpus founder_emails.jsonl] [--threshold 0.75]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent.parent / "api"))
+
+from shared_code.intent_match import (  # noqa: E402
+    INTENT_SKIP_THRESHOLD,
+    match_employee_intent,
+)
+
+LEGACY_TERMS = {
+    "off_hours": [
+        "weekend", "weekends", "saturday", "sunday", "after hours", "after-hours",
+        "after work", "late tonight", "tonight", "overtime", "off hours", "off-hours",
+        "past 5", "past five", "8pm", "9pm", "10pm", "midnight",
+    ],
+    "encouraging": [
+        "thank you", "thanks", "appreciate", "great job", "well done", "awesome",
+        "nice work", "amazing", "proud of", "kudos", "good job",
+    ],
+    "discouraging": [
+        "disappointed", "frustrated", "angry", "upset", "unacceptable", "furious",
+        "mad", "bad job", "awful", "terrible", "horrible", "useless", "sucks", "let down",
+    ],
+}
+
+
+def legacy_intent(subject: str, message: str) -> Optional[str]:
+    """The substring scan employee_email used before the compiled matcher."""
+    text = f"{subject} {message}".lower()
+    if any(t in text for t in LEGACY_TERMS["off_hours"]):
+        return "off_hours"
+    pos = sum(1 for t in LEGACY_TERMS["encouraging"] if t in text)
+    neg = sum(1 for t in LEGACY_TERMS["discouraging"] if t in text)
+    if pos and pos >= neg:
+        return "encouraging"
+    if neg:
+        return "discouraging"
+    return None
+
+
+def load_corpus(path: Path) -> List[Dict[str, str]]:
+    with open(path, "r", encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=HERE / "founder_emails.jsonl")
+    parser.add_argument("--threshold", type=float, default=INTENT_SKIP_THRESHOLD)
+    args = parser.parse_args()
+
+    rows = load_corpus(args.corpus)
+    t0 = time.perf_counter()
+    guesses = [match_employee_intent(r["subject"], r["message"]) for r in rows]
+    elapsed = time.perf_counter() - t0
+    labels = [r["intent"] for r in rows]
+    n = len(rows)
+
+    rule_right = sum((g or "neutral") == y for (g, _), y in zip(guesses, labels))
+    legacy_right = sum(
+        (legacy_intent(r["subject"], r["message"]) or "neutral") == r["intent"] for r in rows
+    )
+    print(f"emails               {n}  {dict(Counter(labels))}")
+    print(f"matcher latency      {elapsed / n * 1e6:.1f}us per email")
+    print(f"legacy scan accuracy {legacy_right / n:.1%}")
+    print(f"matcher accuracy     {rule_right / n:.1%}")
+    print()
+    print("threshold  skipped  llm calls avoided  accuracy when skipped")
+    sweep = sorted({0.5, 0.6, 0.67, 0.75, 0.8, 0.85, args.threshold})
+    for threshold in sweep:
+        skipped = [(g, y) for (g, c), y in zip(guesses, labels) if g and c >= threshold]
+        right = sum(g == y for g, y in skipped)
+        acc = right / len(skipped) if skipped else 0.0
+        mark = "*" if threshold == args.threshold else " "
+        print(f"{mark}{threshold:8.2f}  {len(skipped):7d}  {len(skipped) / n:17.1%}  {acc:21.1%}")
+
+    wrong = [
+        (r, g, c)
+        for r, (g, c) in zip(rows, guesses)
+        if g and c >= args.threshold and g != r["intent"]
+    ]
+    for r, g, c in wrong:
+        print(f"  wrong skip: {g} ({c:.2f}) expected {r['intent']}: {r['message']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,10 +20,6 @@ import {
   updateDoc,
 } from 'firebase/firestore';
 import { environment } from 'src/environments/environment';
-import {
-  getStressMultiplier,
-  isBurnedOut,
-} from '../../services/stress.service';
 import { EndgameService, EndgameStatus } from '../../services/endgame.service';
 
 const fbApp = getApps().length
@@ -71,27 +67,10 @@ export class ClockComponent implements OnChanges, OnDestroy {
   private lastTickWall = Date.now();
   private displayAnimFrame: number | null = null;
   private displayAnimCancelAt: number | null = null;
-  private items: Array<{
-    id: string;
-    status: string;
-    started_at: number;
-    estimated_hours: number;
-    assignee_id?: string;
-    worked_ms: number;
-  }> = [];
-  private completedIds = new Set<string>();
-  private unsubEmployees: (() => void) | null = null;
-  private employeeStress = new Map<
-    string,
-    {
-      stress: number;
-      status: 'Active' | 'Burnout';
-      multiplier: number;
-      offHoursAllowed?: boolean;
-    }
-  >();
-  private readonly workdayStartHour = 8;
-  private readonly workdayEndHour = 17;
+  private items: Array<{ id: string; status: string }> = [];
+  private readonly progressSyncEveryMs = 5000;
+  private lastProgressSync = 0;
+  private progressSyncInFlight = false;
   private endgameStatus: EndgameStatus = 'idle';
   private endgameSub: Subscription | null = null;
 
@@ -108,7 +87,6 @@ export class ClockComponent implements OnChanges, OnDestroy {
     if (this.unsub) this.unsub();
     this.stopClock();
     if (this.unsubItems) this.unsubItems();
-    if (this.unsubEmployees) this.unsubEmployees();
     if (this.endgameSub) {
       try {
         this.endgameSub.unsubscribe();
@@ -150,10 +128,6 @@ export class ClockComponent implements OnChanges, OnDestroy {
       this.unsubItems();
       this.unsubItems = null;
     }
-    if (this.unsubEmployees) {
-      this.unsubEmployees();
-      this.unsubEmployees = null;
-    }
     if (!this.companyId) return;
     const ref = doc(db, `companies/${this.companyId}`);
     this.unsub = onSnapshot(ref, (snap: DocumentSnapshot<DocumentData>) => {
@@ -179,7 +153,7 @@ export class ClockComponent implements OnChanges, OnDestroy {
         return;
       }
       this.clockActive = true;
-      this.checkAutoComplete();
+      this.syncProgress();
       if (!this.tickTimer && !this.tickInFlight) {
         this.startClock();
       }
@@ -194,48 +168,12 @@ export class ClockComponent implements OnChanges, OnDestroy {
           return {
             id: d.id,
             status: String(x.status || ''),
-            started_at: Number(x.started_at || 0),
-            estimated_hours: Number(x.estimated_hours || 0),
-            assignee_id: String(x.assignee_id || ''),
-            worked_ms: Number(x.worked_ms || 0),
           };
         });
 
-        this.completedIds.clear();
-
-        this.checkAutoComplete();
         this.checkEndgameCondition();
       }
     );
-
-    const employeesRef = collection(
-      db,
-      `companies/${this.companyId}/employees`
-    );
-    this.unsubEmployees = onColSnapshot(
-      employeesRef,
-      (snap: QuerySnapshot<DocumentData>) => {
-        this.employeeStress.clear();
-        snap.docs.forEach((d) => {
-          const data = (d.data() as any) || {};
-          const stress = Number(data.stress || 0);
-          const status: 'Active' | 'Burnout' =
-            String(data.status || 'Active') === 'Burnout'
-              ? 'Burnout'
-              : 'Active';
-          const multiplier = getStressMultiplier(stress, status);
-          const offHoursAllowed = !!(
-            data.offHoursAllowed ?? data.off_hours_allowed
-          );
-          this.employeeStress.set(d.id, {
-            stress,
-            status,
-            multiplier,
-            offHoursAllowed,
-          });
-        });
-      }
-    );
   }
 
   private startClock(): void {
@@ -295,7 +233,6 @@ export class ClockComponent implements OnChanges, OnDestroy {
     }
 
     this.setDisplayTime(this.simTime, false);
-    this.checkAutoComplete();
     this.checkEndgameCondition();
 
     this.elapsedSinceSave += realElapsed;
@@ -306,6 +243,7 @@ export class ClockComponent implements OnChanges, OnDestroy {
         await updateDoc(ref, { simTime: this.simTime, speed: this.speed });
       } catch {}
     }
+    this.syncProgress();
     this.tickInFlight = false;
     if (this.clockActive) this.scheduleNextTick();
   }
@@ -419,108 +357,32 @@ export class ClockComponent implements OnChanges, OnDestroy {
     void this.endgame.triggerEndgame('all-workitems-complete', simTime);
   }
 
-  private checkAutoComplete(): void {
-    if (!this.companyId || !this.items.length) return;
+  // Completion and assist triggers are decided server-side from simTime; the
+  // clock only asks the work_progress endpoint to catch up, throttled.
+  private syncProgress(): void {
+    if (!this.companyId || this.progressSyncInFlight) return;
+    if (this.endgameStatus === 'triggered' || this.endgameStatus === 'resolved')
+      return;
     const simTime = this.simTime;
     if (typeof simTime !== 'number' || !Number.isFinite(simTime)) return;
-    for (const it of this.items) {
-      if (it.status === 'done') continue;
-      if (it.status !== 'doing') continue;
-      if (!it.assignee_id) continue;
-      const emp = this.employeeStress.get(it.assignee_id);
-      if (emp && isBurnedOut(emp.status)) continue;
-      if (!it.started_at || !it.estimated_hours) continue;
-      const pct = this.progressFor(it);
-      if (pct >= 100 && !this.completedIds.has(it.id)) {
-        this.completedIds.add(it.id);
-        const ref = doc(db, `companies/${this.companyId}/workitems/${it.id}`);
-        updateDoc(ref, { status: 'done', completed_at: simTime }).catch(
-          () => {
-            this.completedIds.delete(it.id);
-          }
-        );
-      }
-    }
-  }
-
-  private progressFor(it: {
-    started_at: number;
-    estimated_hours: number;
-    assignee_id?: string;
-    worked_ms: number;
-    status: string;
-  }): number {
-    if (typeof this.simTime !== 'number' || !Number.isFinite(this.simTime))
-      return 0;
-    const simTime = this.simTime;
-    const baseWorked = Number(it.worked_ms || 0);
-    const startedAt = Number(it.started_at || 0);
-    const emp = it.assignee_id
-      ? this.employeeStress.get(it.assignee_id)
-      : undefined;
-    const allowOffHours = emp ? !!emp.offHoursAllowed : false;
-    let totalWorkedMs = baseWorked;
-    if (it.status === 'doing' && startedAt) {
-      totalWorkedMs += this.workingMillisBetween(
-        startedAt,
-        simTime,
-        allowOffHours
-      );
-    }
-    const hours = totalWorkedMs / 3_600_000;
-    if (emp && isBurnedOut(emp.status)) return 0;
-    const multiplier = emp ? emp.multiplier : 1;
-    const needed = it.estimated_hours * multiplier;
-    if (!needed || !isFinite(needed)) return 0;
-    const pct = Math.min(100, Math.max(0, (hours / needed) * 100));
-    return Math.round(pct);
-  }
-
-  private workingMillisBetween(
-    startMs: number,
-    endMs: number,
-    allowOffHours = false
-  ): number {
-    if (
-      !Number.isFinite(startMs) ||
-      !Number.isFinite(endMs) ||
-      endMs <= startMs
-    ) {
-      return 0;
-    }
-    if (allowOffHours) {
-      return Math.max(0, endMs - startMs);
-    }
-    const startHour = this.workdayStartHour;
-    const endHour = this.workdayEndHour;
-    let total = 0;
-    let cursor = startMs;
-    while (cursor < endMs) {
-      const d = new Date(cursor);
-      const dayStart = new Date(d.getTime());
-      dayStart.setHours(startHour, 0, 0, 0);
-      const dayEnd = new Date(d.getTime());
-      dayEnd.setHours(endHour, 0, 0, 0);
-      const day = d.getDay();
-      const isWorkday = day >= 1 && day <= 5;
-      if (!isWorkday || cursor >= dayEnd.getTime()) {
-        const nextDay = new Date(dayStart.getTime() + 24 * 60 * 60 * 1000);
-        cursor = nextDay.getTime();
-        continue;
-      }
-      if (cursor < dayStart.getTime()) {
-        cursor = dayStart.getTime();
-        continue;
-      }
-      const sliceEnd = Math.min(endMs, dayEnd.getTime());
-      if (sliceEnd > cursor) {
-        total += sliceEnd - cursor;
-        cursor = sliceEnd;
-      } else {
-        cursor = sliceEnd;
-      }
-    }
-    return total;
+    if (!this.items.some((it) => it.status === 'doing')) return;
+    const now = Date.now();
+    if (now - this.lastProgressSync < this.progressSyncEveryMs) return;
+    this.lastProgressSync = now;
+    this.progressSyncInFlight = true;
+    fetch('https://fa-strtupifyio.azurewebsites.net/api/work_progress', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        company: this.companyId,
+        simTime: Math.round(simTime),
+        tzOffsetMinutes: -new Date(simTime).getTimezoneOffset(),
+      }),
+    })
+      .catch(() => {})
+      .finally(() => {
+        this.progressSyncInFlight = false;
+      });
   }
 
   private getEffectiveSpeed(): number {
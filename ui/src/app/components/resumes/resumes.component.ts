@@ -6,6 +6,7 @@ import {
   collection,
   getDocs,
   doc,
+  setDoc,
   updateDoc,
 } from 'firebase/firestore';
 import { environment } from 'src/environments/environment';
@@ -18,6 +19,7 @@ import {
   fallbackEmployeeColor,
   normalizeEmployeeColor,
 } from 'src/app/utils/employee-colors';
+import { ADDRESS_INDEX_FIELD, addressIndexEntries } from 'src/app/utils/worker-address';
 
 export const app = initializeApp(environment.firebase);
 export const db = getFirestore(app);
@@ -384,6 +386,11 @@ export class ResumesComponent implements OnInit {
       doc(db, 'companies', this.companyId, 'employees', employee.id),
       { hired: true }
     );
+    await setDoc(
+      doc(db, 'companies', this.companyId),
+      { [ADDRESS_INDEX_FIELD]: addressIndexEntries(employee.id, employee.name) },
+      { merge: true }
+    );
 
     const hiredRecord = { ...employee, hired: true };
     employee.hired = true;
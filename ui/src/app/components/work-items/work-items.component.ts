@@ -18,6 +18,7 @@ import {
   limit,
   serverTimestamp,
   getDoc,
+  runTransaction,
 } from 'firebase/firestore';
 import { environment } from 'src/environments/environment';
 import { UiStateService } from '../../services/ui-state.service';
@@ -30,6 +31,8 @@ import {
 import { EndgameService, EndgameStatus } from '../../services/endgame.service';
 import { AvatarMood, buildAvatarUrl, burnoutMood, normalizeAvatarMood } from '../../utils/avatar';
 import { fallbackEmployeeColor, normalizeEmployeeColor } from '../../utils/employee-colors';
+import { decodeRateMatrix } from '../../utils/rate-matrix';
+import { buildWorkerAddress, companyDomain } from '../../utils/worker-address';
 import { EmailCounterService } from '../../services/email-counter.service';
 
 type WorkItem = {
@@ -49,6 +52,8 @@ type WorkItem = {
   assist_status?: string;
   assist_last_sent_at?: number;
   assist_trigger_pct?: number;
+  assist_draft?: any;
+  assist_claim_at?: number;
 };
 
 type HireSummary = {
@@ -80,6 +85,8 @@ type MobileFilter = 'all' | 'todo' | 'doing' | 'done';
 
 const fbApp = getApps().length ? getApps()[0] : initializeApp(environment.firebase);
 const db = getFirestore(fbApp);
+// same set as ACTIVE_STATUSES in api/shared_code/progress.py
+const ACTIVE_STATUSES = new Set(['doing', 'in_progress']);
 
 @Component({
   selector: 'app-work-items',
@@ -116,6 +123,9 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
   private empById = new Map<string, HireSummary>();
   private titleById = new Map<string, string>();
   private rateCache = new Map<string, Record<string, number>>();
+  private matrixRates = new Map<string, Record<string, number>>();
+  private matrixVersion = -1;
+  private unsubRates: (() => void) | null = null;
   private lastPersistedStress = new Map<string, { stress: number; status: 'Active' | 'Burnout' }>();
   private hrActivated = false;
   private companyName = '';
@@ -128,11 +138,11 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
   private assistInFlight = new Set<string>();
   private assistFailedAt = new Map<string, number>();
   private assistFailureCooldownMs = 5 * 60 * 1000;
-  private assistStartedSim = new Map<string, number>();
-  private assistMinSimMs = 20_000;
+  private assistClaimTtlMs = 2 * 60 * 1000;
   private endgameStatus: EndgameStatus = 'idle';
   private endgameSub: Subscription | null = null;
   private companySnapshotSeen = false;
+  planning = false;
   private avatarColorCache = new Map<string, string>();
   private pendingAvatarFetches = new Map<string, Promise<void>>();
   private unsubEmployees: (() => void) | null = null;
@@ -206,10 +216,12 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
           completed_at: Number(x.completed_at || 0),
           worked_ms: Number(x.worked_ms || 0),
           rate_per_hour: Number(x.rate_per_hour || 0),
-          rates: ratesMap,
+          rates: this.matrixRates.get(d.id) || ratesMap,
           assist_status: assistStatus,
           assist_last_sent_at: assistLastSent,
           assist_trigger_pct: assistTrigger ?? undefined,
+          assist_draft: x.assist_draft && typeof x.assist_draft === 'object' ? x.assist_draft : undefined,
+          assist_claim_at: toMillis(x.assist_claim_at),
         } as WorkItem;
       });
       this.titleById.clear();
@@ -220,9 +232,18 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
       void this.checkAssistanceNeeds();
     });
 
+    this.unsubRates = onDocSnapshot(doc(db, `companies/${this.companyId}/rate_matrix/current`), (snapshot) => {
+      const matrix = decodeRateMatrix(snapshot.data());
+      if (snapshot.exists() && matrix.version < this.matrixVersion) return;
+      this.matrixVersion = matrix.version;
+      this.matrixRates = matrix.rows;
+      for (const it of this.items) it.rates = this.ratesFor(it.id);
+    });
+
     this.unsubCompany = onDocSnapshot(doc(db, `companies/${this.companyId}`), (snapshot) => {
       const x = (snapshot && (snapshot.data() as any)) || {};
       this.companySnapshotSeen = true;
+      this.planning = x.work_status === 'planning';
       const incomingSimRaw = x.simTime;
       const incomingSim = Number(incomingSimRaw);
       const hasSimTime = Number.isFinite(incomingSim);
@@ -235,10 +256,10 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
       if (this.speed <= 0) this.speed = 1;
       if (typeof x.company_name === 'string' && x.company_name.trim().length) {
         this.companyName = x.company_name;
-        this.companyDomain = this.normalizeDomain(this.companyName);
+        this.companyDomain = companyDomain(this.companyId, this.companyName);
       }
       if (!this.companyDomain) {
-        this.companyDomain = this.normalizeDomain(this.companyId);
+        this.companyDomain = companyDomain(this.companyId);
       }
       if (Number.isFinite(this.simTime)) {
         this.partition();
@@ -289,6 +310,7 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
   ngOnDestroy(): void {
     if (this.unsubItems) this.unsubItems();
     if (this.unsubCompany) this.unsubCompany();
+    if (this.unsubRates) this.unsubRates();
     if (this.unsubEmployees) this.unsubEmployees();
     this.stopLocalClock();
     if (this.blockerNoticeTimer) {
@@ -308,23 +330,9 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
     const order = (a: WorkItem, b: WorkItem) => a.title.localeCompare(b.title);
     this.todo = this.items.filter((i) => (i.status || 'todo') === 'todo').sort(order);
     this.doing = this.items
-      .filter((i) => i.status === 'doing' || i.status === 'in_progress')
+      .filter((i) => ACTIVE_STATUSES.has(i.status))
       .sort(order);
     this.done = this.items.filter((i) => i.status === 'done').sort(order);
-    const doingIds = new Set(this.doing.map((x) => x.id));
-    const nowSim = this.simTime;
-    for (const id of doingIds) {
-      if (
-        !this.assistStartedSim.has(id) &&
-        typeof nowSim === 'number' &&
-        Number.isFinite(nowSim)
-      ) {
-        this.assistStartedSim.set(id, nowSim);
-      }
-    }
-    for (const id of Array.from(this.assistStartedSim.keys())) {
-      if (!doingIds.has(id)) this.assistStartedSim.delete(id);
-    }
     this.pruneAssistTracking();
     this.checkEndgameCondition();
   }
@@ -347,7 +355,7 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
   }
 
   isDoingStatus(it: WorkItem): boolean {
-    return it.status === 'doing' || it.status === 'in_progress';
+    return ACTIVE_STATUSES.has(it.status);
   }
 
   canDrag(it: WorkItem): boolean {
@@ -486,14 +494,9 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
     if (this.endgameStatus !== 'idle') return;
     if (!this.companySnapshotSeen) return;
     if (typeof this.simTime !== 'number' || !Number.isFinite(this.simTime)) return;
-    let assistTick = 0;
     this.intervalId = setInterval(() => {
       if (typeof this.simTime !== 'number' || !Number.isFinite(this.simTime)) return;
       this.simTime = this.simTime + this.speed * this.tickMs;
-      assistTick++;
-      if (assistTick % 8 === 0) {
-        void this.checkAssistanceNeeds();
-      }
     }, this.tickMs);
   }
 
@@ -513,24 +516,15 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
     }
   }
 
-  private normalizeDomain(source: string): string {
-    const normalized = (source || '').toLowerCase().replace(/[^a-z0-9]/g, '');
-    const base = normalized || this.companyId.toLowerCase();
-    return `${base}.com`;
-  }
-
   private getFounderAddress(): string {
     if (!this.companyDomain) {
-      this.companyDomain = this.normalizeDomain(this.companyName || this.companyId);
+      this.companyDomain = companyDomain(this.companyId, this.companyName);
     }
     return `me@${this.companyDomain}`;
   }
 
   private buildWorkerAddress(name: string): string {
-    const normalized = (name || 'teammate').toLowerCase().replace(/[^a-z0-9]+/g, '.');
-    const localPart = normalized.replace(/^\.+|\.+$/g, '') || 'teammate';
-    const domain = this.companyDomain || this.normalizeDomain(this.companyName || this.companyId);
-    return `${localPart}@${domain}`;
+    return buildWorkerAddress(name, this.companyDomain || companyDomain(this.companyId, this.companyName));
   }
 
   private async ensureProductInfo(): Promise<void> {
@@ -562,9 +556,42 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
     }
   }
 
-  private createAssistThreadId(workitemId: string): string {
-    const seed = Math.random().toString(36).slice(2, 8);
-    return `assist-${workitemId}-${Date.now()}-${seed}`;
+  // one thread per item and trigger, so a tab that retries a stale claim
+  // overwrites the same inbox doc instead of adding a second email
+  private assistThreadId(workitemId: string, triggerPct: number | null): string {
+    return `assist-${workitemId}-${triggerPct ?? 'x'}`;
+  }
+
+  private isAssistClaimStale(claimAt: number | undefined): boolean {
+    return !claimAt || Date.now() - claimAt > this.assistClaimTtlMs;
+  }
+
+  // due -> sending; only the tab that wins this transaction writes the email
+  private async claimAssistSend(itemId: string): Promise<string | null> {
+    if (!this.companyId) return null;
+    const ref = doc(db, `companies/${this.companyId}/workitems/${itemId}`);
+    const token = Math.random().toString(36).slice(2, 10);
+    return runTransaction<string | null>(db, async (tx) => {
+      const snap = await tx.get(ref);
+      const data = (snap && (snap.data() as any)) || {};
+      if (!ACTIVE_STATUSES.has(String(data.status || '')) || data.assist_last_sent_at) return null;
+      const status = String(data.assist_status || '').toLowerCase();
+      const claimAt = Number(data.assist_claim_at || 0);
+      if (status !== 'due' && !(status === 'sending' && this.isAssistClaimStale(claimAt))) return null;
+      tx.update(ref, { assist_status: 'sending', assist_claim: token, assist_claim_at: Date.now() });
+      return token;
+    }).catch(() => null);
+  }
+
+  private async releaseAssistClaim(itemId: string, token: string): Promise<void> {
+    if (!this.companyId) return;
+    const ref = doc(db, `companies/${this.companyId}/workitems/${itemId}`);
+    await runTransaction(db, async (tx) => {
+      const snap = await tx.get(ref);
+      const data = (snap && (snap.data() as any)) || {};
+      if (data.assist_claim !== token || data.assist_status !== 'sending') return;
+      tx.update(ref, { assist_status: 'due', assist_claim: '', assist_claim_at: 0 });
+    }).catch(() => {});
   }
 
   private isWorkday(date: Date): boolean {
@@ -621,7 +648,7 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
   private shouldTriggerAssistance(it: WorkItem): boolean {
     const nowSim = this.simTime;
     if (typeof nowSim !== 'number' || !Number.isFinite(nowSim)) return false;
-    if (!it || it.status !== 'doing') return false;
+    if (!it || !ACTIVE_STATUSES.has(it.status)) return false;
     if (!it.assignee_id) return false;
     if (this.assistInFlight.has(it.id)) return false;
     const lastFailure = this.assistFailedAt.get(it.id);
@@ -629,15 +656,11 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
       if (Date.now() - lastFailure < this.assistFailureCooldownMs) return false;
       this.assistFailedAt.delete(it.id);
     }
+    // work_progress flags the item as due once it crosses its trigger
     const status = String(it.assist_status || '').toLowerCase();
-    if (status === 'pending' || status === 'awaiting_reply') return false;
+    const staleClaim = status === 'sending' && this.isAssistClaimStale(it.assist_claim_at);
+    if (status !== 'due' && !staleClaim) return false;
     if (it.assist_last_sent_at) return false;
-    const startedAt = Number(it.started_at || 0);
-    if (!startedAt) return false;
-
-    const startedSim = this.assistStartedSim.get(it.id);
-    if (!startedSim) return false;
-    if (nowSim - startedSim < this.assistMinSimMs) return false;
 
     const assignee = it.assignee_id ? this.empById.get(it.assignee_id) : null;
     const allowOffHours = assignee ? !!assignee.offHoursAllowed : false;
@@ -646,12 +669,6 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
       if (!this.isWorkday(now) || !this.isWithinWorkHours(now)) return false;
     }
 
-    const targetPct = this.getAssistTriggerPct(it);
-    if (targetPct === null) return false;
-
-    const progressPct = this.progress(it);
-    if (progressPct < targetPct) return false;
-
     return true;
   }
 
@@ -715,10 +732,16 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
       sendSimMs = Math.max(sendSimMs, refreshedSim);
     }
     const latest = this.items.find((x) => x.id === it.id);
-    if (!latest || latest.status !== 'doing' || latest.assist_last_sent_at) {
+    if (!latest || !ACTIVE_STATUSES.has(latest.status) || latest.assist_last_sent_at) {
       this.assistInFlight.delete(it.id);
       return;
     }
+    const claim = await this.claimAssistSend(it.id);
+    if (!claim) {
+      this.assistInFlight.delete(it.id);
+      return;
+    }
+    let sent = false;
     const totalWorked = this.totalWorkedMs(it);
     const payload = {
       company: this.companyId,
@@ -731,24 +754,29 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
       },
     };
     try {
-      const resp = await fetch('https://fa-strtupifyio.azurewebsites.net/api/workitem_assist_email', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(payload),
-      });
-      if (!resp.ok) {
-        const errText = await resp.text().catch(() => '');
-        console.error('Assist email failed', resp.status, errText || resp.statusText);
-        this.assistFailedAt.set(it.id, Date.now());
-        return;
-      }
-      let data: any;
-      try {
-        data = await resp.json();
-      } catch (parseErr) {
-        console.error('Assist email response parse failed', parseErr);
-        this.assistFailedAt.set(it.id, Date.now());
-        return;
+      // assist_email_worker drafts the email ahead of time; only fall back to
+      // generating it now when there is no draft from the current assignee.
+      const draft = it.assist_draft;
+      let data: any = draft && draft.email && draft.email.sender_name === assigneeName ? draft : null;
+      if (!data) {
+        const resp = await fetch('https://fa-strtupifyio.azurewebsites.net/api/workitem_assist_email', {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify(payload),
+        });
+        if (!resp.ok) {
+          const errText = await resp.text().catch(() => '');
+          console.error('Assist email failed', resp.status, errText || resp.statusText);
+          this.assistFailedAt.set(it.id, Date.now());
+          return;
+        }
+        try {
+          data = await resp.json();
+        } catch (parseErr) {
+          console.error('Assist email response parse failed', parseErr);
+          this.assistFailedAt.set(it.id, Date.now());
+          return;
+        }
       }
       const email = (data?.email || {}) as any;
       const senderName = typeof email.sender_name === 'string' && email.sender_name ? email.sender_name : assigneeName;
@@ -762,7 +790,8 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
       const pauseReason = typeof email.pause_reason === 'string' ? email.pause_reason : '';
       const confidenceRaw = Number(email.confidence);
       const timestampIso = new Date(sendSimMs).toISOString();
-      const threadId = this.createAssistThreadId(it.id);
+      const targetPct = this.getAssistTriggerPct(it);
+      const threadId = this.assistThreadId(it.id, targetPct);
       const emailId = `${threadId}-email`;
 
       await setDoc(doc(db, `companies/${this.companyId}/inbox/${emailId}`), {
@@ -791,10 +820,11 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
       });
       await this.emailCounter.recordInbound();
 
-      const targetPct = this.getAssistTriggerPct(it);
       const updatePayload: Record<string, any> = {
         assist_status: 'pending',
         assist_last_sent_at: sendSimMs,
+        assist_claim: '',
+        assist_claim_at: 0,
         worked_ms: totalWorked,
         started_at: 0,
         updated: serverTimestamp(),
@@ -810,11 +840,12 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
       it.worked_ms = totalWorked;
       this.partition();
       this.assistFailedAt.delete(it.id);
-      this.assistStartedSim.delete(it.id);
+      sent = true;
     } catch (err) {
       console.error('Failed to create assistance email', err);
       this.assistFailedAt.set(it.id, Date.now());
     } finally {
+      if (!sent) await this.releaseAssistClaim(it.id, claim);
       this.assistInFlight.delete(it.id);
     }
   }
@@ -824,9 +855,6 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
     for (const id of Array.from(this.assistFailedAt.keys())) {
       if (!activeIds.has(id)) this.assistFailedAt.delete(id);
     }
-    for (const id of Array.from(this.assistStartedSim.keys())) {
-      if (!activeIds.has(id)) this.assistStartedSim.delete(id);
-    }
   }
 
   onDragStart(ev: DragEvent, it: WorkItem) {
@@ -931,7 +959,6 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
       update.started_at = it.status === 'doing' && it.started_at ? it.started_at : simTime;
     } else {
       update.started_at = 0;
-      this.assistStartedSim.delete(it.id);
     }
     it.worked_ms = workedMs;
     it.status = target;
@@ -954,7 +981,6 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
       const patch: any = {
         assignee_id: '',
         worked_ms: workedMs,
-        rates: this.rateCache.get(it.id) || {},
       };
       if (it.status === 'doing') {
         patch.status = 'todo';
@@ -963,7 +989,6 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
       await updateDoc(ref, patch);
       it.assignee_id = '';
       it.worked_ms = workedMs;
-      it.rates = this.rateCache.get(it.id) || undefined;
       if (it.status === 'doing') {
         it.status = 'todo';
         it.started_at = 0;
@@ -977,7 +1002,7 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
       return;
     }
 
-    const rateMap = this.rateCache.get(it.id);
+    const rateMap = this.ratesFor(it.id);
     const llmRateRaw = rateMap ? Number(rateMap[emp.id]) : Number.NaN;
     const hasLlmRate = Number.isFinite(llmRateRaw) && llmRateRaw > 0;
     if (!hasLlmRate) {
@@ -991,26 +1016,20 @@ export class WorkItemsComponent implements OnInit, OnDestroy {
       estimated_hours: estimatedHours,
       rate_per_hour: ratePerHour,
     };
-    const existingRates = this.rateCache.get(it.id);
-    const nextRates = existingRates ? { ...existingRates } : {};
-    if (hasLlmRate) nextRates[emp.id] = normalizedRate;
-    else if (ratePerHour > 0) nextRates[emp.id] = ratePerHour;
-    if (Object.keys(nextRates).length) {
-      this.rateCache.set(it.id, nextRates);
-      updatePayload['rates'] = nextRates;
-    } else {
-      this.rateCache.delete(it.id);
-      updatePayload['rates'] = {};
-    }
     await updateDoc(ref, updatePayload);
     it.assignee_id = emp.id;
     it.estimated_hours = estimatedHours;
     it.rate_per_hour = ratePerHour;
-    it.rates = this.rateCache.get(it.id) || undefined;
 
     this.recomputeStress();
   }
 
+  // Rates live in the company's rate_matrix doc; per-item maps are only read
+  // for older companies that predate it.
+  private ratesFor(id: string): Record<string, number> | undefined {
+    return this.matrixRates.get(id) || this.rateCache.get(id);
+  }
+
   private subscribeToHires(): void {
     if (!this.companyId) return;
     if (this.unsubEmployees) {
@@ -20,6 +20,21 @@ const app = initializeApp(environment.firebase);
 const db = getFirestore(app);
 const auth = getAuth(app);
 
+// company subcollections removed on delete; employees and their skills are handled separately
+const COMPANY_COLLECTIONS = [
+  'products',
+  'roles',
+  'inbox',
+  'workitems',
+  'rate_matrix',
+  'rate_cache',
+  'mom_replies',
+  'cadabra_turns',
+  'endgame_stream',
+  'endgame_cache',
+  'order_pool',
+];
+
 @Component({
   selector: 'app-home',
   templateUrl: 'home.page.html',
@@ -132,10 +147,14 @@ export class HomePage implements OnInit, OnDestroy {
 
     const countDocs = async (): Promise<number> => {
       let total = 0;
-      const topCols = ['products', 'roles', 'inbox', 'workitems'];
-      for (const top of topCols) {
+      for (const top of COMPANY_COLLECTIONS) {
         const snap = await getDocs(collection(db, 'companies', companyId, top));
         total += snap.docs.length;
+        if (top !== 'products') continue;
+        for (const product of snap.docs) {
+          const linesSnap = await getDocs(collection(product.ref, 'transcript'));
+          total += linesSnap.docs.length;
+        }
       }
       const employeesSnap = await getDocs(
         collection(db, 'companies', companyId, 'employees')
@@ -153,9 +172,17 @@ export class HomePage implements OnInit, OnDestroy {
     const bump = () => (this.deleteDone = Math.min(this.deleteDone + 1, this.deleteTotal));
 
     try {
-      for (const top of ['products', 'roles', 'inbox', 'workitems']) {
+      for (const top of COMPANY_COLLECTIONS) {
         const snap = await getDocs(collection(db, 'companies', companyId, top));
         for (const d of snap.docs) {
+          if (top === 'products') {
+            // Firestore keeps subcollections of deleted docs, so clear the boardroom transcript first
+            const linesSnap = await getDocs(collection(d.ref, 'transcript'));
+            for (const line of linesSnap.docs) {
+              await deleteDoc(line.ref);
+              bump();
+            }
+          }
           await deleteDoc(d.ref);
           bump();
         }
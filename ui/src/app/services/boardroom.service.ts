@@ -27,6 +27,7 @@ export class BoardroomService {
       product: productId,
       stage,
       counter,
+      speculate: true,
     });
   }
 }
@@ -19,6 +19,7 @@ import {
 } from 'firebase/firestore';
 import { environment } from 'src/environments/environment';
 import {
+  AvatarMood,
   buildAvatarUrl,
   EndgameOutcome,
   normalizeOutcomeStatus,
@@ -29,6 +30,8 @@ import { EmailCounterService } from './email-counter.service';
 
 export type EndgameStatus = 'idle' | 'triggered' | 'resolved';
 
+const endgameEmailUrl = 'https://fa-strtupifyio.azurewebsites.net/api/endgame_email';
+
 export interface EndgameState {
   status: EndgameStatus;
   active: boolean;
@@ -129,12 +132,29 @@ export class EndgameService implements OnDestroy {
         );
         return true;
       });
+      if (result) void this.precomputeOutcome();
       return !!result;
     } catch {
       return false;
     }
   }
 
+  // Warm the endgame_email cache while the player sits on the endgame screen,
+  // so the outcome email is ready the moment they reset. The function keys it
+  // on months and completed work, so anything finished meanwhile just misses.
+  private async precomputeOutcome(): Promise<void> {
+    if (!this.companyId) return;
+    try {
+      await firstValueFrom(
+        this.http.post(endgameEmailUrl, {
+          name: this.companyId,
+          months: this.deriveMonths(undefined),
+          precompute: true,
+        })
+      );
+    } catch {}
+  }
+
   async resolveEndgame(simTime?: number): Promise<boolean> {
     if (!this.companyId) return false;
     const ref = doc(this.db, 'companies', this.companyId);
@@ -340,8 +360,10 @@ export class EndgameService implements OnDestroy {
     estimatedRevenue: number | null;
   }> {
     const companyRef = doc(this.db, 'companies', this.companyId);
-    const sender = await this.resolveKickoffSender();
-    const product = await this.loadAcceptedProduct();
+    const [sender, product] = await Promise.all([
+      this.resolveKickoffSender(),
+      this.loadAcceptedProduct(),
+    ]);
     const payload: any = {
       name: this.companyId,
       months,
@@ -351,12 +373,74 @@ export class EndgameService implements OnDestroy {
     if (product.name) payload.productName = product.name;
     if (product.description) payload.productDescription = product.description;
 
-    const url = 'https://fa-strtupifyio.azurewebsites.net/api/endgame_email';
+    const emailId = `outcome-${Date.now()}`;
+    const inboxRef = doc(this.db, `companies/${this.companyId}/inbox/${emailId}`);
+    payload.streamId = emailId;
+
+    // The function streams the email into endgame_stream/{emailId}; show each
+    // paragraph in the inbox as it lands instead of waiting for the whole body.
+    let finished = false;
+    let previewed = false;
+    let writes: Promise<unknown> = Promise.resolve();
+    const unsubStream = onSnapshot(
+      doc(this.db, `companies/${this.companyId}/endgame_stream/${emailId}`),
+      (snap) => {
+        const partial = (snap && (snap.data() as any)) || null;
+        if (finished || !partial?.body) return;
+        const preview = this.buildOutcomeEmail(partial, sender, product, months, to, timestampIso, emailId);
+        writes = writes
+          .then(() => setDoc(inboxRef, { ...preview.data, streaming: true }))
+          .then(() => {
+            if (previewed) return;
+            previewed = true;
+            return this.emailCounter.recordInbound();
+          })
+          .catch(() => {});
+      },
+      () => {}
+    );
+
     let response: any = null;
     try {
-      response = await firstValueFrom(this.http.post(url, payload));
-    } catch {}
+      response = await firstValueFrom(this.http.post(endgameEmailUrl, payload));
+    } catch {
+    } finally {
+      finished = true;
+      unsubStream();
+    }
+    await writes;
 
+    const { data, outcomeStatus, outcomeAvatarMood, estimatedRevenue } =
+      this.buildOutcomeEmail(response, sender, product, months, to, timestampIso, emailId);
+    try {
+      await setDoc(inboxRef, { ...data, streaming: false });
+      if (!previewed) await this.emailCounter.recordInbound();
+      try {
+        await updateDoc(companyRef, {
+          endgameOutcome: outcomeStatus,
+          endgameOutcomeMood: outcomeAvatarMood,
+        });
+      } catch {}
+      return { sent: true, outcomeStatus, estimatedRevenue };
+    } catch {
+      return { sent: false, outcomeStatus, estimatedRevenue };
+    }
+  }
+
+  private buildOutcomeEmail(
+    response: any,
+    sender: { name: string; from: string },
+    product: { name: string },
+    months: number,
+    to: string,
+    timestampIso: string,
+    emailId: string
+  ): {
+    data: Record<string, any>;
+    outcomeStatus: EndgameOutcome;
+    outcomeAvatarMood: AvatarMood;
+    estimatedRevenue: number | null;
+  } {
     const status = typeof response?.status === 'string' ? response.status : '';
     const estRevenueRaw = Number(response?.estimated_revenue);
     const estimatedRevenue = Number.isFinite(estRevenueRaw)
@@ -396,40 +480,29 @@ export class EndgameService implements OnDestroy {
     const avatarName = sender.name || this.extractNameFromAddress(from) || '';
     const avatarUrl = buildAvatarUrl(avatarName, outcomeAvatarMood);
 
-    const emailId = `outcome-${Date.now()}`;
-    try {
-      await setDoc(
-        doc(this.db, `companies/${this.companyId}/inbox/${emailId}`),
-        {
-          from,
-          to,
-          subject,
-          message: body,
-          deleted: false,
-          banner: false,
-          timestamp: timestampIso,
-          threadId: emailId,
-          category: 'kickoff-outcome',
-          outcomeStatus: status || null,
-          avatarName: avatarName || null,
-          avatarMood: outcomeAvatarMood,
-          avatarUrl: avatarUrl || null,
-          estimatedRevenue,
-          timeframeMonths: months,
-          productName: product.name,
-        }
-      );
-      await this.emailCounter.recordInbound();
-      try {
-        await updateDoc(companyRef, {
-          endgameOutcome: outcomeStatus,
-          endgameOutcomeMood: outcomeAvatarMood,
-        });
-      } catch {}
-      return { sent: true, outcomeStatus, estimatedRevenue };
-    } catch {
-      return { sent: false, outcomeStatus, estimatedRevenue };
-    }
+    return {
+      data: {
+        from,
+        to,
+        subject,
+        message: body,
+        deleted: false,
+        banner: false,
+        timestamp: timestampIso,
+        threadId: emailId,
+        category: 'kickoff-outcome',
+        outcomeStatus: status || null,
+        avatarName: avatarName || null,
+        avatarMood: outcomeAvatarMood,
+        avatarUrl: avatarUrl || null,
+        estimatedRevenue,
+        timeframeMonths: months,
+        productName: product.name,
+      },
+      outcomeStatus,
+      outcomeAvatarMood,
+      estimatedRevenue,
+    };
   }
 
   private async buildCreditsStats(
@@ -17,6 +17,7 @@ import {
 } from 'firebase/firestore';
 import { environment } from 'src/environments/environment';
 import { EmailCounterService } from './email-counter.service';
+import { buildWorkerAddress, companyDomain } from '../utils/worker-address';
 
 const fbApp = getApps().length ? getApps()[0] : initializeApp(environment.firebase);
 const db = getFirestore(fbApp);
@@ -197,6 +198,7 @@ export class ReplyRouterService {
           await this.http
             .post<any>('https://fa-strtupifyio.azurewebsites.net/api/workitems', {
               company: opts.companyId,
+              tzOffsetMinutes: -new Date(kickoffTimestamp).getTimezoneOffset(),
             })
             .toPromise();
         } catch {}
@@ -281,12 +283,9 @@ export class ReplyRouterService {
       const workitemRef = doc(db, `companies/${opts.companyId}/workitems/${workitemId}`);
       const workitemSnap = await getDoc(workitemRef);
       const workitemData = (workitemSnap.data() as any) || {};
+      // rate_per_hour is the assignee's rate; the full matrix lives in rate_matrix/current
       const baseRateRaw = Number(workitemData.rate_per_hour || 1);
-      const ratesMap = workitemData.rates && typeof workitemData.rates === 'object' ? workitemData.rates : null;
-      const assigneeRateRaw =
-        ratesMap && workitemCtx.assigneeId ? Number((ratesMap as any)[workitemCtx.assigneeId]) : Number.NaN;
-      const baseRateCandidate = Number.isFinite(assigneeRateRaw) && assigneeRateRaw > 0 ? assigneeRateRaw : baseRateRaw;
-      const baseRate = Number.isFinite(baseRateCandidate) && baseRateCandidate > 0 ? baseRateCandidate : 1;
+      const baseRate = Number.isFinite(baseRateRaw) && baseRateRaw > 0 ? baseRateRaw : 1;
       let nextRate = baseRate * multiplier;
       if (!Number.isFinite(nextRate) || nextRate <= 0) nextRate = baseRate;
       nextRate = Math.max(0.1, Math.min(5, Math.round(nextRate * 10000) / 10000));
@@ -304,18 +303,6 @@ export class ReplyRouterService {
         started_at: simTime,
         updated: serverTimestamp(),
       };
-      const normalizedExisting: Record<string, number> = {};
-      if (ratesMap && typeof ratesMap === 'object') {
-        for (const [empId, val] of Object.entries(ratesMap as Record<string, any>)) {
-          const num = Number(val);
-          if (Number.isFinite(num)) normalizedExisting[empId] = num;
-        }
-      }
-      if (workitemCtx.assigneeId) {
-        normalizedExisting[workitemCtx.assigneeId] = nextRate;
-      }
-      updatePayload['rates'] = normalizedExisting;
-
       await updateDoc(workitemRef, updatePayload);
 
       const evaluationStamp = new Date(plannedReplyMs).toISOString();
@@ -630,6 +617,8 @@ export class ReplyRouterService {
       company: opts.companyId,
       subject: opts.subject || '(no subject)',
       message: opts.message || '',
+      // the outbound email id lets mom_reply answer retries without re-deciding
+      emailId: opts.parentId || '',
     };
     let res: any = null;
     try {
@@ -1598,10 +1587,7 @@ export class ReplyRouterService {
   }
 
   private buildWorkerAddress(name: string, companyId: string): string {
-    const normalized = (name || 'teammate').toLowerCase().replace(/[^a-z0-9]+/g, '.');
-    const local = normalized.replace(/^\.+|\.+$/g, '') || 'teammate';
-    const domain = `${companyId.replace(/[^a-z0-9]/gi, '').toLowerCase() || 'strtupify'}.com`;
-    return `${local}@${domain}`;
+    return buildWorkerAddress(name, companyDomain(companyId));
   }
 
   private async getReplyBody(companyId: string, replyId: string): Promise<string> {
@@ -0,0 +1,36 @@
+export type RateRow = Record<string, number>;
+
+export type RateMatrix = {
+  version: number;
+  rows: Map<string, RateRow>;
+};
+
+function matrixBytes(value: any): Uint8Array | null {
+  if (!value) return null;
+  if (value instanceof Uint8Array) return value;
+  if (typeof value.toUint8Array === 'function') return value.toUint8Array();
+  return null;
+}
+
+// Decodes companies/{id}/rate_matrix/current: employee and item id arrays plus
+// little-endian float32 cells, row-major by item. NaN cells have no rate.
+export function decodeRateMatrix(data: any): RateMatrix {
+  const rows = new Map<string, RateRow>();
+  const version = Number(data?.version || 0);
+  const employees: string[] = Array.isArray(data?.employees) ? data.employees.map(String) : [];
+  const items: string[] = Array.isArray(data?.items) ? data.items.map(String) : [];
+  const bytes = matrixBytes(data?.rates);
+  if (!bytes || !employees.length || bytes.byteLength !== 4 * employees.length * items.length) {
+    return { version, rows };
+  }
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  items.forEach((itemId, i) => {
+    const row: RateRow = {};
+    employees.forEach((empId, e) => {
+      const value = view.getFloat32(4 * (i * employees.length + e), true);
+      if (Number.isFinite(value)) row[empId] = Math.round(value * 10000) / 10000;
+    });
+    if (Object.keys(row).length) rows.set(itemId, row);
+  });
+  return { version, rows };
+}
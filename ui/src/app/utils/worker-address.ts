@@ -0,0 +1,30 @@
+// Mirrors api/shared_code/addresses.py so the UI and the functions agree on
+// every teammate's address and on the company's employee_addresses index.
+
+export const ADDRESS_INDEX_FIELD = 'employee_addresses';
+
+export function normalizeDomain(source: string, fallback = 'strtupify'): string {
+  const cleaned = (source || '').toLowerCase().replace(/[^a-z0-9]/g, '');
+  return cleaned || fallback;
+}
+
+export function companyDomain(companyId: string, companyName?: string): string {
+  return `${normalizeDomain(companyName || companyId, normalizeDomain(companyId))}.com`;
+}
+
+export function workerLocalPart(name: string, fallback = 'teammate'): string {
+  const normalized = (name || '').trim().toLowerCase().replace(/[^a-z0-9]+/g, '.');
+  return normalized.replace(/^\.+|\.+$/g, '') || fallback;
+}
+
+export function buildWorkerAddress(name: string, domain: string): string {
+  return `${workerLocalPart(name)}@${domain}`;
+}
+
+// Local parts are [a-z0-9.] only, so dots become underscores without collisions.
+export function addressIndexEntries(employeeId: string, name: string): Record<string, string> {
+  return {
+    [workerLocalPart(name || employeeId).replace(/\./g, '_')]: employeeId,
+    [workerLocalPart(employeeId).replace(/\./g, '_')]: employeeId,
+  };
+}